@@ -2,9 +2,12 @@ import os
 import sys
 import json
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 from langchain_community.llms import Ollama
-from elasticsearch_client.es_client import ElasticsearchClient
+from mcp_server.client import BlockingMCPClient, MCPClient
+from agents.keyword_extraction import KeywordExtractor, normalize_query
 from dotenv import load_dotenv
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -12,13 +15,28 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 load_dotenv()
 
 class SimpleElasticsearchAgent:
-    def __init__(self):
-        self.es_client = ElasticsearchClient()
-        self.llm = Ollama(
+    def __init__(self, llm=None, keyword_timeout: float = None, client: MCPClient = None):
+        # Ferramentas MCP no mesmo processo (padrão) ou em um servidor separado (stdio ou HTTP)
+        if client is None:
+            transport = os.getenv("MCP_TRANSPORT")
+            if transport == "stdio":
+                client = MCPClient.stdio()
+            elif transport == "http":
+                client = MCPClient.http()
+            else:
+                client = MCPClient.in_process()
+        self.mcp = BlockingMCPClient(client)
+        self.llm = llm or Ollama(
             model="mistral",
             temperature=0.5, 
             verbose=False 
         )
+        # Só para as chamadas ao LLM; a busca especulativa roda no loop do cliente MCP
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        timeout = keyword_timeout or float(os.getenv("KEYWORD_TIMEOUT", "2.0"))
+        self.keywords = KeywordExtractor(self.llm, timeout=timeout, executor=self.executor)
+        # Tempos de resposta da busca geral, separados por estado do cache de palavras-chave
+        self.latencies: Dict[str, List[float]] = {"cold": [], "warm": []}
         
     def process_query(self, user_query: str) -> str:
         """Processa a pergunta do usuário de forma simples"""
@@ -52,14 +70,7 @@ class SimpleElasticsearchAgent:
         limit = int(numbers[0]) if numbers else 5
         limit = min(limit, 20)
         
-        body = {
-            "query": {"match_all": {}},
-            "sort": [{"created_at": {"order": "desc"}}],
-            "size": limit
-        }
-        
-        response = self.es_client.es.search(index=self.es_client.index_name, body=body)
-        docs = [hit['_source'] for hit in response['hits']['hits']]
+        docs = self.mcp.call_tool("list_recent_documents", limit=limit)["recent_documents"]
         
         if not docs:
             return "Nenhum documento encontrado."
@@ -76,7 +87,7 @@ class SimpleElasticsearchAgent:
     
     def _handle_categories(self) -> str:
         """Mostra estatísticas por categoria"""
-        categories = self.es_client.aggregate_by_category()
+        categories = self.mcp.call_tool("aggregate_by_category")["categories"]
         
         if not categories:
             return "Nenhuma categoria encontrada."
@@ -102,7 +113,7 @@ class SimpleElasticsearchAgent:
             return "Por favor, especifique um ID válido (ex: post_1)"
         
         doc_id = match.group()
-        doc = self.es_client.get_by_id(doc_id)
+        doc = self.mcp.call_tool("get_document_by_id", document_id=doc_id)
         
         if not doc:
             return f"Documento com ID '{doc_id}' não encontrado."
@@ -119,15 +130,28 @@ class SimpleElasticsearchAgent:
         
         return result
     
+    def _search(self, query: str) -> List[Dict[str, Any]]:
+        return self.mcp.call_tool("search_documents", query=query, size=5)["results"]
+
     def _handle_search(self, query: str) -> str:
         """Busca geral"""
-        prompt = f"Extraia as palavras-chave principais desta pergunta (responda apenas com as palavras, separadas por espaço): {query}"
-        try:
-            keywords = self.llm.invoke(prompt).strip()
-        except:
-            keywords = query # Fallback: usar a query original
-        
-        results = self.es_client.search(keywords, size=5)
+        start = time.perf_counter()
+        keywords = self.keywords.cached(query)
+        if keywords is not None:
+            state = "warm"
+            results = self._search(keywords)
+        else:
+            # Busca especulativa com a pergunta original enquanto o LLM extrai as palavras-chave
+            state = "cold"
+            speculative = self.mcp.submit_tool("search_documents", query=query, size=5)
+            keywords = self.keywords.extract(query)
+            if keywords is None or normalize_query(keywords) == normalize_query(query):
+                keywords = query  # Fallback: LLM falhou ou estourou o prazo
+                results = speculative.result()["results"]
+            else:
+                speculative.cancel()
+                results = self._search(keywords)
+        self.latencies[state].append(time.perf_counter() - start)
         
         if not results:
             return f"Nenhum resultado encontrado para: {keywords}"
@@ -146,13 +170,30 @@ class SimpleElasticsearchAgent:
         """Interface principal de chat"""
         return self.process_query(message)
 
+    def close(self):
+        """Libera as threads do LLM (sem esperar chamadas travadas) e o cliente MCP"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.mcp.close()
+
+    def latency_report(self) -> str:
+        """p50/p95 das buscas gerais com o cache de palavras-chave frio e quente"""
+        lines = []
+        for state, values in self.latencies.items():
+            if not values:
+                continue
+            ordered = sorted(values)
+            p50 = ordered[int(round(0.50 * (len(ordered) - 1)))]
+            p95 = ordered[int(round(0.95 * (len(ordered) - 1)))]
+            lines.append(f"   cache {state}: {len(values)} buscas, p50 {p50 * 1000:.0f} ms, p95 {p95 * 1000:.0f} ms")
+        return "\n".join(lines)
+
 def main():
     """Função principal para executar o agente"""
     print("Iniciando Agente Simplificado para Elasticsearch...")
     
     agent = SimpleElasticsearchAgent()
 
-    if not agent.es_client.check_connection():
+    if not agent.mcp.connect():
         print("Erro: Não foi possível conectar ao Elasticsearch")
         return
     
@@ -169,7 +210,12 @@ def main():
         user_input = input("\n Você: ").strip()
         
         if user_input.lower() in ['sair', 'exit', 'quit']:
+            report = agent.latency_report()
+            if report:
+                print("Tempo de resposta das buscas:")
+                print(report)
             print("Até logo!")
+            agent.close()
             break
         
         print("\n Assistente: ")
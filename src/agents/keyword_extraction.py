@@ -0,0 +1,105 @@
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from typing import Optional
+from elasticsearch_client.file_loader import DATA_DIR
+
+KEYWORD_PROMPT = "Extraia as palavras-chave principais desta pergunta (responda apenas com as palavras, separadas por espaço): {query}"
+
+# Palavras que não mudam o sentido da busca; ignoradas na chave do cache
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "de", "do", "da", "dos", "das", "em", "no", "na",
+    "nos", "nas", "por", "para", "com", "sobre", "que", "e", "me", "mostre", "busque",
+    "quais", "qual", "existem", "tem", "temos", "the", "an", "of", "about", "on", "in",
+    "for", "with", "and", "show", "me", "find", "search", "what", "which", "are", "is"
+}
+
+
+def normalize_query(query: str) -> str:
+    """Normaliza uma pergunta para que variações triviais caiam na mesma chave.
+
+    Remove acentos, pontuação, stopwords e a ordem das palavras.
+    """
+    text = unicodedata.normalize("NFKD", query.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    tokens = {t for t in re.findall(r"\w+", text) if t not in STOPWORDS}
+    return " ".join(sorted(tokens))
+
+
+class KeywordCache:
+    """Cache de palavras-chave: LRU em memória sobre um SQLite em disco"""
+
+    def __init__(self, path: Optional[str] = None, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        path = path or os.path.join(DATA_DIR, "keyword_cache.sqlite")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS keywords (query TEXT PRIMARY KEY, keywords TEXT NOT NULL)")
+        self._db.commit()
+
+    def _remember(self, key: str, keywords: str):
+        self._memory[key] = keywords
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, query: str) -> Optional[str]:
+        key = normalize_query(query)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            row = self._db.execute("SELECT keywords FROM keywords WHERE query = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._remember(key, row[0])
+            return row[0]
+
+    def put(self, query: str, keywords: str):
+        key = normalize_query(query)
+        with self._lock:
+            self._remember(key, keywords)
+            self._db.execute("INSERT OR REPLACE INTO keywords (query, keywords) VALUES (?, ?)", (key, keywords))
+            self._db.commit()
+
+
+class KeywordExtractor:
+    """Extrai palavras-chave via LLM com cache e prazo máximo.
+
+    Se o LLM não responder dentro de `timeout`, extract() devolve None para que o
+    chamador use a busca especulativa; a resposta tardia ainda é gravada no
+    cache para as próximas perguntas.
+    """
+
+    def __init__(self, llm, cache: Optional[KeywordCache] = None, timeout: float = 2.0,
+                 executor: Optional[ThreadPoolExecutor] = None):
+        self.llm = llm
+        self.cache = cache or KeywordCache()
+        self.timeout = timeout
+        self.executor = executor or ThreadPoolExecutor(max_workers=4)
+
+    def cached(self, query: str) -> Optional[str]:
+        return self.cache.get(query)
+
+    def _invoke(self, query: str) -> str:
+        keywords = self.llm.invoke(KEYWORD_PROMPT.format(query=query)).strip()
+        if keywords:
+            self.cache.put(query, keywords)
+        return keywords
+
+    def extract(self, query: str) -> Optional[str]:
+        """Palavras-chave da pergunta, ou None se o LLM falhar ou estourar o prazo"""
+        future: Future = self.executor.submit(self._invoke, query)
+        try:
+            return future.result(timeout=self.timeout) or None
+        except TimeoutError:
+            return None
+        except Exception:
+            return None
@@ -0,0 +1,66 @@
+"""Benchmark do tempo de resposta da busca geral do agente.
+
+Executa as mesmas perguntas duas vezes com um cache de palavras-chave vazio
+(frio e depois quente) e reporta p50/p95 de cada rodada. Por padrão o LLM é
+simulado com latência fixa (--llm-delay); use --ollama para o modelo real.
+Requer um Elasticsearch acessível (ELASTICSEARCH_HOST).
+
+Uso: cd src && python -m benchmarks.agent [--llm-delay 1.5] [--timeout 2.0] [--ollama]
+"""
+import time
+import argparse
+import tempfile
+import os
+from benchmarks.embeddings import percentile
+from agents.keyword_extraction import KeywordCache
+
+QUESTIONS = [
+    "Busque posts sobre user",
+    "busque posts sobre USER!",
+    "Quais posts falam de sunt aut facere?",
+    "posts sobre qui est esse",
+    "Encontre textos com dolorem eum magni",
+    "nesciunt quas odio",
+]
+
+
+class SimulatedLLM:
+    """LLM falso: devolve as palavras da pergunta após um atraso fixo"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def invoke(self, prompt: str) -> str:
+        time.sleep(self.delay)
+        return prompt.rsplit(":", 1)[-1].strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--llm-delay", type=float, default=1.5)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--ollama", action="store_true")
+    args = parser.parse_args()
+
+    from agents.elasticsearch_agent import SimpleElasticsearchAgent
+
+    llm = None if args.ollama else SimulatedLLM(args.llm_delay)
+    agent = SimpleElasticsearchAgent(llm=llm, keyword_timeout=args.timeout)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        agent.keywords.cache = KeywordCache(os.path.join(tmp, "keywords.sqlite"))
+        for label in ("frio", "quente"):
+            latencies = []
+            for _ in range(args.rounds if label == "quente" else 1):
+                for question in QUESTIONS:
+                    start = time.perf_counter()
+                    agent._handle_search(question)
+                    latencies.append((time.perf_counter() - start) * 1000)
+            print(f"   cache {label:<6} p50 {percentile(latencies, 50):8.1f} ms   p95 {percentile(latencies, 95):8.1f} ms "
+                  f"({len(latencies)} buscas)")
+    agent.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark de reuso de conexões com o Elasticsearch.
+
+Compara, contra o stand-in local (benchmarks.es_standin), um cliente novo por
+operação (comportamento antigo do init_app) com o pool compartilhado do
+ConnectionManager, nos clientes síncrono e assíncrono. Reporta conexões TCP
+abertas, tempo de setup do primeiro request e latência média.
+
+Uso: cd src && python -m benchmarks.connections [--ops 200] [--latency 0.002] [--concurrency 50]
+"""
+import time
+import asyncio
+import argparse
+from benchmarks.es_standin import StandInServer
+from elasticsearch_client.connection import ConnectionSettings, connections
+from elasticsearch_client.es_client import ElasticsearchClient, build_search_body
+from elasticsearch_client.async_es_client import AsyncElasticsearchClient
+
+
+def _report(label: str, server: StandInServer, ops: int, setup: float, wall: float):
+    print(f"   {label:<28} conexões {server.connections:4d}   requisições {server.requests:5d}   "
+          f"setup {setup * 1000:7.2f} ms   média {wall / ops * 1000:6.2f} ms/op")
+
+
+def bench_sync(server: StandInServer, ops: int):
+    server.reset_counters()
+    start = time.perf_counter()
+    setup = 0.0
+    for i in range(ops):
+        client = ElasticsearchClient("127.0.0.1", server.port)
+        client.count()
+        if i == 0:
+            setup = time.perf_counter() - start
+        client.es.close()
+    _report("síncrono, cliente por op", server, ops, setup, time.perf_counter() - start)
+
+    server.reset_counters()
+    connections.configure(ConnectionSettings(hosts=[f"http://127.0.0.1:{server.port}"]))
+    start = time.perf_counter()
+    for i in range(ops):
+        client = ElasticsearchClient()
+        client.count()
+        if i == 0:
+            setup = time.perf_counter() - start
+    _report("síncrono, pool compartilhado", server, ops, setup, time.perf_counter() - start)
+
+
+async def bench_async(server: StandInServer, ops: int, concurrency: int):
+    server.reset_counters()
+    start = time.perf_counter()
+    client = AsyncElasticsearchClient()
+    await client.check_connection()
+    setup = time.perf_counter() - start
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            # Sempre um novo AsyncElasticsearchClient: todos devem usar o mesmo pool
+            es_client = AsyncElasticsearchClient()
+            await es_client.es.search(index=es_client.index_name, body=build_search_body(f"user {i}", size=3))
+
+    await asyncio.gather(*(one(i) for i in range(ops)))
+    await client.close()
+    _report(f"assíncrono, {concurrency} concorrentes", server, ops, setup, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ops", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    with StandInServer(latency=args.latency) as server:
+        print(f"Stand-in do Elasticsearch em 127.0.0.1:{server.port} (latência {args.latency * 1000:.1f} ms)")
+        bench_sync(server, args.ops)
+        asyncio.run(bench_async(server, args.ops, args.concurrency))
+        connections.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark da etapa de embedding e da latência de busca kNN.
+
+Mede a vazão (docs/s) do HashingEmbedder com 1 ou mais processos e, se um
+Elasticsearch estiver acessível, a latência p50/p95 da ferramenta de busca
+semântica nos modos 'knn' e 'hybrid'.
+
+Uso: cd src && python -m benchmarks.embeddings [--docs 20000] [--processes 1 4]
+                                               [--es-host elasticsearch --queries 200]
+"""
+import time
+import asyncio
+import argparse
+from typing import List
+from benchmarks.serialization import make_hits
+from elasticsearch_client.embeddings import EmbeddingStage
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def bench_embedding(docs: int, processes: List[int]):
+    """Vazão da etapa de embedding"""
+    corpus = make_hits(docs)
+    print(f"Embedding de {docs} documentos")
+    for count in processes:
+        stage = EmbeddingStage(processes=count)
+        start = time.perf_counter()
+        for _ in stage.process(dict(doc) for doc in corpus):
+            pass
+        wall = time.perf_counter() - start
+        print(f"   {count} processo(s): {docs / wall:8.0f} docs/s (tempo total {wall:.2f}s)")
+
+
+async def bench_knn(host: str, port: int, queries: int, k: int, num_candidates: int):
+    """Latência da busca semântica contra um Elasticsearch real"""
+    from elasticsearch_client.async_es_client import AsyncElasticsearchClient
+
+    client = AsyncElasticsearchClient(host, port)
+    terms = ["user", "email", "sunt aut facere", "qui est esse", "dolorem eum magni", "nesciunt quas odio"]
+    try:
+        for mode in ("knn", "hybrid"):
+            latencies = []
+            for i in range(queries):
+                start = time.perf_counter()
+                await client.semantic_search(terms[i % len(terms)], k=k, num_candidates=num_candidates, mode=mode)
+                latencies.append((time.perf_counter() - start) * 1000)
+            print(f"   {mode:<6} p50 {percentile(latencies, 50):7.2f} ms   p95 {percentile(latencies, 95):7.2f} ms "
+                  f"(k={k}, num_candidates={num_candidates})")
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=20000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1])
+    parser.add_argument("--es-host")
+    parser.add_argument("--es-port", type=int, default=9200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--num-candidates", type=int, default=100)
+    args = parser.parse_args()
+
+    bench_embedding(args.docs, args.processes)
+    if args.es_host:
+        print(f"\nBusca semântica em {args.es_host}:{args.es_port}")
+        asyncio.run(bench_knn(args.es_host, args.es_port, args.queries, args.k, args.num_candidates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,620 @@
+"""Servidor HTTP local que imita o Elasticsearch para os benchmarks.
+
+Guarda os documentos em memória (bulk, get, mget, msearch, agregações, aliases,
+reindex, rollover, índices, mappings e settings), conta conexões TCP, requisições e
+escritas e permite injetar latência por requisição. Não precisa de rede nem de um
+cluster de verdade: as buscas não pontuam, devolvem os primeiros documentos (ou os
+mais novos, quando ordenadas por `created_at`).
+"""
+import sys
+import json
+import time
+import itertools
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+HEADERS = {"X-Elastic-Product": "Elasticsearch", "Content-Type": "application/json"}
+
+
+def make_doc(i: int) -> Dict[str, Any]:
+    return {
+        "id": f"post_{i}",
+        "title": f"sunt aut facere {i}",
+        "content": "quia et suscipit suscipit recusandae consequuntur expedita et cum",
+        "category": "blog_post",
+        "tags": ["user_1"],
+        "created_at": "2024-01-01T00:00:00",
+        "metadata": {"user_name": "Leanne Graham"},
+    }
+
+
+def _project(source: Dict[str, Any], includes: Optional[List[str]],
+             excludes: Optional[List[str]] = None) -> Dict[str, Any]:
+    if includes:
+        source = {k: v for k, v in source.items() if k in includes}
+    if excludes:
+        source = {k: v for k, v in source.items() if k not in excludes}
+    return source
+
+
+def _source_filter(body: Dict[str, Any]) -> Tuple[Optional[List[str]], Optional[List[str]]]:
+    """(includes, excludes) a partir do `_source` do corpo da busca"""
+    source = body.get("_source")
+    if isinstance(source, list):
+        return source, None
+    if isinstance(source, dict):
+        return source.get("includes"), source.get("excludes")
+    return None, None
+
+
+def _values(doc: Dict[str, Any], field: str) -> List[Any]:
+    """Valores de um campo (com caminho 'a.b'); listas contam cada elemento"""
+    value: Any = doc
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return []
+        value = value.get(part)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _matches(doc: Dict[str, Any], query: Optional[Dict[str, Any]]) -> bool:
+    """Subconjunto das consultas de filtro (bool.filter/must/should, term, terms, range, multi_match por substring)"""
+    if not query or "match_all" in query:
+        return True
+    if "bool" in query:
+        clauses = query["bool"].get("filter", []) + query["bool"].get("must", [])
+        should = query["bool"].get("should", [])
+        return all(_matches(doc, clause) for clause in clauses) and \
+            (not should or any(_matches(doc, clause) for clause in should))
+    if "term" in query:
+        (field, value), = query["term"].items()
+        return value in _values(doc, field)
+    if "terms" in query:
+        (field, values), = query["terms"].items()
+        return any(v in values for v in _values(doc, field))
+    if "range" in query:
+        (field, bounds), = query["range"].items()
+        checks = {"gte": lambda v, b: v >= b, "gt": lambda v, b: v > b,
+                  "lte": lambda v, b: v <= b, "lt": lambda v, b: v < b}
+        return any(all(checks[op](v, b) for op, b in bounds.items() if op in checks)
+                   for v in _values(doc, field))
+    if "multi_match" in query:
+        text = query["multi_match"]["query"].lower()
+        return any(text in str(v).lower() for field in query["multi_match"]["fields"]
+                   for v in _values(doc, field.split("^")[0]))
+    return True
+
+
+def _date_bucket(value: str, interval: str) -> datetime:
+    """Início do intervalo de calendário de uma data ISO"""
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    if interval == "minute":
+        return moment.replace(second=0, microsecond=0)
+    if interval == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    if interval == "quarter":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    if interval == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def _epoch_ms(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=timezone.utc).timestamp() * 1000
+
+
+def _date_key(moment: datetime) -> Dict[str, Any]:
+    return {"key": int(moment.replace(tzinfo=timezone.utc).timestamp() * 1000),
+            "key_as_string": moment.strftime("%Y-%m-%dT%H:%M:%S.000Z")}
+
+
+def _source_values(doc: Dict[str, Any], source: Dict[str, Any]) -> List[Any]:
+    """Valores de uma fonte do composite (terms ou date_histogram)"""
+    if "terms" in source:
+        return _values(doc, source["terms"]["field"])
+    spec = source["date_histogram"]
+    return [_date_key(_date_bucket(v, spec["calendar_interval"]))["key"] for v in _values(doc, spec["field"])]
+
+
+def aggregate(docs: List[Dict[str, Any]], aggs: Dict[str, Any]) -> Dict[str, Any]:
+    """Subconjunto das agregações do Elasticsearch calculado sobre os documentos em memória"""
+    results = {}
+    for name, spec in aggs.items():
+        if "terms" in spec:
+            field = spec["terms"]["field"]
+            counts = Counter(v for doc in docs for v in _values(doc, field))
+            top = counts.most_common(spec["terms"].get("size", 10))
+            buckets = [{"key": key, "doc_count": n} for key, n in top]
+            for bucket in buckets if spec.get("aggs") else []:
+                bucket.update(aggregate([doc for doc in docs if bucket["key"] in _values(doc, field)],
+                                        spec["aggs"]))
+            results[name] = {
+                "doc_count_error_upper_bound": 0,
+                "sum_other_doc_count": sum(counts.values()) - sum(n for _, n in top),
+                "buckets": buckets
+            }
+        elif "date_histogram" in spec:
+            field, interval = spec["date_histogram"]["field"], spec["date_histogram"]["calendar_interval"]
+            counts = Counter(_date_bucket(v, interval) for doc in docs for v in _values(doc, field))
+            results[name] = {"buckets": [{**_date_key(moment), "doc_count": n}
+                                         for moment, n in sorted(counts.items())]}
+        elif "max" in spec:
+            values = [_epoch_ms(v) for doc in docs for v in _values(doc, spec["max"]["field"])]
+            results[name] = {"value": max(values, default=None)}
+        elif "stats" in spec:
+            values = [_epoch_ms(v) for doc in docs for v in _values(doc, spec["stats"]["field"])]
+            results[name] = {"count": len(values), "min": min(values, default=None),
+                             "max": max(values, default=None), "sum": sum(values),
+                             "avg": sum(values) / len(values) if values else None}
+        elif "composite" in spec:
+            sources = [next(iter(source.items())) for source in spec["composite"]["sources"]]
+            counts = Counter(
+                key for doc in docs
+                for key in itertools.product(*(_source_values(doc, source) for _, source in sources))
+            )
+            after = spec["composite"].get("after")
+            start = tuple(after[source_name] for source_name, _ in sources) if after else None
+            keys = [key for key in sorted(counts) if start is None or key > start]
+            page = keys[:spec["composite"].get("size", 10)]
+            buckets = [{"key": dict(zip((n for n, _ in sources), key)), "doc_count": counts[key]} for key in page]
+            results[name] = {"buckets": buckets}
+            if buckets:
+                results[name]["after_key"] = buckets[-1]["key"]
+    return results
+
+
+def _index_filter(query: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Partição pedida por um filtro `term` em `_index` (bool.filter), se houver"""
+    for clause in ((query or {}).get("bool") or {}).get("filter", []):
+        if "_index" in clause.get("term", {}):
+            return clause["term"]["_index"]
+    return None
+
+
+def _sorts_by_recent(body: Dict[str, Any]) -> bool:
+    sort = body.get("sort") or []
+    return bool(sort) and isinstance(sort[0], dict) and "created_at" in sort[0]
+
+
+def _millis(value: Any) -> Optional[float]:
+    """Converte o `timeout` de uma busca ('500ms', '2s') em segundos"""
+    if not isinstance(value, str):
+        return None
+    if value.endswith("ms"):
+        return float(value[:-2]) / 1000
+    if value.endswith("s"):
+        return float(value[:-1])
+    return None
+
+
+def _not_found(reason: str) -> Tuple[int, Any]:
+    return 404, {"error": {"type": "index_not_found_exception", "reason": reason}, "status": 404}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # mantém a conexão aberta (keep-alive)
+    disable_nagle_algorithm = True  # respostas pequenas não esperam o ACK atrasado do cliente
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _raw_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, payload: Any):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for name, value in HEADERS.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    # Rotas -----------------------------------------------------------------
+
+    def _search(self, index: str, body: Dict[str, Any], sleep: bool = True) -> Tuple[int, Any]:
+        if index is None and body.get("pit"):
+            # Busca no point-in-time: o índice é o de quando ele foi aberto
+            index = self.server.pit_indices.get(body["pit"]["id"])
+            if index is None:
+                return 404, {"error": {"type": "search_context_missing_exception",
+                                       "reason": "No search context found"}, "status": 404}
+        index = _index_filter(body.get("query")) or index
+        # Com `timeout` menor que a latência simulada a busca volta parcial, como nos shards reais
+        timeout = _millis(body.get("timeout"))
+        timed_out = timeout is not None and timeout < self.server.latency
+        if sleep:
+            time.sleep(timeout if timed_out else self.server.latency)
+        size = body.get("size", 10)
+        includes, excludes = _source_filter(body)
+        stored = self.server.entries(index)
+        if stored and _sorts_by_recent(body):
+            # Como o index sort: created_at desc, id asc, continuando do search_after
+            recent = self.server.recent(index, stored)
+            after = body.get("search_after")
+            if after:
+                recent = [item for item in recent if (-item[0], item[1]) > (-after[0], after[1])]
+            hits = [{"_index": partition, "_id": doc_id, "_score": None,
+                     "_source": _project(source, includes, excludes), "sort": [millis, doc_id]}
+                    for millis, doc_id, partition, source in recent[:size]]
+        elif stored:
+            hits = [{"_index": partition, "_id": doc_id, "_score": 1.0,
+                     "_source": _project(source, includes, excludes), "sort": [1.0, doc_id]}
+                    for partition, doc_id, source in itertools.islice(stored, size)]
+        else:
+            hits = [{"_id": f"post_{i}", "_score": 1.0, "_source": _project(make_doc(i), includes, excludes),
+                     "sort": [1.0, f"post_{i}"]}
+                    for i in range(1, size + 1)]
+        if timed_out:
+            hits = hits[:len(hits) // 2]
+        response = {"took": 1, "timed_out": timed_out,
+                    "hits": {"total": {"value": len(stored), "relation": "eq"}, "hits": hits}}
+        if body.get("aggs") or body.get("aggregations"):
+            aggs = body.get("aggs") or body["aggregations"]
+            # `_index` como campo agregável: cada documento leva o nome da sua partição
+            by_index = '"_index"' in json.dumps(aggs)
+            matched = [{**source, "_index": partition} if by_index else source
+                       for partition, _, source in stored if _matches(source, body.get("query"))]
+            response["hits"]["total"]["value"] = len(matched)
+            response["aggregations"] = aggregate(matched, aggs)
+        if body.get("profile"):
+            response["profile"] = {"shards": [{
+                "id": f"[stand-in][{index}][0]",
+                "searches": [{"query": [{"type": "BooleanQuery", "description": json.dumps(body.get("query")),
+                                         "time_in_nanos": int(self.server.latency * 1e9)}]}],
+                "aggregations": []
+            }]}
+        return 200, response
+
+    def _msearch(self, default_index: Optional[str], raw: bytes) -> Tuple[int, Any]:
+        lines = [json.loads(line) for line in raw.splitlines() if line.strip()]
+        time.sleep(self.server.latency)
+        responses = [self._search(header.get("index") or default_index, body, sleep=False)[1]
+                     for header, body in zip(lines[::2], lines[1::2])]
+        return 200, {"took": 1, "responses": responses}
+
+    def _bulk(self, default_index: Optional[str], raw: bytes) -> Tuple[int, Any]:
+        lines = [json.loads(line) for line in raw.splitlines() if line.strip()]
+        items = []
+        with self.server.lock:
+            for meta_line, source in zip(lines[::2], lines[1::2]):
+                op, meta = next(iter(meta_line.items()))
+                index = self.server.write_index(meta.get("_index") or default_index)
+                doc_id = meta.get("_id") or str(len(self.server.indices.get(index, {})))
+                self.server.indices.setdefault(index, {})[doc_id] = source
+                self.server.stamp(index, doc_id)
+                self.server.writes += 1
+                items.append({op: {"_index": index, "_id": doc_id, "status": 201, "result": "created"}})
+        return 200, {"took": 1, "errors": False, "items": items}
+
+    def _mget(self, index: Optional[str], body: Dict[str, Any], query: Dict[str, List[str]]) -> Tuple[int, Any]:
+        if index is not None and not self.server.resolve(index):
+            return _not_found(index)
+        includes = query.get("_source_includes", [""])[0].split(",") if "_source_includes" in query else None
+        excludes = query.get("_source_excludes", [""])[0].split(",") if "_source_excludes" in query else None
+        requests = [{"_id": i} for i in body.get("ids", [])] + body.get("docs", [])
+        docs = []
+        for request in requests:
+            name = request.get("_index") or index
+            source = self.server.documents(name).get(request["_id"])
+            if source is None:
+                docs.append({"_index": name, "_id": request["_id"], "found": False})
+            else:
+                docs.append({"_index": name, "_id": request["_id"], "found": True,
+                             "_source": _project(source, includes, excludes)})
+        return 200, {"docs": docs}
+
+    def _stats(self, indices: List[str]) -> Dict[str, Any]:
+        stats = {}
+        for index in indices:
+            docs = len(self.server.indices[index])
+            primaries = {"docs": {"count": docs}, "store": {"size_in_bytes": docs * 1024}}
+            shard = {"routing": {"primary": True}, "refresh": {"total": 1},
+                     "seq_no": {"max_seq_no": self.server.max_seq_no(index)}}
+            stats[index] = {"primaries": primaries, "shards": {"0": [shard]}}
+        docs = sum(len(self.server.indices[index]) for index in indices)
+        primaries = {"docs": {"count": docs}, "store": {"size_in_bytes": docs * 1024}}
+        return {"_all": {"primaries": primaries, "total": primaries}, "indices": stats}
+
+    def _aliases(self, actions: List[Dict[str, Any]]) -> Tuple[int, Any]:
+        """_aliases: add, remove e remove_index aplicados juntos (atômico sob o lock)"""
+        with self.server.lock:
+            for action in actions:
+                (kind, spec), = action.items()
+                if kind == "add":
+                    props = {k: v for k, v in spec.items() if k not in ("index", "alias")}
+                    self.server.aliases.setdefault(spec["alias"], {})[spec["index"]] = props
+                elif kind == "remove":
+                    self.server.aliases.get(spec["alias"], {}).pop(spec["index"], None)
+                elif kind == "remove_index":
+                    self.server.drop_index(spec["index"])
+            for alias in [a for a, indices in self.server.aliases.items() if not indices]:
+                del self.server.aliases[alias]
+        return 200, {"acknowledged": True}
+
+    def _reindex(self, body: Dict[str, Any]) -> Tuple[int, Any]:
+        sources = body["source"]["index"]
+        sources = sources if isinstance(sources, list) else [sources]
+        query = body["source"].get("query")
+        dest = self.server.write_index(body["dest"]["index"])
+        with self.server.lock:
+            # _index e _seq_no consultáveis, como na recópia da migração
+            copied = {doc_id: source for name in sources for index, doc_id, source in self.server.entries(name)
+                      if _matches({**source, "_index": index, "_seq_no": self.server.seq_nos.get((index, doc_id), -1)},
+                                  query)}
+            self.server.indices.setdefault(dest, {}).update(copied)
+            for doc_id in copied:
+                self.server.stamp(dest, doc_id)
+            self.server.writes += len(copied)
+        return 200, {"took": 1, "timed_out": False, "total": len(copied), "created": len(copied),
+                     "updated": 0, "failures": []}
+
+    def _rollover(self, alias: str, body: Dict[str, Any], dry_run: bool) -> Tuple[int, Any]:
+        """Rollover de um alias de escrita: só `max_docs` é avaliado (tamanho e idade nunca disparam)"""
+        if alias not in self.server.aliases:
+            return _not_found(alias)
+        with self.server.lock:
+            old = self.server.write_index(alias)
+            prefix, _, generation = old.rpartition("-")
+            new = f"{prefix}-{int(generation) + 1:06d}"
+            max_docs = body.get("conditions", {}).get("max_docs")
+            conditions = {f"[max_docs: {max_docs}]": len(self.server.indices.get(old, {})) >= max_docs} \
+                if max_docs else {}
+            rolled = any(conditions.values())
+            if rolled and not dry_run:
+                self.server.indices[new] = {}
+                self.server.mappings[new] = body.get("mappings", self.server.mappings.get(old, {}))
+                self.server.settings[new] = dict(body.get("settings", {}))
+                for name, props in body.get("aliases", {}).items():
+                    self.server.aliases.setdefault(name, {})[new] = props
+                self.server.aliases[alias][old] = {"is_write_index": False}
+                self.server.aliases[alias][new] = {"is_write_index": True}
+        return 200, {"acknowledged": rolled, "old_index": old, "new_index": new, "rolled_over": rolled and not dry_run,
+                     "dry_run": dry_run, "conditions": conditions}
+
+    def _route(self, method: str) -> Tuple[int, Any]:
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        parts = [p for p in url.path.split("/") if p]
+        raw = self._raw_body()
+        ndjson = url.path.endswith("/_bulk") or url.path.endswith("/_msearch")
+        body = json.loads(raw) if raw and not ndjson else {}
+        index = parts[0] if parts and not parts[0].startswith("_") else None
+        action = parts[1] if index and len(parts) > 1 else (parts[0] if parts else "")
+
+        if not parts:
+            return 200, {"version": {"number": "8.11.0"}, "tagline": "You Know, for Search"}
+        if action == "_bulk":
+            return self._bulk(index, raw)
+        if action == "_msearch":
+            return self._msearch(index, raw)
+        if action == "_mget":
+            return self._mget(index, body, query)
+        if action == "_search":
+            return self._search(index, body)
+        if action == "_pit" and method == "DELETE":
+            with self.server.lock:
+                freed = self.server.pit_indices.pop(body.get("id"), None) is not None
+            return 200, {"succeeded": True, "num_freed": int(freed)}
+        if action == "_tasks":
+            # As buscas respondem de forma síncrona, então não há tarefa pendurada para listar
+            with self.server.lock:
+                self.server.task_lookups += 1
+            return 200, {"nodes": {}}
+        if action == "_count":
+            return 200, {"count": len(self.server.entries(index)) or 100}
+        if action == "_aliases":
+            return self._aliases(body.get("actions", []))
+        if action == "_reindex":
+            return self._reindex(body)
+        if action == "_rollover":
+            return self._rollover(index, body, query.get("dry_run", ["false"])[0] == "true")
+        if action == "_alias":
+            name = parts[-1] if parts[-1] != "_alias" else None
+            found = {i: {"aliases": {a: props for a, props in self.server.aliases_of(i).items()
+                                     if name is None or a == name}}
+                     for i in (self.server.resolve(index) if index else self.server.aliases.get(name, {}))}
+            return (200, found) if found else (404, {"error": f"alias [{name}] missing", "status": 404})
+        if index is None:
+            return _not_found(url.path)
+
+        targets = self.server.resolve(index)
+        if len(parts) == 1:
+            if method == "HEAD":
+                return (200 if targets else 404), {}
+            if method == "PUT":
+                if targets:
+                    return 400, {"error": {"type": "resource_already_exists_exception",
+                                           "reason": f"index [{index}] already exists"}, "status": 400}
+                with self.server.lock:
+                    self.server.indices.setdefault(index, {})
+                    self.server.mappings[index] = body.get("mappings", {})
+                    self.server.settings[index] = dict(body.get("settings", {}))
+                    for alias, props in body.get("aliases", {}).items():
+                        self.server.aliases.setdefault(alias, {})[index] = props
+                return 200, {"acknowledged": True, "index": index}
+            if method == "DELETE":
+                if any(name in self.server.aliases for name in index.split(",")):
+                    return 400, {"error": {"type": "illegal_argument_exception",
+                                           "reason": "The provided expression matches an alias"}, "status": 400}
+                with self.server.lock:
+                    for name in index.split(","):
+                        self.server.drop_index(name)
+                return 200, {"acknowledged": True}
+        if not targets:
+            return _not_found(index)
+        if action == "_mapping":
+            return 200, {i: {"mappings": self.server.mappings.get(i, {})} for i in targets}
+        if action == "_settings":
+            if method == "PUT":
+                for i in targets:
+                    self.server.settings.setdefault(i, {}).update(body)
+                return 200, {"acknowledged": True}
+            return 200, {i: {"settings": dict(self.server.settings.get(i, {}))} for i in targets}
+        if action == "_pit":
+            with self.server.lock:
+                self.server.pits += 1
+                pit_id = f"pit-{self.server.pits}"
+                self.server.pit_indices[pit_id] = index
+                return 200, {"id": pit_id}
+        if action == "_stats":
+            return 200, self._stats(targets)
+        if action == "_refresh":
+            return 200, {"_shards": {"total": 1, "successful": 1, "failed": 0}}
+        if action == "_doc" and len(parts) == 3:
+            source = self.server.documents(index).get(parts[2])
+            if source is None:
+                return 404, {"_index": index, "_id": parts[2], "found": False}
+            return 200, {"_index": index, "_id": parts[2], "found": True, "_source": source}
+        return _not_found(url.path)
+
+    def _handle(self, method: str):
+        with self.server.lock:
+            self.server.requests += 1
+        if self.server.latency and "/_search" not in self.path:
+            time.sleep(self.server.latency)
+        status, payload = self._route(method)
+        self._send(status, payload)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def do_HEAD(self):
+        self._handle("HEAD")
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Stand-in do Elasticsearch em uma thread; use como context manager"""
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, handler=StandInHandler):
+        super().__init__(("127.0.0.1", port), handler)
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.indices: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.settings: Dict[str, Dict[str, Any]] = {}
+        self.mappings: Dict[str, Dict[str, Any]] = {}
+        self.aliases: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.connections = 0
+        self.requests = 0
+        self.writes = 0
+        # _seq_no de cada (índice, id) gravado por _bulk ou _reindex; um só contador crescente
+        self.seq_nos: Dict[Tuple[str, str], int] = {}
+        self._seq_no = itertools.count()
+        self.pits = 0
+        self.pit_indices: Dict[str, str] = {}
+        self.task_lookups = 0
+        self._recent: Tuple[Any, List[Tuple[float, str, str, Dict[str, Any]]]] = (None, [])
+        self._thread: Optional[threading.Thread] = None
+
+    def handle_error(self, request, client_address):
+        # Clientes que desistem por prazo ou cancelamento fecham a conexão no meio da resposta
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    def resolve(self, name: Optional[str]) -> List[str]:
+        """Índices concretos de um nome: lista separada por vírgulas, alias ou índice"""
+        indices: List[str] = []
+        for part in (name or "").split(","):
+            if part in self.aliases:
+                indices.extend(sorted(self.aliases[part]))
+            elif part in self.indices:
+                indices.append(part)
+        return indices
+
+    def aliases_of(self, index: str) -> Dict[str, Dict[str, Any]]:
+        return {alias: indices[index] for alias, indices in self.aliases.items() if index in indices}
+
+    def write_index(self, name: str) -> str:
+        """Índice que recebe escritas feitas pelo nome (o is_write_index de um alias)"""
+        indices = self.aliases.get(name)
+        if not indices:
+            return name
+        if len(indices) == 1:
+            return next(iter(indices))
+        return next(index for index, props in indices.items() if props.get("is_write_index"))
+
+    def recent(self, name: str,
+               stored: List[Tuple[str, str, Dict[str, Any]]]) -> List[Tuple[float, str, str, Dict[str, Any]]]:
+        """Documentos em (created_at em ms, id, partição, source) na ordem do index sort; refeito só após escritas"""
+        key = (name, self.writes, len(stored))
+        if self._recent[0] != key:
+            self._recent = (key, sorted(((_epoch_ms(source["created_at"]), doc_id, partition, source)
+                                         for partition, doc_id, source in stored if source.get("created_at")),
+                                        key=lambda item: (-item[0], item[1])))
+        return self._recent[1]
+
+    def entries(self, name: Optional[str]) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """(partição, id, source) de cada cópia: um id gravado em duas partições aparece duas vezes,
+        como nas buscas e contagens do Elasticsearch"""
+        return [(index, doc_id, source)
+                for index in self.resolve(name) for doc_id, source in self.indices[index].items()]
+
+    def documents(self, name: Optional[str]) -> Dict[str, Dict[str, Any]]:
+        """Documentos por id, para GET/_mget (com várias partições, a mais nova vence)"""
+        targets = self.resolve(name)
+        if len(targets) == 1:
+            return self.indices[targets[0]]
+        return {doc_id: source for index in targets for doc_id, source in self.indices[index].items()}
+
+    def stamp(self, index: str, doc_id: str):
+        self.seq_nos[(index, doc_id)] = next(self._seq_no)
+
+    def max_seq_no(self, index: str) -> int:
+        """Maior _seq_no entre os documentos do índice (-1 se nenhum foi escrito por _bulk/_reindex)"""
+        return max((seq for (name, _), seq in self.seq_nos.items() if name == index), default=-1)
+
+    def drop_index(self, index: str):
+        self.indices.pop(index, None)
+        self.mappings.pop(index, None)
+        self.settings.pop(index, None)
+        for alias in list(self.aliases):
+            self.aliases[alias].pop(index, None)
+            if not self.aliases[alias]:
+                del self.aliases[alias]
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def reset_counters(self):
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+            self.writes = 0
+
+    def __enter__(self) -> "StandInServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
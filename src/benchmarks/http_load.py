@@ -0,0 +1,110 @@
+"""Teste de carga do transporte HTTP do servidor MCP.
+
+Para cada quantidade de workers, sobe `python -m mcp_server.server --transport http`
+apontando para o stand-in local do Elasticsearch e dispara chamadas concorrentes
+de tools/call (conexões keep-alive, gzip) durante --duration segundos. Reporta
+requisições/s e latências p50/p99 para mostrar o ganho com mais workers (o
+limite prático é o número de núcleos da máquina).
+
+Uso: cd src && python -m benchmarks.http_load [--workers 1 2 4] [--concurrency 64] [--duration 10]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from typing import List
+import aiohttp
+from benchmarks.embeddings import percentile
+from benchmarks.es_standin import StandInServer, make_doc
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers: int, port: int, es_port: int) -> subprocess.Popen:
+    env = {**os.environ, "ELASTICSEARCH_HOSTS": f"http://127.0.0.1:{es_port}"}
+    command = [sys.executable, "-m", "mcp_server.server", "--transport", "http", "--host", "127.0.0.1",
+               "--port", str(port), "--workers", str(workers), "--skip-setup"]
+    return subprocess.Popen(command, env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            stdout=subprocess.DEVNULL)
+
+
+async def wait_ready(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(url) as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"Servidor não respondeu em {url}")
+
+
+async def load(url: str, concurrency: int, duration: float, queries: int):
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector) as session:
+        async def client(worker: int):
+            nonlocal errors
+            i = worker
+            while time.perf_counter() < deadline:
+                body = {"jsonrpc": "2.0", "id": i, "method": "tools/call",
+                        "params": {"name": "search_documents",
+                                   "arguments": {"query": f"user {i % queries}", "size": 10}}}
+                start = time.perf_counter()
+                async with session.post(url, data=json.dumps(body),
+                                        headers={"Content-Type": "application/json"}) as response:
+                    payload = await response.json()
+                latencies.append(time.perf_counter() - start)
+                if "error" in payload or "error" in payload.get("result", {}):
+                    errors += 1
+                i += concurrency
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(w) for w in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return len(latencies) / elapsed, latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--queries", type=int, default=500, help="consultas distintas (o resto vem do cache)")
+    parser.add_argument("--es-latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    with StandInServer(latency=args.es_latency) as es:
+        es.indices["sample_data"] = {f"post_{i}": make_doc(i) for i in range(1, 101)}
+        print(f"Carga HTTP: {args.concurrency} clientes por {args.duration:.0f}s, {os.cpu_count()} CPU(s)")
+        for workers in args.workers:
+            port = free_port()
+            process = start_server(workers, port, es.port)
+            try:
+                asyncio.run(wait_ready(f"http://127.0.0.1:{port}/health"))
+                rps, latencies, errors = asyncio.run(
+                    load(f"http://127.0.0.1:{port}/mcp", args.concurrency, args.duration, args.queries)
+                )
+                print(f"   {workers} worker(s): {rps:8.0f} req/s   p50 {percentile(latencies, 50) * 1000:6.1f} ms   "
+                      f"p99 {percentile(latencies, 99) * 1000:6.1f} ms   erros {errors}")
+            finally:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    main()
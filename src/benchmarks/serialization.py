@@ -0,0 +1,77 @@
+"""Micro-benchmark de serialização de respostas de ferramentas.
+
+Compara o caminho antigo (json.dumps com indent=2 no conteúdo e de novo no
+envelope) com o MessageEncoder (JSON compacto, orjson quando disponível).
+
+Uso: cd src && python -m benchmarks.serialization [--hits 1000] [--rounds 200]
+"""
+import json
+import time
+import argparse
+from typing import Any, Callable, Dict, List
+from mcp_server.serialization import JsonSerializer, MessageEncoder, orjson, OrjsonSerializer
+
+
+def make_hits(n: int) -> List[Dict[str, Any]]:
+    """Gera documentos no formato do índice sample_data"""
+    return [
+        {
+            "id": f"post_{i}",
+            "title": f"sunt aut facere repellat provident occaecati {i}",
+            "content": "quia et suscipit suscipit recusandae consequuntur expedita et cum " * 4,
+            "category": "blog_post",
+            "tags": ["sample", "jsonplaceholder", f"user_{i % 10}"],
+            "created_at": "2024-01-01T12:00:00.000000",
+            "updated_at": "2024-01-01T12:00:00.000000",
+            "metadata": {"user_id": i % 10, "user_name": "Leanne Graham", "user_email": "Sincere@april.biz"}
+        }
+        for i in range(n)
+    ]
+
+
+def legacy_encode(results: List[Dict[str, Any]]) -> bytes:
+    """Caminho anterior: conteúdo indentado + envelope com json.dumps"""
+    text = json.dumps({"results": results, "total": len(results), "query": "user"}, indent=2)
+    message = {"jsonrpc": "2.0", "id": 1, "result": {"content": [{"type": "text", "text": text}]}}
+    return json.dumps(message).encode("utf-8")
+
+
+def encoder_encode(encoder: MessageEncoder) -> Callable[[List[Dict[str, Any]]], bytes]:
+    def encode(results: List[Dict[str, Any]]) -> bytes:
+        text = encoder.text({"results": results, "total": len(results), "query": "user"})
+        message = {"jsonrpc": "2.0", "id": 1, "result": {"content": [{"type": "text", "text": text}]}}
+        return encoder.encode(message)
+    return encode
+
+
+def measure(encode: Callable[[List[Dict[str, Any]]], bytes], hits: List[Dict[str, Any]], rounds: int):
+    """Retorna (ms por resposta, bytes da resposta)"""
+    size = len(encode(hits))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        encode(hits)
+    return (time.perf_counter() - start) / rounds * 1000, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hits", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    hits = make_hits(args.hits)
+    cases = [("legado (indent=2, json)", legacy_encode),
+             ("compacto (json)", encoder_encode(MessageEncoder(JsonSerializer())))]
+    if orjson is not None:
+        cases.append(("compacto (orjson)", encoder_encode(MessageEncoder(OrjsonSerializer()))))
+
+    print(f"Resposta com {args.hits} hits, {args.rounds} rodadas")
+    baseline = None
+    for name, encode in cases:
+        ms, size = measure(encode, hits, args.rounds)
+        baseline = baseline or ms
+        print(f"   {name:<26} {ms:8.3f} ms/resposta  {size:>9} bytes  ({baseline / ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
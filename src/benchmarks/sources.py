@@ -0,0 +1,126 @@
+"""Benchmark do conector de dados de exemplo (busca concorrente + cache HTTP).
+
+Sobe um servidor local com fixtures no formato do JSONPlaceholder (/posts
+paginado e /users, com ETag e latência configurável) e mede: a carga fria,
+a carga quente (revalidada com 304, ou sem requisições dentro de max_age) e a
+carga com a origem fora do ar (cópia em disco após o timeout).
+
+Uso: cd src && python -m benchmarks.sources [--posts 100] [--latency 0.2] [--concurrency 4]
+"""
+import json
+import time
+import hashlib
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from elasticsearch_client.sources import HttpCache, SampleDataSource, SourceFetcher
+
+
+def make_fixtures(posts: int):
+    users = [{"id": i, "name": f"User {i}", "email": f"user{i}@example.com"} for i in range(1, 11)]
+    posts = [{"id": i, "userId": i % 10 + 1, "title": f"post {i}", "body": f"body of post {i}"}
+             for i in range(1, posts + 1)]
+    return {"/users": users, "/posts": posts}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        if server.down:
+            time.sleep(server.latency * 10)
+        else:
+            time.sleep(server.latency)
+        url = urlsplit(self.path)
+        data = server.fixtures.get(url.path)
+        if data is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        query = parse_qs(url.query)
+        if "_page" in query:
+            limit = int(query.get("_limit", ["10"])[0])
+            start = (int(query["_page"][0]) - 1) * limit
+            data = data[start:start + limit]
+        body = json.dumps(data).encode("utf-8")
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+
+        with server.lock:
+            server.requests += 1
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fixtures, latency: float):
+        super().__init__(("127.0.0.1", 0), FixtureHandler)
+        self.fixtures = fixtures
+        self.latency = latency
+        self.down = False
+        self.requests = 0
+        self.lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+def run(label: str, server: FixtureServer, cache: HttpCache, args, max_age: float = 0.0):
+    fetcher = SourceFetcher(server.url, concurrency=args.concurrency, timeout=args.timeout,
+                            max_age=max_age, cache=cache)
+    source = SampleDataSource(fetcher, max_posts=args.posts, page_size=args.page_size)
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in source.records():
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<22} {count:5d} docs   primeiro doc {first * 1000:7.1f} ms   total {elapsed * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=1.0)
+    args = parser.parse_args()
+
+    server = FixtureServer(make_fixtures(args.posts), args.latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = HttpCache(tmp)
+        print(f"Fixtures em {server.url} (latência {args.latency * 1000:.0f} ms, concorrência {args.concurrency})")
+        run("frio", server, cache, args)
+        run("quente (304)", server, cache, args)
+        run("quente (max_age)", server, cache, args, max_age=300)
+        server.down = True
+        run("origem fora do ar", server, cache, args)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Benchmark do transporte stdio (NDJSON) do servidor MCP.
+
+Alimenta o StdioTransport, em pedaços de 64 KB como um pipe, com milhares de
+frames: requisições tools/list, notificações e lotes (com e sem notificações),
+precedidos por algumas chamadas tools/call lentas (latência injetada no
+stand-in local do Elasticsearch). Reporta frames/s e a latência de cada
+resposta de tools/list (desde a entrega do pedaço com o seu frame), e confere que:
+
+- toda requisição recebe exatamente uma resposta (lotes, um array) e
+  notificações não recebem nenhuma;
+- as respostas de tools/list não esperam as chamadas lentas que vieram antes
+  (p99 abaixo da latência de uma chamada lenta).
+
+Sai com 1 se alguma conferência falhar.
+
+Uso: cd src && python -m benchmarks.stdio [--frames 5000] [--batch-size 10] [--slow-calls 4] [--slow 1.0]
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, List, Set, Tuple
+from benchmarks.embeddings import percentile
+from benchmarks.es_standin import StandInServer, make_doc
+from elasticsearch_client.connection import ConnectionSettings, connections
+from elasticsearch_client.mappings import DEFAULT_INDEX
+from mcp_server.transport import StdioTransport
+
+CHUNK_BYTES = 64 * 1024
+
+
+class CaptureOutput:
+    """Saída do transporte: guarda cada frame escrito e o instante da escrita"""
+
+    def __init__(self):
+        self.frames: List[Tuple[float, bytes]] = []
+
+    def write(self, data: bytes):
+        self.frames.append((time.perf_counter(), data))
+
+    def flush(self):
+        pass
+
+
+def _request(msg_id: Any, method: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": msg_id, "method": method, "params": params or {}}
+
+
+def _notification() -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "method": "notifications/initialized"}
+
+
+def make_frames(count: int, batch_size: int, slow_calls: int) -> Tuple[List[Any], Set[Any], Set[Any], int]:
+    """Frames a enviar, ids das chamadas lentas, ids de tools/list e quantos frames de resposta esperar"""
+    frames: List[Any] = []
+    slow_ids = {f"slow-{i}" for i in range(slow_calls)}
+    for msg_id in sorted(slow_ids):
+        frames.append(_request(msg_id, "tools/call", {"name": "search_documents",
+                                                      "arguments": {"query": f"lenta {msg_id}"}}))
+    list_ids: Set[Any] = set()
+    replies = slow_calls
+    for i in range(count):
+        if i % 50 == 49:
+            frames.append([_notification() for _ in range(batch_size)])
+        elif i % 10 == 9:
+            batch = [_request(f"b{i}-{j}", "tools/list") for j in range(batch_size - 1)] + [_notification()]
+            list_ids.update(m["id"] for m in batch if "id" in m)
+            frames.append(batch)
+            replies += 1
+        elif i % 10 == 8:
+            frames.append(_notification())
+        else:
+            frames.append(_request(i, "tools/list"))
+            list_ids.add(i)
+            replies += 1
+    return frames, slow_ids, list_ids, replies
+
+
+async def feed(reader: asyncio.StreamReader, data: bytes, fed_at: List[float]):
+    """Entrega os frames em pedaços, cedendo o loop entre eles (como um pipe)"""
+    for offset in range(0, len(data), CHUNK_BYTES):
+        fed_at.append(time.perf_counter())
+        reader.feed_data(data[offset:offset + CHUNK_BYTES])
+        await asyncio.sleep(0)
+    reader.feed_eof()
+
+
+async def run(args) -> bool:
+    from mcp_server.server import MCPServer
+    server = MCPServer()
+    frames, slow_ids, list_ids, expected = make_frames(args.frames, args.batch_size, args.slow_calls)
+    lines = [json.dumps(frame).encode("utf-8") + b"\n" for frame in frames]
+    data = b"".join(lines)
+    # Pedaço em que cada requisição termina (a partir dele ela pode ser lida)
+    chunk_of: Dict[Any, int] = {}
+    end = 0
+    for frame, line in zip(frames, lines):
+        end += len(line)
+        for message in frame if isinstance(frame, list) else [frame]:
+            if "id" in message:
+                chunk_of[message["id"]] = (end - 1) // CHUNK_BYTES
+
+    reader = asyncio.StreamReader(limit=16 * 1024 * 1024)
+    output = CaptureOutput()
+    transport = StdioTransport(server, reader=reader, output=output)
+    fed_at: List[float] = []
+    start = time.perf_counter()
+    feeder = asyncio.create_task(feed(reader, data, fed_at))
+    await transport.serve()
+    await feeder
+    wall = time.perf_counter() - start
+    await server.async_es.close()
+
+    answered: Dict[Any, float] = {}
+    duplicates = 0
+    last_list = 0.0
+    for at, raw in output.frames:
+        payload = json.loads(raw)
+        for response in payload if isinstance(payload, list) else [payload]:
+            msg_id = response.get("id")
+            duplicates += msg_id in answered
+            answered[msg_id] = at - fed_at[chunk_of[msg_id]] if msg_id in chunk_of else 0.0
+            if msg_id in list_ids:
+                last_list = max(last_list, at - start)
+
+    list_times = [answered[i] for i in list_ids if i in answered]
+    slow_times = [answered[i] for i in slow_ids if i in answered]
+    print(f"   {len(frames)} frames ({len(data) / 1024:.0f} KB), {wall:.2f}s até a última resposta")
+    if list_times:
+        # Vazão sem contar a espera pelas chamadas lentas
+        print(f"   {len(frames) / last_list:,.0f} frames/s até a última resposta de tools/list")
+        print(f"   tools/list: {len(list_times)} respostas, p50 {percentile(list_times, 50) * 1000:.1f} ms, "
+              f"p99 {percentile(list_times, 99) * 1000:.1f} ms, máx {max(list_times) * 1000:.1f} ms")
+    if slow_times:
+        print(f"   tools/call lentas: p50 {percentile(slow_times, 50) * 1000:.1f} ms")
+
+    checks = {
+        "uma resposta por requisição": len(output.frames) == expected and not duplicates
+                                       and answered.keys() == list_ids | slow_ids,
+        "tools/list não espera as chamadas lentas": bool(list_times) and bool(slow_times)
+                                                    and percentile(list_times, 99) < min(slow_times),
+    }
+    for name, ok in checks.items():
+        print(f"   {'ok   ' if ok else 'FALHA'} {name}")
+    return all(checks.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=10)
+    parser.add_argument("--slow-calls", type=int, default=4)
+    parser.add_argument("--slow", type=float, default=1.0, help="latência do stand-in para as tools/call (s)")
+    args = parser.parse_args()
+
+    with StandInServer(latency=args.slow) as standin:
+        standin.indices[DEFAULT_INDEX] = {f"post_{i}": make_doc(i) for i in range(100)}
+        connections.configure(ConnectionSettings(hosts=[f"http://127.0.0.1:{standin.port}"]))
+        print(f"Stand-in do Elasticsearch em 127.0.0.1:{standin.port} (latência {args.slow * 1000:.0f} ms)")
+        ok = asyncio.run(run(args))
+    connections.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Suíte de benchmarks ponta a ponta do servidor MCP.
+
+Para cada tamanho de corpus, indexa documentos sintéticos via bulk e dispara
+MCPServer.process_message (mais a serialização da resposta) para todas as
+ferramentas e recursos, em cada nível de concorrência. Roda contra o stand-in
+local do Elasticsearch (latência injetável, sem rede) ou contra um nó real
+(--es-url, em um índice próprio que é removido ao final).
+
+Reporta vazão, p50/p95/p99, memória alocada (pico) e blocos retidos por
+requisição, e salva um baseline JSON em benchmarks/baselines/ para comparar
+commits; com --compare, aponta regressões acima de --tolerance e sai com 1.
+
+Uso: cd src && python -m benchmarks.suite [--docs 1000 10000] [--concurrency 1 16] [--requests 300]
+     [--latency 0.002] [--es-url http://localhost:9200] [--only search_documents aggregate]
+     [--save standin] [--compare benchmarks/baselines/standin.json]
+"""
+import os
+import gc
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from benchmarks.embeddings import percentile
+from benchmarks.es_standin import StandInServer
+from elasticsearch_client.connection import ConnectionSettings, connections
+from elasticsearch_client.es_client import ElasticsearchClient
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+INDEX_NAME = "mcp_bench"
+CATEGORIES = ["blog_post", "news", "tutorial", "review", "faq", "changelog"]
+WORDS = ("elasticsearch busca índice documento agente consulta cache vetor latência shard "
+         "réplica cluster mapeamento agregação categoria servidor cliente protocolo resposta").split()
+
+Message = Dict[str, Any]
+
+
+def make_corpus(size: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rnd = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    return [{
+        "id": f"doc_{i}",
+        "title": " ".join(rnd.choices(WORDS, k=5)),
+        "content": " ".join(rnd.choices(WORDS, k=60)),
+        "category": rnd.choice(CATEGORIES),
+        "tags": rnd.sample(WORDS, 3),
+        "created_at": (start + timedelta(minutes=i)).isoformat(),
+        "metadata": {"user_name": f"User {i % 50}", "source": "benchmark"},
+    } for i in range(size)]
+
+
+def tool_call(name: str, **arguments) -> Message:
+    return {"jsonrpc": "2.0", "method": "tools/call", "params": {"name": name, "arguments": arguments}}
+
+
+def read_resource(uri: str) -> Message:
+    return {"jsonrpc": "2.0", "method": "resources/read", "params": {"uri": uri}}
+
+
+def scenarios(doc_ids: List[str], distinct_queries: int) -> Dict[str, Callable[[random.Random], Message]]:
+    """Gera a mensagem de cada cenário; as buscas sorteiam entre `distinct_queries` textos"""
+    queries = [" ".join(random.Random(i).sample(WORDS, 2)) for i in range(distinct_queries)]
+    return {
+        "search_documents": lambda r: tool_call("search_documents", query=r.choice(queries), size=10),
+        "search_documents_highlight": lambda r: tool_call("search_documents", query=r.choice(queries),
+                                                          size=10, highlight=True),
+        "semantic_search": lambda r: tool_call("semantic_search", query=r.choice(queries), k=10),
+        "semantic_search_hybrid": lambda r: tool_call("semantic_search", query=r.choice(queries), k=10,
+                                                      mode="hybrid"),
+        "get_document_by_id": lambda r: tool_call("get_document_by_id", document_id=r.choice(doc_ids)),
+        "get_documents_by_ids": lambda r: tool_call("get_documents_by_ids", document_ids=r.sample(doc_ids, 10)),
+        "aggregate_by_category": lambda r: tool_call("aggregate_by_category"),
+        "aggregate": lambda r: tool_call("aggregate", aggregations=[
+            {"type": "terms", "field": "tags", "size": 20},
+            {"type": "date_histogram", "field": "created_at", "interval": "hour"},
+            {"type": "composite", "sources": [{"field": "category"}, {"field": "created_at", "interval": "day"}]},
+        ], filter={"category": r.choice(CATEGORIES)}),
+        "list_recent_documents": lambda r: tool_call("list_recent_documents", limit=10),
+        "tools/list": lambda r: {"jsonrpc": "2.0", "method": "tools/list", "params": {}},
+        "resource:stats": lambda r: read_resource("elasticsearch://sample_data/stats"),
+        "resource:schema": lambda r: read_resource("elasticsearch://sample_data/schema"),
+        "resource:cache": lambda r: read_resource("elasticsearch://sample_data/cache"),
+        "resource:metrics": lambda r: read_resource("elasticsearch://sample_data/metrics"),
+        "resource:admission": lambda r: read_resource("elasticsearch://sample_data/admission"),
+    }
+
+
+def _failed(response: Optional[Message]) -> bool:
+    if response is None or "error" in response:
+        return True
+    result = response.get("result")
+    return isinstance(result, dict) and "error" in result
+
+
+async def _one(server, message: Message, msg_id: int) -> bool:
+    response = await server.process_message({**message, "id": msg_id})
+    if response is not None:
+        server.encoder.encode(response)  # o custo de serialização faz parte da requisição
+    return not _failed(response)
+
+
+async def run_scenario(server, make: Callable[[random.Random], Message], requests: int,
+                       concurrency: int, seed: int = 7) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    messages = [make(rnd) for _ in range(requests)]
+    latencies: List[float] = []
+    errors = 0
+    cache = server.async_es.cache
+    cache.invalidate()
+    hits, misses = cache.counters["hits"], cache.counters["misses"]
+    queue = iter(enumerate(messages))
+
+    async def worker():
+        nonlocal errors
+        for msg_id, message in queue:
+            start = time.perf_counter()
+            ok = await _one(server, message, msg_id)
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    lookups = cache.counters["hits"] - hits + cache.counters["misses"] - misses
+    return {
+        "requests": requests,
+        "throughput_rps": round(requests / wall, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "errors": errors,
+        "cache_hit_ratio": round((cache.counters["hits"] - hits) / lookups, 3) if lookups else None,
+    }
+
+
+async def measure_allocations(server, make: Callable[[random.Random], Message], samples: int) -> Dict[str, Any]:
+    """Pico de memória alocada e blocos retidos por requisição (sequencial, com tracemalloc).
+
+    Com o stand-in no mesmo processo, o pico inclui a thread dele e os buffers
+    do aiohttp: uma busca crua com AsyncElasticsearch já fica em ~260 KB, então
+    compare cenários entre si e com o baseline, não em valor absoluto.
+    """
+    rnd = random.Random(11)
+    messages = [make(rnd) for _ in range(samples)]
+    await _one(server, messages[0], 0)  # aquecimento (imports, conexões, caches de classe)
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    peaks = []
+    for msg_id, message in enumerate(messages):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        await _one(server, message, msg_id)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+    gc.collect()
+    return {
+        "alloc_kb": round(sum(peaks) / len(peaks) / 1024, 2),
+        "retained_blocks": round((sys.getallocatedblocks() - blocks) / samples, 1),
+    }
+
+
+def load_corpus(size: int) -> Dict[str, Any]:
+    client = ElasticsearchClient()
+    client.index_name = INDEX_NAME
+    client.delete_index()
+    client.create_index()
+    corpus = make_corpus(size)
+    start = time.perf_counter()
+    client.bulk_index(corpus)
+    elapsed = time.perf_counter() - start
+    return {"docs": size, "seconds": round(elapsed, 3), "docs_per_second": round(size / elapsed, 1)}
+
+
+async def run_corpus(size: int, args) -> List[Dict[str, Any]]:
+    from mcp_server.server import MCPServer
+
+    load = load_corpus(size)
+    print(f"\nCorpus de {size} documentos: bulk em {load['seconds']:.2f} s ({load['docs_per_second']:.0f} docs/s)")
+    server = MCPServer()
+    server.es_client.index_name = INDEX_NAME
+    server.async_es.index_name = INDEX_NAME
+    doc_ids = [f"doc_{i}" for i in range(size)]
+    selected = {name: make for name, make in scenarios(doc_ids, args.distinct_queries).items()
+                if not args.only or any(o in name for o in args.only)}
+
+    results = [{"scenario": "bulk_index", "docs": size, "concurrency": 1,
+                "throughput_rps": load["docs_per_second"]}]
+    print(f"   {'cenário':<28} {'conc':>4} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'KB/req':>8} {'blocos':>7} {'cache':>6} {'erros':>5}")
+    for name, make in selected.items():
+        allocations = await measure_allocations(server, make, args.alloc_samples)
+        for concurrency in args.concurrency:
+            result = await run_scenario(server, make, args.requests, concurrency)
+            row = {"scenario": name, "docs": size, "concurrency": concurrency, **result, **allocations}
+            results.append(row)
+            hit_ratio = "-" if row["cache_hit_ratio"] is None else f"{row['cache_hit_ratio']:.0%}"
+            print(f"   {name:<28} {concurrency:>4} {row['throughput_rps']:>9.1f} {row['p50_ms']:>8.2f} "
+                  f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['alloc_kb']:>8.1f} "
+                  f"{row['retained_blocks']:>7.1f} {hit_ratio:>6} {row['errors']:>5}")
+    await server.async_es.close()
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> int:
+    """Compara com um baseline salvo; retorna o número de regressões"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["scenario"], r["docs"], r["concurrency"]): r for r in baseline["results"]}
+    print(f"\nComparação com {baseline_path} (commit {baseline['meta'].get('commit')}, tolerância {tolerance:.0%})")
+    regressions = 0
+    for row in results:
+        old = previous.get((row["scenario"], row["docs"], row["concurrency"]))
+        if old is None:
+            continue
+        throughput = row["throughput_rps"] / old["throughput_rps"] - 1 if old.get("throughput_rps") else 0.0
+        p95 = row["p95_ms"] / old["p95_ms"] - 1 if old.get("p95_ms") and "p95_ms" in row else 0.0
+        regressed = throughput < -tolerance or p95 > tolerance
+        regressions += regressed
+        print(f"   {'REGRESSÃO' if regressed else 'ok':<10} {row['scenario']:<28} docs {row['docs']:>6} "
+              f"conc {row['concurrency']:>3}   req/s {throughput:+7.1%}   p95 {p95:+7.1%}")
+    return regressions
+
+
+def save(results: List[Dict[str, Any]], name: str, args) -> str:
+    path = name if name.endswith(".json") else os.path.join(BASELINE_DIR, f"{name}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    meta = {
+        "commit": _git_commit(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "backend": args.es_url or f"stand-in (latência {args.latency * 1000:.1f} ms)",
+        "requests": args.requests,
+        "distinct_queries": args.distinct_queries,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=2)
+    return path
+
+
+async def run_all(args) -> List[Dict[str, Any]]:
+    results = []
+    for size in args.docs:
+        results.extend(await run_corpus(size, args))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, nargs="+", default=[1000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--distinct-queries", type=int, default=50)
+    parser.add_argument("--alloc-samples", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.002, help="latência do stand-in (s)")
+    parser.add_argument("--es-url", help="nó real do Elasticsearch em vez do stand-in")
+    parser.add_argument("--only", nargs="+", help="roda só os cenários cujo nome contém um destes textos")
+    parser.add_argument("--save", help="nome (em benchmarks/baselines/) ou caminho do baseline JSON")
+    parser.add_argument("--compare", help="baseline JSON para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+    # Métricas, profiling e admissão ficam como em produção; o log de lentas não
+    os.environ.setdefault("MCP_SLOW_MS", "0")
+
+    if args.es_url:
+        connections.configure(ConnectionSettings(hosts=[args.es_url]))
+        print(f"Elasticsearch real em {args.es_url} (índice {INDEX_NAME})")
+        results = asyncio.run(run_all(args))
+        client = ElasticsearchClient()
+        client.index_name = INDEX_NAME
+        client.delete_index()
+    else:
+        with StandInServer(latency=args.latency) as standin:
+            connections.configure(ConnectionSettings(hosts=[f"http://127.0.0.1:{standin.port}"]))
+            print(f"Stand-in do Elasticsearch em 127.0.0.1:{standin.port} (latência {args.latency * 1000:.1f} ms)")
+            results = asyncio.run(run_all(args))
+    connections.close()
+
+    if args.save:
+        print(f"\nBaseline salvo em {save(results, args.save, args)}")
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Benchmark da carga incremental (reinício frio x quente).
+
+Contra o stand-in local, carrega --docs documentos num índice vazio, repete a
+mesma carga (reinício quente, nada muda) e depois uma carga com --changed
+documentos alterados. Reporta tempo, requisições e escritas no Elasticsearch.
+
+Uso: cd src && python -m benchmarks.sync [--docs 5000] [--changed 50]
+"""
+import time
+import argparse
+from datetime import datetime
+from benchmarks.es_standin import StandInServer
+from benchmarks.serialization import make_hits
+from elasticsearch_client.es_client import ElasticsearchClient
+
+
+def run(label: str, client: ElasticsearchClient, server: StandInServer, docs):
+    server.reset_counters()
+    start = time.perf_counter()
+    client.bulk_index(docs, incremental=True)
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<20} {elapsed * 1000:9.1f} ms   requisições {server.requests:5d}   escritas {server.writes:6d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--changed", type=int, default=50)
+    args = parser.parse_args()
+
+    def documents(changed: int = 0):
+        # Como em load_sample_data: carimbos de tempo novos a cada carga
+        now = datetime.now().isoformat()
+        for doc in make_hits(args.docs):
+            doc["created_at"] = doc["updated_at"] = now
+            if int(doc["id"].split("_")[1]) < changed:
+                doc["title"] += " (editado)"
+            yield doc
+
+    with StandInServer() as server:
+        client = ElasticsearchClient("127.0.0.1", server.port)
+        client.create_index()
+        print(f"Carga incremental de {args.docs} documentos")
+        run("frio (índice vazio)", client, server, documents())
+        run("quente (sem mudanças)", client, server, documents())
+        run(f"{args.changed} alterados", client, server, documents(args.changed))
+
+        original = server.documents(client.index_name)["post_0"]
+        print(f"   post_0: created_at {original['created_at']}, updated_at {original['updated_at']}")
+
+
+if __name__ == "__main__":
+    main()
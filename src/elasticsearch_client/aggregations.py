@@ -0,0 +1,203 @@
+"""Agregações da ferramenta `aggregate`.
+
+Várias agregações rodam em uma única busca `size: 0` (com request_cache):
+
+- terms: top N valores de um campo keyword, informando o que ficou de fora;
+- date_histogram: contagem por intervalo de calendário em um campo de data;
+- stats: count/min/max/avg/sum de um campo;
+- composite: todos os buckets de uma ou mais fontes, paginados pelo after_key.
+
+O cursor devolvido carrega só as agregações composite que ainda têm buckets,
+com seus after_key; as demais não são repetidas nas páginas seguintes.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from elasticsearch_client.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+KEYWORD_FIELDS = ("id", "category", "tags")
+DATE_FIELDS = ("created_at", "updated_at")
+CALENDAR_INTERVALS = ("minute", "hour", "day", "week", "month", "quarter", "year")
+AGGREGATION_TYPES = ("terms", "date_histogram", "stats", "composite")
+
+MAX_AGGREGATIONS = 10
+MAX_BUCKETS = 1000
+DEFAULT_TERMS_SIZE = 10
+DEFAULT_COMPOSITE_SIZE = 100
+
+
+class AggregationError(ValueError):
+    """Especificação de agregação ou filtro inválida"""
+
+
+def _field(spec: Dict[str, Any], allowed: Tuple[str, ...]) -> str:
+    field = spec.get("field")
+    if field not in allowed:
+        raise AggregationError(f"Campo '{field}' não suportado em {spec.get('type')}; use um de {list(allowed)}")
+    return field
+
+
+def _size(spec: Dict[str, Any], default: int) -> int:
+    size = spec.get("size", default)
+    if not isinstance(size, int) or size < 1:
+        raise AggregationError(f"'size' inválido em '{spec.get('name')}'")
+    return min(size, MAX_BUCKETS)
+
+
+def _interval(spec: Dict[str, Any]) -> str:
+    interval = spec.get("interval", "day")
+    if interval not in CALENDAR_INTERVALS:
+        raise AggregationError(f"Intervalo '{interval}' inválido; use um de {list(CALENDAR_INTERVALS)}")
+    return interval
+
+
+def _composite_source(source: Dict[str, Any]) -> Dict[str, Any]:
+    """Fonte de um composite: terms em keyword ou date_histogram em data"""
+    field = source.get("field")
+    if field in DATE_FIELDS:
+        return {field: {"date_histogram": {"field": field, "calendar_interval": _interval(source)}}}
+    if field in KEYWORD_FIELDS:
+        return {field: {"terms": {"field": field}}}
+    raise AggregationError(f"Campo '{field}' não suportado em composite; use um de "
+                           f"{list(KEYWORD_FIELDS + DATE_FIELDS)}")
+
+
+def normalize(aggregations: Any) -> List[Dict[str, Any]]:
+    """Valida as especificações e preenche nomes e tamanhos padrão"""
+    if not isinstance(aggregations, list) or not aggregations:
+        raise AggregationError("Informe ao menos uma agregação em 'aggregations'")
+    if len(aggregations) > MAX_AGGREGATIONS:
+        raise AggregationError(f"No máximo {MAX_AGGREGATIONS} agregações por requisição")
+
+    specs, names = [], set()
+    for spec in aggregations:
+        if not isinstance(spec, dict) or spec.get("type") not in AGGREGATION_TYPES:
+            raise AggregationError(f"Tipo de agregação inválido; use um de {list(AGGREGATION_TYPES)}")
+        kind = spec["type"]
+        if kind == "composite":
+            sources = spec.get("sources")
+            if not isinstance(sources, list) or not sources:
+                raise AggregationError("composite precisa de 'sources' (lista de {field, interval?})")
+            default_name = "composite_" + "_".join(str(s.get("field")) for s in sources if isinstance(s, dict))
+        else:
+            default_name = f"{kind}_{spec.get('field')}"
+        spec = {**spec, "name": str(spec.get("name") or default_name)}
+        if spec["name"] in names:
+            raise AggregationError(f"Nome de agregação repetido: '{spec['name']}'")
+        names.add(spec["name"])
+        specs.append(spec)
+    return specs
+
+
+def _aggregation(spec: Dict[str, Any], after: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    kind = spec["type"]
+    if kind == "terms":
+        return {"terms": {"field": _field(spec, KEYWORD_FIELDS), "size": _size(spec, DEFAULT_TERMS_SIZE)}}
+    if kind == "date_histogram":
+        return {"date_histogram": {"field": _field(spec, DATE_FIELDS), "calendar_interval": _interval(spec)}}
+    if kind == "stats":
+        return {"stats": {"field": _field(spec, DATE_FIELDS)}}
+    composite = {
+        "size": _size(spec, DEFAULT_COMPOSITE_SIZE),
+        "sources": [_composite_source(s if isinstance(s, dict) else {}) for s in spec["sources"]]
+    }
+    if after:
+        composite["after"] = after
+    return {"composite": composite}
+
+
+def build_filter(filter: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Consulta a partir do filtro: texto livre em `query`, valores de campos keyword e faixas de datas"""
+    if not filter:
+        return {"match_all": {}}
+    if not isinstance(filter, dict):
+        raise AggregationError("'filter' deve ser um objeto")
+
+    clauses = []
+    for field, value in filter.items():
+        if field == "query":
+            clauses.append({"multi_match": {"query": str(value), "fields": ["title", "content", "tags"]}})
+        elif field in KEYWORD_FIELDS:
+            clauses.append({"terms": {field: value}} if isinstance(value, list) else {"term": {field: value}})
+        elif field in DATE_FIELDS:
+            bounds = {k: v for k, v in (value or {}).items() if k in ("gte", "gt", "lte", "lt")} \
+                if isinstance(value, dict) else {}
+            if not bounds:
+                raise AggregationError(f"Filtro de '{field}' precisa de gte/gt/lte/lt")
+            clauses.append({"range": {field: bounds}})
+        else:
+            raise AggregationError(f"Campo de filtro '{field}' não suportado")
+    # Filtros não pontuam: a busca é só de contagem e entra no request cache
+    return {"bool": {"filter": clauses}}
+
+
+def build_aggregate_body(specs: List[Dict[str, Any]], filter: Optional[Dict[str, Any]] = None,
+                         after: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """Monta a busca `size: 0` com todas as agregações (e os after_key da página, se houver)"""
+    after = after or {}
+    return {
+        "size": 0,
+        "track_total_hits": True,
+        "query": build_filter(filter),
+        "aggs": {spec["name"]: _aggregation(spec, after.get(spec["name"])) for spec in specs}
+    }
+
+
+def _bucket_key(bucket: Dict[str, Any]) -> Any:
+    return bucket.get('key_as_string', bucket['key'])
+
+
+def _parse(spec: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    kind = spec["type"]
+    parsed: Dict[str, Any] = {"type": kind}
+    if kind == "stats":
+        parsed.update({k: result.get(k) for k in ("count", "min", "max", "avg", "sum")})
+        parsed.update({k: v for k, v in result.items() if k.endswith("_as_string")})
+        return parsed
+
+    buckets = result.get('buckets', [])
+    if kind == "composite":
+        parsed["buckets"] = [{"key": b['key'], "doc_count": b['doc_count']} for b in buckets]
+        return parsed
+    parsed["buckets"] = [{"key": _bucket_key(b), "doc_count": b['doc_count']} for b in buckets]
+    if kind == "terms":
+        # Documentos em valores fora do top N: a truncagem fica explícita
+        parsed["other_doc_count"] = result.get('sum_other_doc_count', 0)
+    return parsed
+
+
+def parse_aggregate_response(specs: List[Dict[str, Any]], response: Dict[str, Any]) -> Dict[str, Any]:
+    """Resultados por nome, total de documentos filtrados e os after_key dos composite inacabados"""
+    results = response.get('aggregations', {})
+    after = {}
+    for spec in specs:
+        result = results.get(spec["name"], {})
+        # Página cheia: pode haver mais buckets depois do after_key
+        if spec["type"] == "composite" and result.get('after_key') \
+                and len(result.get('buckets', [])) >= _size(spec, DEFAULT_COMPOSITE_SIZE):
+            after[spec["name"]] = result['after_key']
+    total = response.get('hits', {}).get('total')
+    return {
+        "aggregations": {spec["name"]: _parse(spec, results.get(spec["name"], {})) for spec in specs},
+        "total_documents": total.get('value') if isinstance(total, dict) else total,
+        "after": after
+    }
+
+
+def encode_aggregate_cursor(specs: List[Dict[str, Any]], filter: Optional[Dict[str, Any]],
+                            after: Dict[str, Dict[str, Any]]) -> Optional[str]:
+    """Cursor com as agregações composite que continuam; None quando todas terminaram"""
+    if not after:
+        return None
+    return encode_cursor({
+        "kind": "aggregate",
+        "aggregations": [spec for spec in specs if spec["name"] in after],
+        "filter": filter,
+        "after": after
+    })
+
+
+def decode_aggregate_cursor(cursor: str) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]],
+                                                  Dict[str, Dict[str, Any]]]:
+    state = decode_cursor(cursor, required=("kind", "aggregations", "after"))
+    if state["kind"] != "aggregate":
+        raise InvalidCursorError("Cursor inválido")
+    return normalize(state["aggregations"]), state.get("filter"), state["after"]
@@ -0,0 +1,402 @@
+import time
+from elasticsearch import NotFoundError
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+from elasticsearch_client.es_client import (
+    build_search_body,
+    build_category_aggregation_body,
+    build_recent_body,
+    build_source_filter,
+    build_knn_body,
+)
+from elasticsearch_client.embeddings import HashingEmbedder, rrf_fuse
+from elasticsearch_client.mappings import DEFAULT_INDEX, mapping_version
+from elasticsearch_client.partitions import (
+    fanout_docs,
+    first_found,
+    parse_partition_bounds,
+    partition_bounds_body,
+    partition_order,
+)
+from elasticsearch_client.aggregations import (
+    build_aggregate_body,
+    decode_aggregate_cursor,
+    encode_aggregate_cursor,
+    normalize,
+    parse_aggregate_response,
+)
+from elasticsearch_client.cache import ResultCache, default_cache, state_token
+from elasticsearch_client.connection import connections, create_async_client, is_rejected
+from elasticsearch_client.request_context import current_request, mark_partial, with_timeout
+from elasticsearch_client.pagination import (
+    PIT_KEEP_ALIVE,
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    page_size,
+)
+
+Page = Tuple[List[Dict[str, Any]], Optional[str]]
+
+# Partes do corpo que só valem para a paginação em andamento (não entram na repetição com profile)
+PAGING_FIELDS = ("pit", "pit_id", "search_after")
+
+
+def _page_hits(response: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"_source": hit.get('_source', {}), "sort": hit.get('sort'), "highlight": hit.get('highlight')}
+        for hit in response['hits']['hits']
+    ]
+
+
+def _category_counts(response: Dict[str, Any]) -> Dict[str, int]:
+    buckets = response['aggregations']['categories']['buckets']
+    return {bucket['key']: bucket['doc_count'] for bucket in buckets}
+
+
+def _merge_recent(hits: List[Dict[str, Any]], more: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """Junta hits de partições pela ordem de RECENT_SORT (created_at desc, id asc)"""
+    if not hits:
+        return more[:limit]
+    return sorted(hits + more, key=lambda hit: (-hit['sort'][0], hit['sort'][1]))[:limit]
+
+
+def _hit_to_doc(hit: Dict[str, Any]) -> Dict[str, Any]:
+    """Extrai o documento de um hit, anexando os fragmentos destacados quando houver"""
+    if not hit.get('highlight'):
+        return hit['_source']
+    return {**hit['_source'], "highlights": hit['highlight']}
+
+
+class AsyncElasticsearchClient:
+    """Contraparte assíncrona do ElasticsearchClient para uso no event loop.
+
+    Todas as chamadas compartilham o mesmo AsyncElasticsearch (e portanto o mesmo
+    pool de conexões), de modo que requisições concorrentes não se bloqueiam.
+    """
+
+    def __init__(self, host: Optional[str] = None, port: int = 9200, cache: ResultCache = None,
+                 embedder=None):
+        """Inicializa o cliente Elasticsearch assíncrono (pool compartilhado, salvo com host explícito)"""
+        if host is None:
+            self.es = connections.get_async_client()
+        else:
+            self.es = create_async_client(connections.settings.with_host(host, port))
+        self.index_name = DEFAULT_INDEX
+        self.cache = cache or default_cache
+        # Precisa ser o mesmo embedder usado na ingestão
+        self.embedder = embedder or HashingEmbedder()
+        # Opcional: recebe latência, `took` e erros de cada chamada (mcp_server.metrics)
+        self.metrics = None
+
+    async def check_connection(self) -> bool:
+        """Verifica se o Elasticsearch está acessível"""
+        try:
+            await self.es.info()
+            return True
+        except Exception as e:
+            print(f"Erro ao conectar ao Elasticsearch: {e}")
+            return False
+
+    async def _call(self, endpoint: str, request: Awaitable[Any]) -> Any:
+        """Aguarda uma chamada ao ES registrando latência, `took` e erros"""
+        if self.metrics is None:
+            return await request
+        start = time.perf_counter()
+        try:
+            response = await request
+        except Exception as e:
+            self.metrics.observe_es(endpoint, time.perf_counter() - start, error=e)
+            raise
+        self.metrics.observe_es(endpoint, time.perf_counter() - start, response.get('took'))
+        return response
+
+    def _client(self):
+        """Cliente com o prazo e o X-Opaque-Id da requisição MCP atual, se houver"""
+        context = current_request.get()
+        if context is None:
+            return self.es
+        return context.client(self.es)
+
+    async def _check_index_state(self):
+        """Invalida o cache se o índice mudou fora deste processo"""
+        if self.cache.needs_state_check(self.index_name):
+            stats = await self._call("indices.stats", self._client().indices.stats(
+                index=self.index_name, metric="refresh", level="shards"))
+            self.cache.observe_state(self.index_name, state_token(stats))
+
+    async def index_generation(self) -> int:
+        """Geração do cache do índice: muda a cada escrita vista (neste processo ou pelo estado no cluster)"""
+        await self._check_index_state()
+        return self.cache.generation(self.index_name)
+
+    async def _search(self, body: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        """Busca dentro do prazo; respostas com timed_out marcam a requisição como parcial"""
+        context = current_request.get()
+        start = time.perf_counter()
+        response = await self._call("search", self._client().search(body=with_timeout(body), **kwargs))
+        mark_partial(response)
+        if context is not None and context.searches is not None:
+            context.searches.append({
+                "index": kwargs.get("index") or self.index_name,
+                "body": body,
+                "wall_ms": round((time.perf_counter() - start) * 1000, 3),
+                "took_ms": response.get('took'),
+                "timed_out": response.get('timed_out', False)
+            })
+        return response
+
+    async def profile_search(self, index: Optional[str], body: Dict[str, Any], timeout: float = 5.0) -> Dict[str, Any]:
+        """Repete uma busca com `profile: true` (diagnóstico de buscas lentas), com prazo próprio.
+
+        Sem o PIT e o search_after: a repetição não prolonga nem depende do
+        point-in-time da paginação (roda sobre `index`, o alias).
+        """
+        body = {key: value for key, value in body.items() if key not in PAGING_FIELDS}
+        body.update(profile=True, timeout=f"{int(timeout * 1000)}ms")
+        index = index or self.index_name
+        return await self.es.options(request_timeout=timeout).search(index=index, body=body)
+
+    async def _cached_search(self, body: Dict[str, Any], extract, **kwargs) -> Any:
+        """Busca com cache; resultados parciais são entregues (marcando `partial` em cada
+        requisição que os recebe, inclusive as agrupadas no single-flight) mas não ficam no cache"""
+        await self._check_index_state()
+        key = ResultCache.make_key(self.index_name, body)
+
+        async def load():
+            response = await self._search(body, index=self.index_name, **kwargs)
+            return extract(response), response.get('timed_out', False)
+
+        value, timed_out = await self.cache.get_or_load_partial_async(key, load)
+        mark_partial({"timed_out": timed_out})
+        return value
+
+    async def search(self, query: str, size: int = 10) -> List[Dict[str, Any]]:
+        """Realiza busca textual no Elasticsearch"""
+        try:
+            hits = await self._cached_search(build_search_body(query, size), _page_hits)
+            return [hit['_source'] for hit in hits]
+        except Exception as e:
+            print(f"Erro na busca: {e}")
+            return []
+
+    async def get_by_id(self, doc_id: str) -> Dict[str, Any]:
+        """Busca documento por ID"""
+        try:
+            return (await self.get_many([doc_id])).get(doc_id, {})
+        except Exception as e:
+            print(f"Erro ao buscar documento: {e}")
+            return {}
+
+    async def get_many(self, doc_ids: List[str], source: Optional[Dict[str, Any]] = None) -> Dict[str, Dict[str, Any]]:
+        """Busca vários documentos em uma única chamada _mget (em todas as partições, se houver várias)"""
+        source = source or build_source_filter()
+        partitions = [index for index, _ in await self.partitions()]
+        target = {"index": partitions[0], "ids": doc_ids} if len(partitions) == 1 \
+            else {"docs": fanout_docs(doc_ids, partitions)}
+        response = await self._call("mget", self._client().mget(
+            **target,
+            source_includes=source.get("includes"),
+            source_excludes=source.get("excludes") or None
+        ))
+        return {doc_id: doc.get('_source', {}) for doc_id, doc in first_found(response['docs']).items()}
+
+    async def partitions(self) -> List[Tuple[str, Optional[float]]]:
+        """(partição, created_at mais novo em epoch ms), da mais nova para a mais antiga.
+
+        Fica no cache de resultados: escritas, refresh, rollover e retenção mudam
+        o estado do índice e invalidam a lista.
+        """
+        await self._check_index_state()
+
+        async def load():
+            try:
+                aliases = await self._call("indices.get_alias", self.es.indices.get_alias(name=self.index_name))
+            except NotFoundError:
+                return [(self.index_name, None)]  # índice concreto, sem alias
+            indices = partition_order(aliases)
+            if len(indices) == 1:
+                return [(indices[0], None)]
+            bounds = await self._call("search", self.es.search(index=self.index_name, body=partition_bounds_body()))
+            bounds = parse_partition_bounds(bounds)
+            return [(index, bounds.get(index)) for index in indices]
+
+        return await self.cache.get_or_load_async(ResultCache.make_key(self.index_name, {"partitions": True}), load)
+
+    async def aggregate_by_category(self) -> Dict[str, int]:
+        """Agrega documentos por categoria"""
+        body = build_category_aggregation_body()
+        try:
+            return await self._cached_search(body, _category_counts, request_cache=True)
+        except Exception as e:
+            if is_rejected(e):
+                raise  # backpressure do cluster: o servidor MCP precisa ver o 429
+            print(f"Erro na agregação: {e}")
+            return {}
+
+    async def aggregate(self, aggregations: Optional[List[Dict[str, Any]]] = None,
+                        filter: Optional[Dict[str, Any]] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Várias agregações em uma busca `size: 0`; com cursor, continua os composite da página anterior"""
+        if cursor:
+            specs, filter, after = decode_aggregate_cursor(cursor)
+        else:
+            specs, after = normalize(aggregations), {}
+        body = build_aggregate_body(specs, filter, after)
+        # O request cache do shard guarda buscas size: 0; o ResultCache evita até a ida ao cluster
+        result = await self._cached_search(body, lambda response: parse_aggregate_response(specs, response),
+                                           request_cache=True)
+        return {
+            "aggregations": result["aggregations"],
+            "total_documents": result["total_documents"],
+            "next_cursor": encode_aggregate_cursor(specs, filter, result["after"])
+        }
+
+    async def search_page(self, query: str, size: int = 10, cursor: Optional[str] = None,
+                          fields: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                          highlight: bool = False) -> Page:
+        """Busca textual paginada; retorna (documentos, próximo cursor).
+
+        A primeira página é uma busca comum (com cache e single-flight); o
+        point-in-time só é aberto quando ela vem cheia e há próxima página.
+        """
+        page_size(size, "size")
+        if cursor:
+            return await self._next_page(decode_cursor(cursor))
+        state = {
+            "kind": "search",
+            "query": query,
+            "source": build_source_filter(fields, exclude, highlight),
+            "highlight": highlight
+        }
+        hits = await self._cached_search(self._page_body({**state, "size": size}), _page_hits)
+        return await self._first_page(hits, size, state)
+
+    async def list_recent_page(self, limit: int = 5, cursor: Optional[str] = None,
+                               fields: Optional[List[str]] = None, exclude: Optional[List[str]] = None) -> Page:
+        """Lista paginada dos documentos mais recentes.
+
+        A primeira página consulta as partições da mais nova para a mais antiga e
+        para assim que nenhuma das restantes pode ter documento mais novo que o
+        último já encontrado; as seguintes seguem pelo PIT sobre o alias.
+        """
+        page_size(limit, "limit")
+        if cursor:
+            return await self._next_page(decode_cursor(cursor))
+        state = {"kind": "recent", "source": build_source_filter(fields, exclude)}
+        body = self._page_body({**state, "size": limit})
+        hits: List[Dict[str, Any]] = []
+        for index, newest in await self.partitions():
+            if len(hits) >= limit and newest is not None and newest < hits[limit - 1]['sort'][0]:
+                break
+            hits = _merge_recent(hits, _page_hits(await self._search(body, index=index)), limit)
+        return await self._first_page(hits, limit, state)
+
+    def _page_body(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Reconstrói a query a partir do estado do cursor"""
+        if state["kind"] == "search":
+            return build_search_body(state.get("query", ""), state["size"], state.get("source"),
+                                     state.get("highlight", False))
+        if state["kind"] == "recent":
+            return build_recent_body(state["size"], state.get("source"))
+        raise InvalidCursorError("Cursor inválido")
+
+    async def _first_page(self, hits: List[Dict[str, Any]], size: int, state: Dict[str, Any]) -> Page:
+        """Primeira página: o point-in-time só é aberto se houver mais resultados"""
+        docs = [_hit_to_doc(hit) for hit in hits]
+        if len(hits) < size:
+            return docs, None
+
+        pit = await self._call("open_point_in_time", self._client().open_point_in_time(
+            index=self.index_name, keep_alive=PIT_KEEP_ALIVE))
+        return docs, encode_cursor({**state, "pit": pit['id'], "after": hits[-1]['sort'], "size": size})
+
+    async def _next_page(self, state: Dict[str, Any]) -> Page:
+        """Páginas seguintes via PIT + search_after (custo constante em qualquer profundidade)"""
+        body = self._page_body(state)
+        body["pit"] = {"id": state["pit"], "keep_alive": PIT_KEEP_ALIVE}
+        body["search_after"] = state["after"]
+
+        try:
+            response = await self._search(body)
+        except NotFoundError:
+            raise InvalidCursorError("Cursor expirado; refaça a busca sem cursor")
+
+        hits = response['hits']['hits']
+        docs = [_hit_to_doc(hit) for hit in hits]
+        pit_id = response.get('pit_id', state["pit"])
+        if len(hits) < state["size"]:
+            await self._close_pit(pit_id)
+            return docs, None
+        return docs, encode_cursor({**state, "pit": pit_id, "after": hits[-1]['sort']})
+
+    async def _close_pit(self, pit_id: str):
+        """Libera o point-in-time ao fim da paginação"""
+        try:
+            await self._call("close_point_in_time", self.es.close_point_in_time(id=pit_id))
+        except Exception:
+            pass
+
+    async def semantic_search(self, query: str, k: int = 10, num_candidates: Optional[int] = None,
+                              mode: str = "knn", source: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Busca semântica via kNN; no modo 'hybrid' funde BM25 e kNN por RRF"""
+        vector = self.embedder.embed([query])[0].tolist()
+        knn_body = build_knn_body(vector, k, num_candidates, source)
+
+        if mode == "knn":
+            response = await self._search(knn_body, index=self.index_name)
+            return [{**hit['_source'], "score": hit['_score']} for hit in response['hits']['hits']]
+
+        if mode != "hybrid":
+            raise ValueError(f"Modo de busca semântica inválido: '{mode}'")
+
+        # As duas buscas vão em um único _msearch
+        bm25_body = build_search_body(query, k, source)
+        response = await self._call("msearch", self._client().msearch(searches=[
+            {"index": self.index_name}, with_timeout(bm25_body),
+            {"index": self.index_name}, with_timeout(knn_body)
+        ]))
+        rankings = []
+        for item in response['responses']:
+            if 'error' in item:
+                raise RuntimeError(f"Erro na busca híbrida: {item['error']}")
+            mark_partial(item)
+            rankings.append(item['hits']['hits'])
+
+        fused = rrf_fuse(rankings, k, key="_id")
+        return [{**hit['_source'], "rrf_score": hit['rrf_score']} for hit in fused]
+
+    async def cancel_tasks(self, opaque_id: str) -> int:
+        """Cancela no cluster as buscas ainda em execução iniciadas com este X-Opaque-Id"""
+        try:
+            response = await self.es.tasks.list(actions="indices:data/read/*", detailed=False)
+        except Exception as e:
+            print(f"Erro ao listar tarefas do Elasticsearch: {e}")
+            return 0
+
+        cancelled = 0
+        for node in response.get('nodes', {}).values():
+            for task_id, task in node.get('tasks', {}).items():
+                # Cancelar a tarefa pai cancela as dos shards
+                if task.get('headers', {}).get('X-Opaque-Id') != opaque_id or 'parent_task_id' in task:
+                    continue
+                try:
+                    await self.es.tasks.cancel(task_id=task_id)
+                    cancelled += 1
+                except Exception:
+                    pass
+        return cancelled
+
+    async def index_stats(self) -> Dict[str, Any]:
+        """Retorna as estatísticas do índice"""
+        return await self._call("indices.stats", self.es.indices.stats(index=self.index_name))
+
+    async def get_mapping(self) -> Dict[str, Any]:
+        """Retorna o mapeamento do índice (do índice concreto atrás do alias)"""
+        mapping = await self._call("indices.get_mapping", self.es.indices.get_mapping(index=self.index_name))
+        return max(mapping.values(), key=lambda m: mapping_version(m.get('mappings')))
+
+    async def close(self):
+        """Fecha o pool de conexões"""
+        if connections.is_shared(self.es):
+            await connections.close_async()
+        else:
+            await self.es.close()
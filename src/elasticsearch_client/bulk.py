@@ -0,0 +1,197 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import parallel_bulk, streaming_bulk
+
+# Configurações aplicadas ao índice durante uma carga em massa
+BULK_LOAD_SETTINGS = {
+    "index.refresh_interval": "-1",
+    "index.number_of_replicas": "0",
+}
+
+# Só cargas completas a partir deste tamanho mexem nas configurações: tirar as réplicas de
+# um índice em uso obriga a reconstruí-las depois e o deixa sem redundância enquanto isso
+TUNE_SETTINGS_MIN_DOCS = 10000
+
+# Cargas em andamento por índice neste processo e as configurações de antes da primeira
+_tuning_lock = threading.Lock()
+_tuning: Dict[str, Tuple[int, Optional[Dict[str, Any]]]] = {}
+
+
+@dataclass
+class BulkResult:
+    """Resumo de uma carga em massa"""
+    indexed: int = 0
+    failed: int = 0
+    elapsed: float = 0.0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.indexed / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class BulkIndexer:
+    """Pipeline de indexação em massa sobre streaming_bulk/parallel_bulk.
+
+    Com thread_count=1 usa streaming_bulk, que já refaz as ações rejeitadas com
+    429 usando backoff exponencial. Com mais threads usa parallel_bulk, cuja fila
+    de chunks (queue_size) limita o que fica em voo; as rejeições 429 dessa etapa
+    são reenviadas ao final via streaming_bulk.
+    """
+
+    def __init__(self, es: Elasticsearch, index_name: str, chunk_size: int = 500,
+                 max_chunk_bytes: int = 10 * 1024 * 1024, thread_count: int = 1,
+                 queue_size: int = 4, max_retries: int = 5, initial_backoff: float = 1,
+                 max_backoff: float = 60, max_error_reports: int = 1000,
+                 route: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None):
+        self.es = es
+        self.index_name = index_name
+        # Índice de um documento específico (ex: a partição onde ele já existe); None usa index_name
+        self.route = route
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.thread_count = thread_count
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_error_reports = max_error_reports
+
+    @contextmanager
+    def bulk_settings(self):
+        """Desliga refresh e réplicas durante a carga e restaura ao final.
+
+        Cargas simultâneas no mesmo índice compartilham o ajuste: a primeira guarda
+        as configurações de antes e a última as restaura. Se o índice já está com
+        as configurações de carga (outro processo carregando), nada é alterado.
+        """
+        with _tuning_lock:
+            active, previous = _tuning.get(self.index_name, (0, None))
+            if not active:
+                # Com um alias a resposta vem por índice concreto
+                current = self.es.indices.get_settings(index=self.index_name, flat_settings=True)
+                current = next(iter(current.values()))["settings"]
+                previous = {key: current.get(key) for key in BULK_LOAD_SETTINGS}
+                if previous == BULK_LOAD_SETTINGS:
+                    previous = None
+                else:
+                    self.es.indices.put_settings(index=self.index_name, settings=BULK_LOAD_SETTINGS)
+            _tuning[self.index_name] = (active + 1, previous)
+        try:
+            yield
+        finally:
+            with _tuning_lock:
+                active, previous = _tuning.pop(self.index_name)
+                if active > 1:
+                    _tuning[self.index_name] = (active - 1, previous)
+                elif previous is not None:
+                    # Valores None voltam ao padrão do Elasticsearch
+                    self.es.indices.put_settings(index=self.index_name, settings=previous)
+                    self.es.indices.refresh(index=self.index_name)
+
+    def _actions(self, docs: Iterable[Dict[str, Any]], id_field: str) -> Iterator[Dict[str, Any]]:
+        """Converte documentos em ações de indexação"""
+        for doc in docs:
+            index = self.route(doc) if self.route else None
+            action = {"_index": index or self.index_name, "_source": doc}
+            if id_field in doc:
+                action["_id"] = doc[id_field]
+            yield action
+
+    def _record(self, result: BulkResult, ok: bool, item: Dict[str, Any]):
+        """Contabiliza o resultado de uma ação"""
+        if ok:
+            result.indexed += 1
+            return
+
+        result.failed += 1
+        if len(result.errors) < self.max_error_reports:
+            info = next(iter(item.values())) if isinstance(item, dict) else {}
+            error = info.get("error")
+            if error is None and "exception" in info:
+                error = str(info["exception"])
+            result.errors.append({
+                "id": info.get("_id"),
+                "status": info.get("status"),
+                "error": error
+            })
+
+    def _streaming(self, actions: Iterable[Dict[str, Any]], result: BulkResult):
+        """Envia as ações em série, com retry automático para 429"""
+        for ok, item in streaming_bulk(
+            self.es, actions,
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=self.max_chunk_bytes,
+            max_retries=self.max_retries,
+            initial_backoff=self.initial_backoff,
+            max_backoff=self.max_backoff,
+            raise_on_error=False,
+            raise_on_exception=False
+        ):
+            self._record(result, ok, item)
+
+    def _parallel(self, actions: Iterable[Dict[str, Any]], result: BulkResult):
+        """Envia as ações em paralelo e reenvia em série as rejeitadas com 429"""
+        # parallel_bulk devolve os resultados na mesma ordem das ações, então
+        # basta guardar as ações em voo para saber qual delas foi rejeitada
+        in_flight: Deque[Dict[str, Any]] = deque()
+
+        def tracked():
+            for action in actions:
+                in_flight.append(action)
+                yield action
+
+        rejected = []
+        for ok, item in parallel_bulk(
+            self.es, tracked(),
+            thread_count=self.thread_count,
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=self.max_chunk_bytes,
+            queue_size=self.queue_size,
+            raise_on_error=False,
+            raise_on_exception=False
+        ):
+            action = in_flight.popleft()
+            status = next(iter(item.values())).get("status") if not ok else None
+            if status == 429:
+                rejected.append(action)
+            else:
+                self._record(result, ok, item)
+
+        if rejected:
+            self._streaming(rejected, result)
+
+    def send(self, docs: Iterable[Dict[str, Any]], result: BulkResult, id_field: str = "id"):
+        """Envia documentos acumulando em result (sem mexer nas configurações do índice)"""
+        actions = self._actions(docs, id_field)
+        if self.thread_count > 1:
+            self._parallel(actions, result)
+        else:
+            self._streaming(actions, result)
+
+    @staticmethod
+    def report(result: BulkResult):
+        """Imprime o resumo da carga"""
+        print(f"{result.indexed} documentos indexados em {result.elapsed:.2f}s "
+              f"({result.docs_per_sec:.0f} docs/s), {result.failed} falhas")
+
+    def index_documents(self, docs: Iterable[Dict[str, Any]], id_field: str = "id",
+                        tune_settings: bool = False) -> BulkResult:
+        """Indexa um iterável de documentos em massa e reporta docs/s"""
+        result = BulkResult()
+        start = time.perf_counter()
+
+        if tune_settings:
+            with self.bulk_settings():
+                self.send(docs, result, id_field)
+        else:
+            self.send(docs, result, id_field)
+
+        result.elapsed = time.perf_counter() - start
+        self.report(result)
+        return result
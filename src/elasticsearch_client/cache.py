@@ -0,0 +1,248 @@
+import json
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+def state_token(stats: Dict[str, Any]) -> Tuple[Tuple[str, ...], int, int]:
+    """Extrai (índices, max_seq_no, refreshes) dos shards primários de um indices.stats(level=shards).
+
+    O token muda quando alguém (inclusive outro processo) escreve no índice ou
+    quando um refresh torna novas escritas visíveis. Com um alias, soma os
+    índices concretos por trás dele, e trocar o índice do alias também o muda.
+    """
+    max_seq_no = 0
+    refreshes = 0
+    for index in stats["indices"].values():
+        for copies in index["shards"].values():
+            for shard in copies:
+                if not shard["routing"]["primary"]:
+                    continue
+                max_seq_no += shard.get("seq_no", {}).get("max_seq_no", 0)
+                refreshes += shard.get("refresh", {}).get("total", 0)
+    return tuple(sorted(stats["indices"])), max_seq_no, refreshes
+
+
+class _Entry:
+    __slots__ = ("value", "size", "expires_at")
+
+    def __init__(self, value: Any, size: int, expires_at: float):
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+
+
+class ResultCache:
+    """Cache LRU + TTL de resultados de busca, limitado em bytes.
+
+    As chaves são (índice, corpo da query normalizado). Misses simultâneos para a
+    mesma chave são agrupados em uma única requisição ao Elasticsearch
+    (single-flight). Os valores devolvidos são compartilhados: não os modifique.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 60.0,
+                 state_check_interval: float = 1.0):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.state_check_interval = state_check_interval
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._inflight_async: Dict[Hashable, asyncio.Future] = {}
+        self._inflight_sync: Dict[Hashable, Tuple[threading.Event, Dict[str, Any]]] = {}
+        self._state_tokens: Dict[str, Any] = {}
+        self._state_checked_at: Dict[str, float] = {}
+        # Incrementado a cada invalidação; cargas iniciadas antes dela não são armazenadas
+        self._generations: Dict[str, int] = {}
+        self._global_generation = 0
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "coalesced": 0,
+            "invalidations": 0
+        }
+
+    @staticmethod
+    def make_key(index_name: str, body: Dict[str, Any]) -> Tuple[str, str]:
+        """Normaliza o corpo da query para uso como chave"""
+        return index_name, json.dumps(body, sort_keys=True, separators=(",", ":"))
+
+    def get(self, key: Tuple[str, str]) -> Tuple[bool, Any]:
+        """Retorna (encontrado, valor)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return False, None
+            if entry.expires_at < time.monotonic():
+                self._remove(key)
+                self.counters["expirations"] += 1
+                self.counters["misses"] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return True, entry.value
+
+    def generation(self, index_name: str) -> int:
+        return self._global_generation + self._generations.get(index_name, 0)
+
+    def put(self, key: Tuple[str, str], value: Any, generation: Optional[int] = None):
+        """Armazena um valor, removendo os menos usados se passar do limite"""
+        size = len(key[1]) + len(json.dumps(value, separators=(",", ":"), default=str))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if generation is not None and generation != self.generation(key[0]):
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(value, size, time.monotonic() + self.ttl)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.counters["evictions"] += 1
+
+    def _remove(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def discard(self, key: Tuple[str, str]):
+        """Remove uma entrada específica (ex: resultado parcial que não deve ser reaproveitado)"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate(self, index_name: Optional[str] = None):
+        """Remove as entradas de um índice (ou todas)"""
+        with self._lock:
+            keys = [k for k in self._entries if index_name is None or k[0] == index_name]
+            for key in keys:
+                self._remove(key)
+            if index_name is None:
+                self._global_generation += 1
+            else:
+                self._generations[index_name] = self._generations.get(index_name, 0) + 1
+            self.counters["invalidations"] += 1
+
+    def needs_state_check(self, index_name: str) -> bool:
+        """Indica se já é hora de conferir o estado do índice no Elasticsearch"""
+        now = time.monotonic()
+        if now - self._state_checked_at.get(index_name, 0.0) < self.state_check_interval:
+            return False
+        self._state_checked_at[index_name] = now
+        return True
+
+    def observe_state(self, index_name: str, token: Any):
+        """Invalida o índice se o token de estado mudou desde a última observação"""
+        previous = self._state_tokens.get(index_name)
+        self._state_tokens[index_name] = token
+        if previous is not None and previous != token:
+            self.invalidate(index_name)
+
+    def get_or_load(self, key: Tuple[str, str], loader: Callable[[], Any]) -> Any:
+        """Versão síncrona (threads) com single-flight"""
+        found, value = self.get(key)
+        if found:
+            return value
+
+        with self._lock:
+            waiting = self._inflight_sync.get(key)
+            if waiting is None:
+                self._inflight_sync[key] = (threading.Event(), {})
+            else:
+                self.counters["coalesced"] += 1
+
+        if waiting is not None:
+            event, outcome = waiting
+            event.wait()
+            if "error" in outcome:
+                raise outcome["error"]
+            return outcome["value"]
+
+        event, outcome = self._inflight_sync[key]
+        generation = self.generation(key[0])
+        try:
+            value = loader()
+            self.put(key, value, generation)
+            outcome["value"] = value
+            return value
+        except Exception as e:
+            outcome["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight_sync[key]
+            event.set()
+
+    async def get_or_load_async(self, key: Tuple[str, str], loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Versão assíncrona com single-flight"""
+        async def load():
+            return await loader(), False
+
+        value, _ = await self.get_or_load_partial_async(key, load)
+        return value
+
+    async def get_or_load_partial_async(self, key: Tuple[str, str],
+                                        loader: Callable[[], Awaitable[Tuple[Any, bool]]]) -> Tuple[Any, bool]:
+        """Single-flight para cargas que podem vir incompletas: `loader` devolve (valor, parcial).
+
+        Valores parciais não entram no cache, mas são entregues (com parcial=True) ao
+        líder e a todos que aguardavam a mesma chave.
+        """
+        found, value = self.get(key)
+        if found:
+            return value, False
+
+        future = self._inflight_async.get(key)
+        if future is not None:
+            self.counters["coalesced"] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # Se quem foi cancelado foi a requisição líder, tenta de novo
+                if future.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.get_or_load_partial_async(key, loader)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight_async[key] = future
+        generation = self.generation(key[0])
+        try:
+            value, partial = await loader()
+            if not partial:
+                self.put(key, value, generation)
+            future.set_result((value, partial))
+            return value, partial
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Evita o aviso de exceção não recuperada quando ninguém está aguardando
+            future.exception()
+            raise
+        finally:
+            del self._inflight_async[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores e ocupação atual do cache"""
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_ratio": self.counters["hits"] / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl
+        }
+
+
+# Cache compartilhado pelos clientes síncrono e assíncrono do processo, para que
+# escritas feitas por um invalidem as leituras do outro
+default_cache = ResultCache()
@@ -0,0 +1,151 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from elasticsearch import ApiError, AsyncElasticsearch, Elasticsearch
+from elasticsearch_client.serializer import FastJsonSerializer
+
+
+def is_rejected(error: Exception) -> bool:
+    """True quando o cluster recusou a requisição por sobrecarga (HTTP 429)"""
+    return isinstance(error, ApiError) and error.meta.status == 429
+
+
+def _env_bool(name: str, default: Optional[bool] = None) -> Optional[bool]:
+    value = os.getenv(name)
+    if value is None or value.strip().lower() in ("", "auto"):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_hosts() -> List[str]:
+    """ELASTICSEARCH_HOSTS (lista separada por vírgulas) ou ELASTICSEARCH_HOST/PORT"""
+    hosts = os.getenv("ELASTICSEARCH_HOSTS")
+    if hosts:
+        return [h if "://" in h else f"http://{h}" for h in (h.strip() for h in hosts.split(",")) if h]
+    host = os.getenv("ELASTICSEARCH_HOST", "elasticsearch")
+    port = os.getenv("ELASTICSEARCH_PORT", "9200")
+    return [f"http://{host}:{port}"]
+
+
+@dataclass
+class ConnectionSettings:
+    """Parâmetros de conexão com o cluster (lidos do .env por from_env)"""
+    hosts: List[str] = field(default_factory=lambda: ["http://elasticsearch:9200"])
+    connections_per_node: int = 64
+    request_timeout: float = 10.0
+    max_retries: int = 3
+    retry_on_timeout: bool = True
+    http_compress: bool = False
+    # None = automático: liga o sniffing quando há mais de um nó configurado
+    sniff: Optional[bool] = None
+    sniff_timeout: float = 1.0
+    min_delay_between_sniffing: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> "ConnectionSettings":
+        load_dotenv()
+        return cls(
+            hosts=_env_hosts(),
+            connections_per_node=int(os.getenv("ELASTICSEARCH_CONNECTIONS_PER_NODE", "64")),
+            request_timeout=float(os.getenv("ELASTICSEARCH_REQUEST_TIMEOUT", "10")),
+            max_retries=int(os.getenv("ELASTICSEARCH_MAX_RETRIES", "3")),
+            retry_on_timeout=_env_bool("ELASTICSEARCH_RETRY_ON_TIMEOUT", True),
+            http_compress=_env_bool("ELASTICSEARCH_HTTP_COMPRESS", False),
+            sniff=_env_bool("ELASTICSEARCH_SNIFF"),
+            sniff_timeout=float(os.getenv("ELASTICSEARCH_SNIFF_TIMEOUT", "1")),
+        )
+
+    def with_host(self, host: str, port: int) -> "ConnectionSettings":
+        """Cópia apontando para um único nó (clientes criados com host/port explícitos)"""
+        return ConnectionSettings(**{**self.__dict__, "hosts": [f"http://{host}:{port}"]})
+
+    def client_options(self) -> Dict[str, Any]:
+        sniff = len(self.hosts) > 1 if self.sniff is None else self.sniff
+        options = {
+            "connections_per_node": self.connections_per_node,
+            "request_timeout": self.request_timeout,
+            "max_retries": self.max_retries,
+            "retry_on_timeout": self.retry_on_timeout,
+            "http_compress": self.http_compress,
+            "serializer": FastJsonSerializer(),
+        }
+        if sniff:
+            options.update(
+                sniff_on_start=True,
+                sniff_on_node_failure=True,
+                sniff_timeout=self.sniff_timeout,
+                min_delay_between_sniffing=self.min_delay_between_sniffing,
+            )
+        return options
+
+
+def create_client(settings: ConnectionSettings) -> Elasticsearch:
+    return Elasticsearch(settings.hosts, **settings.client_options())
+
+
+def create_async_client(settings: ConnectionSettings) -> AsyncElasticsearch:
+    return AsyncElasticsearch(settings.hosts, **settings.client_options())
+
+
+class ConnectionManager:
+    """Entrega um Elasticsearch e um AsyncElasticsearch compartilhados por processo.
+
+    Os clientes são criados na primeira chamada; todos os ElasticsearchClient e
+    AsyncElasticsearchClient sem host/port explícitos usam o mesmo pool. O
+    cliente assíncrono fica preso ao event loop em que fez a primeira
+    requisição; close_async() o descarta para que outro loop possa criar um novo.
+    """
+
+    def __init__(self, settings: Optional[ConnectionSettings] = None):
+        self._settings = settings
+        self._sync: Optional[Elasticsearch] = None
+        self._async: Optional[AsyncElasticsearch] = None
+        self._lock = threading.Lock()
+
+    @property
+    def settings(self) -> ConnectionSettings:
+        if self._settings is None:
+            self._settings = ConnectionSettings.from_env()
+        return self._settings
+
+    def configure(self, settings: ConnectionSettings):
+        """Troca a configuração; clientes já criados são descartados"""
+        with self._lock:
+            if self._sync is not None:
+                self._sync.close()
+            self._settings = settings
+            self._sync = None
+            self._async = None
+
+    def get_client(self) -> Elasticsearch:
+        with self._lock:
+            if self._sync is None:
+                self._sync = create_client(self.settings)
+            return self._sync
+
+    def get_async_client(self) -> AsyncElasticsearch:
+        with self._lock:
+            if self._async is None:
+                self._async = create_async_client(self.settings)
+            return self._async
+
+    def is_shared(self, client: Any) -> bool:
+        return client is self._sync or client is self._async
+
+    async def close_async(self):
+        with self._lock:
+            client, self._async = self._async, None
+        if client is not None:
+            await client.close()
+
+    def close(self):
+        with self._lock:
+            client, self._sync = self._sync, None
+        if client is not None:
+            client.close()
+
+
+# Instância única do processo
+connections = ConnectionManager()
@@ -0,0 +1,179 @@
+import re
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List
+import numpy as np
+
+# Dimensão declarada no campo `embedding` do índice
+EMBEDDING_DIMS = 384
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbedder:
+    """Embedder local e determinístico: projeção de n-gramas por hashing.
+
+    Cada palavra (crc32) e cada trigrama de bytes (FNV-1a) é mapeado para uma das
+    `dims` posições com sinal ±1; o vetor final é normalizado (norma 1), o que
+    permite usar a similaridade dot_product no Elasticsearch. Não depende de
+    rede nem de modelos, então funciona offline.
+    """
+
+    def __init__(self, dims: int = EMBEDDING_DIMS, ngram: int = 3):
+        self.dims = dims
+        self.ngram = ngram
+
+    def _ngram_hashes(self, texts: List[str]):
+        """Hashes (FNV-1a, vetorizado) dos n-gramas de bytes de todos os textos do lote.
+
+        Retorna (linhas, hashes): a linha indica a qual texto cada n-grama pertence.
+        """
+        encoded = [f" {(text or '').lower()} ".encode("utf-8") for text in texts]
+        lengths = np.fromiter((len(e) for e in encoded), dtype=np.intp, count=len(encoded))
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint32)
+        owner = np.repeat(np.arange(len(texts), dtype=np.intp), lengths)
+
+        n = self.ngram
+        count = len(data) - n + 1
+        if count <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.uint32)
+
+        hashes = np.full(count, 2166136261, dtype=np.uint32)
+        for j in range(n):
+            hashes = (hashes ^ data[j:j + count]) * np.uint32(16777619)
+
+        # Descarta os n-gramas que atravessam a fronteira entre dois textos
+        valid = owner[:count] == owner[n - 1:n - 1 + count]
+        return owner[:count][valid], hashes[valid]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """Calcula os vetores de um lote de textos (matriz len(texts) x dims)"""
+        rows, hashes = self._ngram_hashes(texts)
+
+        # Palavras inteiras entram como features adicionais
+        word_rows: List[int] = []
+        word_hashes: List[int] = []
+        for row, text in enumerate(texts):
+            for token in _TOKEN_RE.findall((text or "").lower()):
+                word_rows.append(row)
+                word_hashes.append(zlib.crc32(token.encode("utf-8")))
+
+        rows = np.concatenate([rows, np.asarray(word_rows, dtype=np.intp)])
+        hashes = np.concatenate([hashes, np.asarray(word_hashes, dtype=np.uint32)])
+        cols = (hashes % self.dims).astype(np.intp)
+        signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+
+        matrix = np.zeros((len(texts), self.dims), dtype=np.float32)
+        np.add.at(matrix, (rows, cols), signs)
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        # Texto vazio (ou colisões que se anulam) ainda precisa de um vetor não nulo
+        empty = norms[:, 0] == 0
+        if empty.any():
+            matrix[empty, 0] = 1.0
+            norms[empty] = 1.0
+        return matrix / norms
+
+
+def document_text(doc: Dict[str, Any]) -> str:
+    """Texto usado para gerar o embedding de um documento"""
+    return f"{doc.get('title', '')} {doc.get('content', '')}"
+
+
+def _embed_batch(embedder, texts: List[str]):
+    # Função de módulo para poder ser enviada ao pool de processos
+    start = time.perf_counter()
+    vectors = embedder.embed(texts)
+    return vectors, time.perf_counter() - start
+
+
+class EmbeddingStage:
+    """Etapa de embedding do pipeline de ingestão.
+
+    Processa os documentos em lotes vetorizados; com `processes` > 1 os lotes
+    são distribuídos em um ProcessPoolExecutor, com no máximo 2 lotes por
+    processo em voo, preservando a ordem dos documentos.
+    """
+
+    def __init__(self, embedder=None, batch_size: int = 256, processes: int = 1):
+        self.embedder = embedder or HashingEmbedder()
+        self.batch_size = batch_size
+        self.processes = processes
+        self.embedded = 0
+        self.elapsed = 0.0
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.embedded / self.elapsed if self.elapsed > 0 else 0.0
+
+    @staticmethod
+    def _attach(batch: List[Dict[str, Any]], vectors: np.ndarray) -> List[Dict[str, Any]]:
+        for doc, vector in zip(batch, vectors):
+            doc["embedding"] = vector.tolist()
+        return batch
+
+    def _batches(self, docs: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        batch = []
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def process(self, docs: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Gera os documentos com o campo `embedding` preenchido"""
+        if self.processes <= 1:
+            for batch in self._batches(docs):
+                start = time.perf_counter()
+                vectors = self.embedder.embed([document_text(d) for d in batch])
+                self.elapsed += time.perf_counter() - start
+                self.embedded += len(batch)
+                yield from self._attach(batch, vectors)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            yield from self._process_pool(pool, docs)
+
+    def _collect(self, batch: List[Dict[str, Any]], future) -> List[Dict[str, Any]]:
+        vectors, seconds = future.result()
+        # Tempo de CPU dos workers dividido pelo paralelismo (ignora a espera do consumidor)
+        self.elapsed += seconds / self.processes
+        self.embedded += len(batch)
+        return self._attach(batch, vectors)
+
+    def _process_pool(self, pool: Executor, docs: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        in_flight: Deque = deque()
+        for batch in self._batches(docs):
+            texts = [document_text(d) for d in batch]
+            in_flight.append((batch, pool.submit(_embed_batch, self.embedder, texts)))
+            if len(in_flight) >= self.processes * 2:
+                yield from self._collect(*in_flight.popleft())
+
+        while in_flight:
+            yield from self._collect(*in_flight.popleft())
+
+    def embed_documents(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Versão para listas (usada pelo carregador de arquivos, lote a lote)"""
+        return list(self.process(docs))
+
+    def report(self):
+        print(f"{self.embedded} embeddings calculados em {self.elapsed:.2f}s ({self.docs_per_sec:.0f} docs/s)")
+
+
+def rrf_fuse(rankings: List[List[Dict[str, Any]]], size: int, rank_constant: int = 60,
+             key: str = "id") -> List[Dict[str, Any]]:
+    """Funde rankings (ex: BM25 e kNN) por Reciprocal Rank Fusion"""
+    scores: Dict[Any, float] = {}
+    docs: Dict[Any, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            doc_key = doc.get(key)
+            scores[doc_key] = scores.get(doc_key, 0.0) + 1.0 / (rank_constant + rank)
+            docs.setdefault(doc_key, doc)
+
+    ordered = sorted(scores, key=scores.get, reverse=True)[:size]
+    return [{**docs[k], "rrf_score": round(scores[k], 6)} for k in ordered]
@@ -1,14 +1,125 @@
 import json
-import requests
-from datetime import datetime
-from elasticsearch import Elasticsearch
-from typing import List, Dict, Any
+import itertools
+from typing import List, Dict, Any, Iterable, Optional
+from elasticsearch_client.bulk import TUNE_SETTINGS_MIN_DOCS, BulkIndexer, BulkResult
+from elasticsearch_client.file_loader import DATA_DIR, FileLoader
+from elasticsearch_client.cache import ResultCache, default_cache, state_token
+from elasticsearch_client.pagination import SEARCH_SORT, RECENT_SORT
+from elasticsearch_client.embeddings import EmbeddingStage
+from elasticsearch_client.mappings import DEFAULT_INDEX, MAPPING_VERSION, index_definition
+from elasticsearch_client.migration import IndexMigration, resolve_alias
+from elasticsearch_client.partitions import PartitionManager, fanout_docs, first_found, partition_index, write_alias
+from elasticsearch_client.connection import connections, create_client
+from elasticsearch_client.sync import IncrementalSync
+from elasticsearch_client.sources import SampleDataSource
+
+
+# Campos que nunca vão para as respostas, a menos que sejam pedidos explicitamente
+DEFAULT_SOURCE_EXCLUDES = ["embedding"]
+
+# Fragmentos gerados pelo Elasticsearch no lugar do conteúdo completo
+HIGHLIGHT = {
+    "pre_tags": ["**"],
+    "post_tags": ["**"],
+    "fields": {
+        "title": {"number_of_fragments": 0},
+        "content": {"fragment_size": 150, "number_of_fragments": 3}
+    }
+}
+
+
+def build_source_filter(fields: Optional[List[str]] = None, exclude: Optional[List[str]] = None,
+                        highlight: bool = False) -> Dict[str, Any]:
+    """Monta o filtro de _source a partir das projeções pedidas"""
+    fields = list(fields or [])
+    excludes = [f for f in DEFAULT_SOURCE_EXCLUDES if f not in fields] + list(exclude or [])
+    if highlight and "content" not in fields:
+        excludes.append("content")
+
+    source = {"excludes": excludes}
+    if fields:
+        source["includes"] = fields
+    return source
+
+
+def build_search_body(query: str, size: int = 10, source: Optional[Dict[str, Any]] = None,
+                      highlight: bool = False) -> Dict[str, Any]:
+    """Monta o corpo da busca textual (compartilhado com o cliente assíncrono)"""
+    body = {
+        "query": {
+            "multi_match": {
+                "query": query,
+                "fields": ["title^2", "content", "tags"],
+                "type": "best_fields"
+            }
+        },
+        "sort": SEARCH_SORT,
+        "track_total_hits": False,
+        "_source": source or build_source_filter(),
+        "size": size
+    }
+    if highlight:
+        body["highlight"] = HIGHLIGHT
+    return body
+
+
+def build_knn_body(vector: List[float], k: int = 10, num_candidates: Optional[int] = None,
+                   source: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Monta o corpo da busca kNN sobre o campo `embedding`"""
+    # Mais candidatos por shard = melhor recall, maior latência
+    num_candidates = num_candidates or min(max(k * 10, 100), 10000)
+    return {
+        "knn": {
+            "field": "embedding",
+            "query_vector": vector,
+            "k": k,
+            "num_candidates": max(num_candidates, k)
+        },
+        "_source": source or build_source_filter(),
+        "size": k
+    }
+
+
+def build_category_aggregation_body() -> Dict[str, Any]:
+    """Monta o corpo da agregação por categoria"""
+    return {
+        "size": 0,
+        "aggs": {
+            "categories": {
+                "terms": {
+                    "field": "category",
+                    "size": 10
+                }
+            }
+        }
+    }
+
+
+def build_recent_body(limit: int = 5, source: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Monta o corpo da listagem de documentos mais recentes"""
+    return {
+        "query": {"match_all": {}},
+        "sort": RECENT_SORT,
+        "track_total_hits": False,
+        "_source": source or build_source_filter(),
+        "size": limit
+    }
+
 
 class ElasticsearchClient:
-    def __init__(self, host: str = "elasticsearch", port: int = 9200):
-        """Inicializa o cliente Elasticsearch"""
-        self.es = Elasticsearch([f"http://{host}:{port}"])
-        self.index_name = "sample_data"
+    def __init__(self, host: Optional[str] = None, port: int = 9200, cache: ResultCache = None):
+        """Inicializa o cliente Elasticsearch (pool compartilhado, salvo com host explícito)"""
+        if host is None:
+            self.es = connections.get_client()
+        else:
+            self.es = create_client(connections.settings.with_host(host, port))
+        self.index_name = DEFAULT_INDEX
+        self.cache = cache or default_cache
+
+    @property
+    def partitions(self) -> PartitionManager:
+        """Partições atrás de `index_name` (rollover, retenção e alvo das escritas)"""
+        return PartitionManager(self.es, self.index_name, cache=self.cache)
         
     def check_connection(self):
         """Verifica se o Elasticsearch está acessível"""
@@ -20,124 +131,168 @@ class ElasticsearchClient:
             print(f"Erro ao conectar ao Elasticsearch: {e}")
             return False
     
-    def create_index(self):
-        """Cria o índice com mapeamento apropriado"""
-        mapping = {
-            "mappings": {
-                "properties": {
-                    "id": {"type": "keyword"},
-                    "title": {"type": "text"},
-                    "content": {"type": "text"},
-                    "category": {"type": "keyword"},
-                    "tags": {"type": "keyword"},
-                    "created_at": {"type": "date"},
-                    "updated_at": {"type": "date"},
-                    "metadata": {"type": "object"},
-                    "embedding": {"type": "dense_vector", "dims": 384}
-                }
-            }
-        }
-        
-        if not self.es.indices.exists(index=self.index_name):
-            self.es.indices.create(index=self.index_name, body=mapping)
-            print(f"Índice '{self.index_name}' criado com sucesso!")
+    def create_index(self, version: int = MAPPING_VERSION):
+        """Cria a primeira partição com o mapeamento atual, atrás dos aliases de leitura e de escrita"""
+        migration = IndexMigration(self.es, self.index_name, version, self.cache)
+        current = migration.current_version()
+        if current is not None:
+            print(f"Índice '{self.index_name}' já existe (mapeamento v{current}).")
+            if migration.needed():
+                print("   Para atualizar: python -m elasticsearch_client.migration")
+            return
+
+        index = partition_index(self.index_name, version)
+        aliases = {self.index_name: {}, write_alias(self.index_name): {"is_write_index": True}}
+        if self.es.indices.exists(index=index):
+            # Sobrou de uma migração anterior: só volta a ser apontado pelos aliases
+            self.es.indices.update_aliases(actions=[
+                {"add": {"index": index, "alias": alias, **props}} for alias, props in aliases.items()
+            ])
         else:
-            print(f"Índice '{self.index_name}' já existe.")
+            self.es.indices.create(index=index, aliases=aliases, **index_definition(version))
+        self.cache.invalidate(self.index_name)
+        print(f"Índice '{self.index_name}' criado com sucesso! ({index}, mapeamento v{version})")
     
-    def load_sample_data(self):
-        """Carrega dados de exemplo de uma API pública"""
+    def load_sample_data(self, incremental: bool = True):
+        """Carrega dados de exemplo de uma API pública (por padrão só o que mudou)"""
         print("Carregando dados de exemplo...")
         
-        # Usando a API JSONPlaceholder como exemplo
+        # Usando a API JSONPlaceholder como exemplo (posts e usuários buscados em paralelo,
+        # com cache HTTP em data/.http_cache)
         try:
-            # Buscar posts
-            response = requests.get("https://jsonplaceholder.typicode.com/posts")
-            posts = response.json()[:20]  # Limitar a 20 posts
-            
-            # Buscar usuários
-            users_response = requests.get("https://jsonplaceholder.typicode.com/users")
-            users = {user['id']: user for user in users_response.json()}
-            
-            # Indexar dados
-            for post in posts:
-                doc = {
-                    "id": f"post_{post['id']}",
-                    "title": post['title'],
-                    "content": post['body'],
-                    "category": "blog_post",
-                    "tags": ["sample", "jsonplaceholder", f"user_{post['userId']}"],
-                    "created_at": datetime.now().isoformat(),
-                    "updated_at": datetime.now().isoformat(),
-                    "metadata": {
-                        "user_id": post['userId'],
-                        "user_name": users.get(post['userId'], {}).get('name', 'Unknown'),
-                        "user_email": users.get(post['userId'], {}).get('email', '')
-                    }
-                }
-                
-                self.es.index(index=self.index_name, id=doc['id'], body=doc)
-            
-            print(f"{len(posts)} documentos indexados com sucesso!")
+            source = SampleDataSource()
+            self.bulk_index(source.records(), incremental=incremental)
             
         except Exception as e:
             print(f"Erro ao carregar dados: {e}")
     
+    def bulk_index(self, docs: Iterable[Dict[str, Any]], embed: bool = True,
+                   embedding_processes: int = 1, incremental: bool = False,
+                   tune_settings: Optional[bool] = None, **options) -> BulkResult:
+        """Indexa documentos em massa (ponto de entrada para todas as cargas)
+
+        Com incremental=True só documentos novos ou alterados são escritos (e
+        recebem embedding); se nada mudou, o índice não é tocado. Em qualquer
+        carga, documentos novos vão para a partição de escrita e os que já
+        existem, para a partição onde estão (sem duplicar o id entre partições).
+
+        Refresh e réplicas só são desligados durante a carga (tune_settings) em
+        cargas completas de pelo menos TUNE_SETTINGS_MIN_DOCS documentos.
+        """
+        partitions = self.partitions
+        sync = IncrementalSync(self.es, self.index_name, partitions=partitions.partitions())
+        if tune_settings is None:
+            tune_settings = False
+            if not incremental:
+                docs = iter(docs)
+                head = list(itertools.islice(docs, TUNE_SETTINGS_MIN_DOCS))
+                tune_settings = len(head) >= TUNE_SETTINGS_MIN_DOCS
+                docs = itertools.chain(head, docs)
+        if incremental:
+            changed = sync.filter(docs)
+            first = next(changed, None)
+            if first is None:
+                sync.report()
+                return BulkResult()
+            docs = itertools.chain([first], changed)
+        else:
+            docs = sync.locate(docs)
+
+        stage = EmbeddingStage(processes=embedding_processes) if embed else None
+        indexer = BulkIndexer(self.es, partitions.write_target(), route=sync.location, **options)
+        try:
+            result = indexer.index_documents(stage.process(docs) if stage else docs, tune_settings=tune_settings)
+        finally:
+            self.cache.invalidate(self.index_name)
+            if stage:
+                stage.report()
+            if incremental:
+                sync.report()
+        # A carga pode ter levado a partição de escrita ao limite da política de rollover
+        partitions.rollover()
+        return result
+
+    def load_files(self, data_dir: str = DATA_DIR, resume: bool = True, embed: bool = True,
+                   embedding_processes: int = 1, complete: bool = False, **options) -> Dict[str, BulkResult]:
+        """Carrega arquivos NDJSON/JSONL (opcionalmente .gz) do diretório data/.
+
+        Com `complete=True` os arquivos já estão fechados e uma linha final sem '\\n' também é carregada.
+        """
+        partitions = self.partitions
+        stage = EmbeddingStage(processes=embedding_processes) if embed else None
+        try:
+            loader = FileLoader(self.es, partitions.write_target(), embedding_stage=stage,
+                                partitions=partitions.partitions(), **options)
+            results = loader.load_directory(data_dir, resume=resume, complete=complete)
+        finally:
+            self.cache.invalidate(self.index_name)
+            if stage:
+                stage.report()
+        partitions.rollover()
+        return results
+
+    def _check_index_state(self):
+        """Invalida o cache se o índice mudou fora deste processo"""
+        if self.cache.needs_state_check(self.index_name):
+            stats = self.es.indices.stats(index=self.index_name, metric="refresh", level="shards")
+            self.cache.observe_state(self.index_name, state_token(stats))
+
+    def _search_hits(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        response = self.es.search(index=self.index_name, body=body)
+        return [
+            {"_source": hit.get('_source', {}), "sort": hit.get('sort'), "highlight": hit.get('highlight')}
+            for hit in response['hits']['hits']
+        ]
+
+    def _category_counts(self, body: Dict[str, Any]) -> Dict[str, int]:
+        response = self.es.search(index=self.index_name, body=body)
+        buckets = response['aggregations']['categories']['buckets']
+        return {bucket['key']: bucket['doc_count'] for bucket in buckets}
+
     def search(self, query: str, size: int = 10) -> List[Dict[str, Any]]:
         """Realiza busca textual no Elasticsearch"""
-        body = {
-            "query": {
-                "multi_match": {
-                    "query": query,
-                    "fields": ["title^2", "content", "tags"],
-                    "type": "best_fields"
-                }
-            },
-            "size": size
-        }
+        body = build_search_body(query, size)
         
         try:
-            response = self.es.search(index=self.index_name, body=body)
-            hits = response['hits']['hits']
+            self._check_index_state()
+            key = ResultCache.make_key(self.index_name, body)
+            hits = self.cache.get_or_load(key, lambda: self._search_hits(body))
             return [hit['_source'] for hit in hits]
         except Exception as e:
             print(f"Erro na busca: {e}")
             return []
     
+    def count(self) -> int:
+        """Conta os documentos do índice"""
+        return self.es.count(index=self.index_name)['count']
+
     def get_by_id(self, doc_id: str) -> Dict[str, Any]:
-        """Busca documento por ID"""
+        """Busca documento por ID (na partição mais nova que o contém)"""
         try:
-            response = self.es.get(index=self.index_name, id=doc_id)
-            return response['_source']
+            response = self.es.mget(docs=fanout_docs([doc_id], self.partitions.partitions()))
+            return first_found(response['docs'])[doc_id]['_source']
         except Exception as e:
             print(f"Erro ao buscar documento: {e}")
             return {}
     
     def aggregate_by_category(self) -> Dict[str, int]:
         """Agrega documentos por categoria"""
-        body = {
-            "size": 0,
-            "aggs": {
-                "categories": {
-                    "terms": {
-                        "field": "category",
-                        "size": 10
-                    }
-                }
-            }
-        }
+        body = build_category_aggregation_body()
         
         try:
-            response = self.es.search(index=self.index_name, body=body)
-            buckets = response['aggregations']['categories']['buckets']
-            return {bucket['key']: bucket['doc_count'] for bucket in buckets}
+            self._check_index_state()
+            key = ResultCache.make_key(self.index_name, body)
+            return self.cache.get_or_load(key, lambda: self._category_counts(body))
         except Exception as e:
             print(f"Erro na agregação: {e}")
             return {}
     
     def delete_index(self):
-        """Remove o índice (útil para testes)"""
-        if self.es.indices.exists(index=self.index_name):
-            self.es.indices.delete(index=self.index_name)
+        """Remove o índice, ou todos os índices do alias (útil para testes)"""
+        indices, _ = resolve_alias(self.es, self.index_name)
+        if indices:
+            self.es.indices.delete(index=indices)
+            self.cache.invalidate(self.index_name)
             print(f"Índice '{self.index_name}' removido.")
 
 # Teste do cliente
@@ -0,0 +1,257 @@
+import os
+import gzip
+import json
+import mmap
+import time
+import hashlib
+from datetime import datetime
+from contextlib import ExitStack
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from elasticsearch import Elasticsearch
+from elasticsearch_client.bulk import TUNE_SETTINGS_MIN_DOCS, BulkIndexer, BulkResult
+from elasticsearch_client.sync import IncrementalSync
+
+# Diretório montado pelo docker-compose em /app/data
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data")
+SUPPORTED_EXTENSIONS = (".ndjson", ".jsonl", ".ndjson.gz", ".jsonl.gz")
+
+# Bytes iniciais do arquivo que identificam a origem no checkpoint (rotação ou troca do arquivo)
+FINGERPRINT_BYTES = 4096
+
+# Campos do mapeamento criado em ElasticsearchClient.create_index
+SCHEMA_FIELDS = ("id", "title", "content", "category", "tags", "created_at", "updated_at", "metadata")
+
+
+def iter_lines(path: str, start_offset: int = 0, complete: bool = False) -> Iterator[Tuple[bytes, int]]:
+    """Gera (linha, offset do fim da linha) a partir de start_offset.
+
+    Arquivos sem compressão são lidos via mmap; arquivos .gz são descomprimidos
+    em streaming e o offset refere-se aos bytes descomprimidos.
+
+    Uma linha final sem '\\n' pode ser um registro ainda sendo escrito: só é
+    gerada com `complete=True`; senão fica para a próxima carga.
+    """
+    if path.endswith(".gz"):
+        offset = 0
+        with gzip.open(path, "rb") as f:
+            for line in f:
+                if not complete and not line.endswith(b"\n"):
+                    return
+                offset += len(line)
+                if offset > start_offset:
+                    yield line, offset
+        return
+
+    if os.path.getsize(path) == 0:
+        return
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        pos = start_offset
+        while pos < size:
+            end = mm.find(b"\n", pos)
+            if end == -1 and not complete:
+                return
+            end = size if end == -1 else end + 1
+            yield mm[pos:end], end
+            pos = end
+
+
+def map_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte um registro arbitrário para o schema do índice"""
+    now = datetime.now().isoformat()
+    content = record.get("content", record.get("body", record.get("text", "")))
+
+    doc_id = record.get("id", record.get("_id"))
+    if doc_id is None:
+        # Sem ID explícito: usa um hash estável do conteúdo para manter a carga idempotente
+        doc_id = hashlib.sha1(json.dumps(record, sort_keys=True).encode("utf-8")).hexdigest()
+
+    tags = record.get("tags", [])
+    if isinstance(tags, str):
+        tags = [tags]
+
+    metadata = dict(record.get("metadata") or {})
+    for key, value in record.items():
+        if key not in SCHEMA_FIELDS and key not in ("_id", "body", "text"):
+            metadata[key] = value
+
+    return {
+        "id": str(doc_id),
+        "title": record.get("title", ""),
+        "content": content,
+        "category": record.get("category", "file"),
+        "tags": tags,
+        "created_at": record.get("created_at", now),
+        "updated_at": record.get("updated_at", record.get("created_at", now)),
+        "metadata": metadata
+    }
+
+
+def _fingerprint(path: str, length: int) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+class Checkpoint:
+    """Checkpoint de offset persistido ao lado dos dados (data/.checkpoints).
+
+    Guarda também o inode e um hash dos primeiros bytes da origem: um arquivo
+    rotacionado ou substituído (mesmo que maior) recomeça do zero, enquanto um
+    arquivo que só cresceu no fim continua do offset salvo.
+    """
+
+    def __init__(self, path: str, checkpoint_dir: Optional[str] = None):
+        self.source = path
+        checkpoint_dir = checkpoint_dir or os.path.join(os.path.dirname(path), ".checkpoints")
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        self.path = os.path.join(checkpoint_dir, os.path.basename(path) + ".json")
+
+    def load(self) -> int:
+        """Retorna o offset salvo, ou 0 se o arquivo de origem mudou"""
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return 0
+
+        size = os.path.getsize(self.source)
+        # Arquivo substituído por um menor: recomeça do zero
+        if state.get("source_size", 0) > size:
+            return 0
+        # Outro arquivo no mesmo caminho (rotação, cópia por cima): recomeça do zero
+        if state.get("inode") not in (None, os.stat(self.source).st_ino):
+            return 0
+        head = state.get("head_bytes")
+        if head is not None and _fingerprint(self.source, head) != state.get("head_sha1"):
+            return 0
+        return state.get("offset", 0)
+
+    def save(self, offset: int):
+        """Grava o offset de forma atômica"""
+        tmp = self.path + ".tmp"
+        stat = os.stat(self.source)
+        head = min(stat.st_size, FINGERPRINT_BYTES)
+        with open(tmp, "w") as f:
+            json.dump({
+                "offset": offset,
+                "source_size": stat.st_size,
+                "inode": stat.st_ino,
+                "head_bytes": head,
+                "head_sha1": _fingerprint(self.source, head),
+                "saved_at": datetime.now().isoformat()
+            }, f)
+        os.replace(tmp, self.path)
+
+
+class FileLoader:
+    """Carrega arquivos NDJSON/JSONL (opcionalmente .gz) em lotes de tamanho fixo.
+
+    Apenas um lote fica em memória por vez e o checkpoint avança depois que cada
+    lote é confirmado pelo Elasticsearch, permitindo retomar cargas interrompidas.
+    Um lote com falhas congela o checkpoint no seu início: o resto do arquivo
+    ainda é carregado, mas a próxima carga reenvia a partir dali (os IDs são
+    estáveis, então os documentos já gravados são apenas sobrescritos).
+
+    Com `partitions`, os IDs de cada lote são procurados em todas elas: os que
+    já existem são gravados na partição onde estão, e não em `index_name`.
+    """
+
+    def __init__(self, es: Elasticsearch, index_name: str, batch_size: int = 5000,
+                 embedding_stage=None, partitions: Optional[List[str]] = None, **bulk_options):
+        self.sync = IncrementalSync(es, index_name, partitions=partitions)
+        self.indexer = BulkIndexer(es, index_name, route=self.sync.location, **bulk_options)
+        self.batch_size = batch_size
+        self.embedding_stage = embedding_stage
+
+    def _records(self, path: str, start_offset: int, stats: Dict[str, int],
+                 complete: bool = False) -> Iterator[Tuple[Dict[str, Any], int]]:
+        """Gera (documento, offset) ignorando linhas vazias ou inválidas"""
+        for line, offset in iter_lines(path, start_offset, complete):
+            stats["offset"] = offset
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                stats["invalid"] += 1
+                continue
+            if not isinstance(record, dict):
+                stats["invalid"] += 1
+                continue
+            yield map_record(record), offset
+
+    def _batches(self, path: str, start_offset: int, stats: Dict[str, int],
+                 complete: bool = False) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+        """Agrupa os documentos em lotes, retornando o offset do fim de cada lote"""
+        records = self._records(path, start_offset, stats, complete)
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                return
+            yield [doc for doc, _ in batch], batch[-1][1]
+
+    def load_file(self, path: str, resume: bool = True, complete: bool = False) -> BulkResult:
+        """Carrega um arquivo, retomando do último checkpoint quando existir.
+
+        Sem `complete`, o arquivo pode estar crescendo: uma linha final sem '\\n' não é
+        carregada e o checkpoint para antes dela.
+        """
+        checkpoint = Checkpoint(path)
+        offset = checkpoint.load() if resume else 0
+        if offset:
+            print(f"Retomando '{os.path.basename(path)}' a partir do byte {offset}")
+
+        result = BulkResult()
+        stats = {"invalid": 0, "offset": offset}
+        start = time.perf_counter()
+
+        failed_at: Optional[int] = None
+        batch_start = offset
+        tuned = False
+        with ExitStack() as tuning:
+            for docs, end_offset in self._batches(path, offset, stats, complete):
+                # Arquivos grandes: refresh e réplicas desligados só depois de TUNE_SETTINGS_MIN_DOCS
+                if not tuned and result.indexed + result.failed >= TUNE_SETTINGS_MIN_DOCS:
+                    tuning.enter_context(self.indexer.bulk_settings())
+                    tuned = True
+                if self.embedding_stage:
+                    docs = self.embedding_stage.embed_documents(docs)
+                failed = result.failed
+                self.indexer.send(self.sync.locate(docs), result)
+                # As partições do lote só servem para o envio dele
+                self.sync.locations.clear()
+                if failed_at is None and result.failed > failed:
+                    failed_at = batch_start
+                if failed_at is None:
+                    checkpoint.save(end_offset)
+                batch_start = end_offset
+
+        if failed_at is not None:
+            print(f"   Falhas a partir do byte {failed_at}: o checkpoint parou ali para reenviar na próxima carga")
+        elif stats["offset"] > offset:
+            # Linhas finais vazias ou inválidas também contam como processadas
+            checkpoint.save(stats["offset"])
+
+        result.elapsed = time.perf_counter() - start
+        print(f"Arquivo '{os.path.basename(path)}':")
+        BulkIndexer.report(result)
+        if stats["invalid"]:
+            print(f"   {stats['invalid']} linhas inválidas ignoradas")
+        if not complete and not path.endswith(".gz") and os.path.getsize(path) > stats["offset"]:
+            print(f"   Linha final sem '\\n' a partir do byte {stats['offset']}: fica para a próxima carga")
+        return result
+
+    def load_directory(self, data_dir: str = DATA_DIR, resume: bool = True,
+                       complete: bool = False) -> Dict[str, BulkResult]:
+        """Carrega todos os arquivos suportados de um diretório"""
+        results = {}
+        if not os.path.isdir(data_dir):
+            print(f"Diretório '{data_dir}' não encontrado")
+            return results
+
+        for name in sorted(os.listdir(data_dir)):
+            if name.endswith(SUPPORTED_EXTENSIONS):
+                results[name] = self.load_file(os.path.join(data_dir, name), resume=resume, complete=complete)
+        return results
@@ -0,0 +1,99 @@
+"""Versões do mapeamento e das configurações do índice.
+
+O nome usado pelos clientes (`sample_data`) é um alias; cada versão vive em
+partições próprias (`sample_data_v2-000001`, elasticsearch_client.partitions) e a
+migração troca os aliases de uma vez só (elasticsearch_client.migration). A
+versão fica em `mappings._meta.version`.
+
+Versão 2:
+- `metadata` é `flattened`: chaves novas não viram campos mapeados (sem
+  explosão de mapeamento) e continuam filtráveis como `metadata.<chave>`;
+- `category`/`tags` carregam os global ordinals no refresh, e não na primeira
+  agregação depois dele (a agregação de estatísticas roda a cada leitura);
+- índice ordenado por `created_at` desc e `id`, a mesma ordem de RECENT_SORT,
+  para que list_recent_documents pare no primeiro segmento que basta;
+- `title`/`content` indexam offsets, então o destaque não reanalisa o texto;
+  as normas ficam, porque o BM25 do multi_match depende do tamanho do campo;
+- `content_hash` só é lido do _source pela carga incremental: sem índice e
+  sem doc_values.
+"""
+import os
+import copy
+from typing import Any, Dict, Optional
+from elasticsearch_client.embeddings import EMBEDDING_DIMS
+
+MAPPING_VERSION = 2
+# Alias de leitura usado por todos os clientes (as partições ficam atrás dele)
+DEFAULT_INDEX = os.getenv("ELASTICSEARCH_INDEX", "sample_data")
+
+
+def _embedding() -> Dict[str, Any]:
+    return {
+        "type": "dense_vector",
+        "dims": EMBEDDING_DIMS,
+        "index": True,
+        "similarity": "dot_product"  # vetores já normalizados
+    }
+
+
+INDEX_VERSIONS: Dict[int, Dict[str, Any]] = {
+    1: {
+        "settings": {},
+        "mappings": {
+            "_meta": {"version": 1},
+            "properties": {
+                "id": {"type": "keyword"},
+                "title": {"type": "text"},
+                "content": {"type": "text"},
+                "category": {"type": "keyword"},
+                "tags": {"type": "keyword"},
+                "created_at": {"type": "date"},
+                "updated_at": {"type": "date"},
+                "metadata": {"type": "object"},
+                "content_hash": {"type": "keyword", "index": False},  # usado pela carga incremental
+                "embedding": _embedding()
+            }
+        }
+    },
+    2: {
+        "settings": {
+            "index": {
+                # Mesma ordem de RECENT_SORT (pagination.py): permite encerrar a busca cedo
+                "sort.field": ["created_at", "id"],
+                "sort.order": ["desc", "asc"]
+            }
+        },
+        "mappings": {
+            "_meta": {"version": 2},
+            "properties": {
+                "id": {"type": "keyword"},
+                "title": {"type": "text", "index_options": "offsets"},
+                "content": {"type": "text", "index_options": "offsets"},
+                "category": {"type": "keyword", "eager_global_ordinals": True},
+                "tags": {"type": "keyword", "eager_global_ordinals": True},
+                "created_at": {"type": "date"},
+                "updated_at": {"type": "date"},
+                "metadata": {"type": "flattened"},
+                "content_hash": {"type": "keyword", "index": False, "doc_values": False},
+                "embedding": _embedding()
+            }
+        }
+    },
+}
+
+
+def index_definition(version: int = MAPPING_VERSION) -> Dict[str, Any]:
+    """Corpo do create index (settings + mappings) de uma versão"""
+    if version not in INDEX_VERSIONS:
+        raise ValueError(f"Versão de mapeamento desconhecida: {version}")
+    return copy.deepcopy(INDEX_VERSIONS[version])
+
+
+def versioned_index(alias: str, version: int = MAPPING_VERSION) -> str:
+    """Nome do índice concreto de uma versão (ex: sample_data_v2)"""
+    return f"{alias}_v{version}"
+
+
+def mapping_version(mapping: Optional[Dict[str, Any]]) -> int:
+    """Versão de um mapeamento lido do cluster; índices sem `_meta` são da versão 1"""
+    return int(((mapping or {}).get("_meta") or {}).get("version", 1))
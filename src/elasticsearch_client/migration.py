@@ -0,0 +1,196 @@
+"""Migração do índice para uma nova versão de mapeamento, sem indisponibilidade de leitura.
+
+1. cria a partição `<alias>_v<N>-000001` com o mapeamento novo (sem refresh nem
+   réplicas na carga);
+2. copia os documentos de todas as partições atuais com _reindex, com as
+   escritas liberadas;
+3. bloqueia as escritas (só agora, por poucos segundos), copia de novo os
+   documentos escritos desde o início do passo 2 e confere a contagem. A recópia
+   usa o `_seq_no` de cada partição (anotado antes do passo 2), não os campos de
+   data: as cargas de arquivo mantêm o `created_at`/`updated_at` do registro;
+4. troca os aliases de leitura e de escrita em uma única chamada _aliases
+   (atômica): as buscas passam das partições antigas para a nova sem janela vazia;
+5. libera as escritas nas partições antigas (ou as remove com --delete-old).
+
+Documentos removidos durante o passo 2 fazem a contagem divergir: a migração é
+desfeita e pode ser repetida.
+
+Se o nome ainda é um índice concreto (instalações anteriores ao alias), o passo 4
+o remove na mesma chamada que cria o alias (`remove_index`).
+
+Uso: cd src && python -m elasticsearch_client.migration [--alias sample_data] [--version 2] [--delete-old]
+"""
+import time
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+from elasticsearch import Elasticsearch, NotFoundError
+from elasticsearch_client.cache import ResultCache, default_cache
+from elasticsearch_client.connection import connections
+from elasticsearch_client.mappings import DEFAULT_INDEX, MAPPING_VERSION, index_definition, mapping_version
+from elasticsearch_client.partitions import partition_index, write_alias
+
+# A cópia pode passar muito do request_timeout padrão do cliente
+REINDEX_TIMEOUT = 3600
+WRITE_BLOCK = "index.blocks.write"
+
+
+class MigrationError(RuntimeError):
+    """Migração interrompida; o alias continua apontando para o índice antigo"""
+
+
+def resolve_alias(es: Elasticsearch, name: str) -> Tuple[List[str], bool]:
+    """(índices concretos, é alias?) para um nome; lista vazia se não existe"""
+    try:
+        return sorted(es.indices.get_alias(name=name)), True
+    except NotFoundError:
+        pass
+    if es.indices.exists(index=name):
+        return [name], False
+    return [], False
+
+
+class IndexMigration:
+    def __init__(self, es: Optional[Elasticsearch] = None, alias: str = DEFAULT_INDEX,
+                 version: int = MAPPING_VERSION, cache: ResultCache = None):
+        self.es = es or connections.get_client()
+        self.alias = alias
+        self.version = version
+        self.target = partition_index(alias, version)
+        self.cache = cache or default_cache
+
+    def current_version(self) -> Optional[int]:
+        sources, _ = resolve_alias(self.es, self.alias)
+        if not sources:
+            return None
+        mappings = self.es.indices.get_mapping(index=sources)
+        return max(mapping_version(m.get("mappings")) for m in mappings.values())
+
+    def needed(self) -> bool:
+        """Há índice a migrar: versão anterior ou instalação ainda sem o alias de escrita"""
+        current = self.current_version()
+        if current is None:
+            return False
+        return current < self.version or not resolve_alias(self.es, write_alias(self.alias))[0]
+
+    def run(self, delete_old: bool = False) -> Dict[str, Any]:
+        """Executa a migração; devolve um resumo"""
+        sources, is_alias = resolve_alias(self.es, self.alias)
+        if not sources:
+            raise MigrationError(f"'{self.alias}' não existe; crie o índice com create_index()")
+        if self.target in sources:
+            print(f"'{self.alias}' já aponta para '{self.target}'.")
+            return {"alias": self.alias, "index": self.target, "migrated": False}
+        if self.es.indices.exists(index=self.target):
+            raise MigrationError(f"'{self.target}' já existe sem o alias (migração anterior interrompida?); "
+                                 f"remova-o antes de tentar de novo")
+
+        start = time.perf_counter()
+        definition = index_definition(self.version)
+        index_settings = definition["settings"].setdefault("index", {})
+        replicas = index_settings.get("number_of_replicas")
+        index_settings.update({"refresh_interval": "-1", "number_of_replicas": 0})
+        self.es.indices.create(index=self.target, settings=definition["settings"], mappings=definition["mappings"])
+        print(f"Índice '{self.target}' criado (versão {self.version}).")
+
+        try:
+            checkpoints = self._checkpoints(sources)
+            copied = self._copy(sources)
+            # Réplicas montadas enquanto as escritas ainda estão liberadas
+            self.es.indices.put_settings(index=self.target, settings={
+                "index.refresh_interval": None,
+                "index.number_of_replicas": replicas
+            })
+
+            self.es.indices.put_settings(index=sources, settings={WRITE_BLOCK: True})
+            blocked = time.perf_counter()
+            self.es.indices.refresh(index=sources)
+            caught_up = self._copy(sources, since=checkpoints)
+            self.es.indices.refresh(index=self.target)
+            self._verify(sources)
+            self._swap(sources, is_alias, resolve_alias(self.es, write_alias(self.alias))[0])
+        except Exception:
+            self.es.indices.delete(index=self.target, ignore_unavailable=True)
+            self.es.indices.put_settings(index=sources, settings={WRITE_BLOCK: None})
+            raise
+
+        self.cache.invalidate(self.alias)
+        kept = [s for s in sources if is_alias]
+        if kept and delete_old:
+            self.es.indices.delete(index=kept)
+            print(f"Índices antigos removidos: {', '.join(kept)}")
+        elif kept:
+            self.es.indices.put_settings(index=kept, settings={WRITE_BLOCK: None})
+            print(f"Índices antigos mantidos (sem o alias): {', '.join(kept)}")
+
+        elapsed = time.perf_counter() - start
+        blocked = time.perf_counter() - blocked
+        print(f"'{self.alias}' agora aponta para '{self.target}': {copied} documentos em {elapsed:.1f}s "
+              f"({caught_up} recopiados com escritas bloqueadas por {blocked:.1f}s)")
+        return {"alias": self.alias, "index": self.target, "previous": sources, "documents": copied,
+                "caught_up": caught_up, "seconds": round(elapsed, 3), "blocked_seconds": round(blocked, 3),
+                "migrated": True}
+
+    def _checkpoints(self, sources: List[str]) -> Dict[str, int]:
+        """Menor max_seq_no entre os shards primários de cada partição.
+
+        Toda escrita posterior recebe um `_seq_no` maior que o máximo do seu shard e,
+        portanto, maior que este mínimo; o que sobra de outros shards só é recopiado à toa.
+        """
+        stats = self.es.indices.stats(index=sources, level="shards")["indices"]
+        return {index: min(copy["seq_no"]["max_seq_no"] for copies in stats[index]["shards"].values()
+                           for copy in copies if copy["routing"]["primary"])
+                for index in sources}
+
+    def _copy(self, sources: List[str], since: Optional[Dict[str, int]] = None) -> int:
+        """Copia as partições para o índice novo; com `since` (partição -> _seq_no), só o que foi
+        escrito depois (sobrescrevendo)"""
+        source: Dict[str, Any] = {"index": sources}
+        if since is not None:
+            source["query"] = {"bool": {"should": [
+                {"bool": {"filter": [{"term": {"_index": index}}, {"range": {"_seq_no": {"gt": seq_no}}}]}}
+                for index, seq_no in since.items()
+            ], "minimum_should_match": 1}}
+        response = self.es.options(request_timeout=REINDEX_TIMEOUT).reindex(
+            source=source,
+            dest={"index": self.target, "op_type": "create" if since is None else "index"},
+            slices="auto",
+            wait_for_completion=True
+        )
+        if response.get("failures"):
+            raise MigrationError(f"Falhas no reindex: {response['failures'][:5]}")
+        return response.get("created", 0) + response.get("updated", 0)
+
+    def _verify(self, sources: List[str]):
+        before = self.es.count(index=sources)["count"]
+        after = self.es.count(index=self.target)["count"]
+        if before != after:
+            raise MigrationError(f"Contagem divergente: {before} no índice atual, {after} em '{self.target}'")
+
+    def _swap(self, sources: List[str], is_alias: bool, writers: List[str]):
+        """Aponta os aliases de leitura e de escrita para a partição nova em uma única ação atômica"""
+        actions: List[Dict[str, Any]] = [
+            {"add": {"index": self.target, "alias": self.alias}},
+            {"add": {"index": self.target, "alias": write_alias(self.alias), "is_write_index": True}}
+        ]
+        actions += [{"remove": {"index": writer, "alias": write_alias(self.alias)}} for writer in writers]
+        if is_alias:
+            actions += [{"remove": {"index": source, "alias": self.alias}} for source in sources]
+        else:
+            actions.append({"remove_index": {"index": self.alias}})
+        self.es.indices.update_aliases(actions=actions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migra o índice para uma versão de mapeamento via alias.")
+    parser.add_argument("--alias", default=DEFAULT_INDEX)
+    parser.add_argument("--version", type=int, default=MAPPING_VERSION)
+    parser.add_argument("--delete-old", action="store_true", help="remove os índices antigos após a troca")
+    args = parser.parse_args()
+
+    migration = IndexMigration(alias=args.alias, version=args.version)
+    print(f"Versão atual de '{args.alias}': {migration.current_version()}; destino: {args.version}")
+    migration.run(delete_old=args.delete_old)
+
+
+if __name__ == "__main__":
+    main()
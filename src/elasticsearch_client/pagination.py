@@ -0,0 +1,60 @@
+import json
+import base64
+from typing import Any, Dict, Iterable, List
+
+# Tempo que o Elasticsearch mantém o point-in-time aberto entre duas páginas
+PIT_KEEP_ALIVE = "2m"
+
+# Ordenações com desempate por `id` para que as páginas sejam estáveis
+SEARCH_SORT = [{"_score": {"order": "desc"}}, {"id": {"order": "asc"}}]
+RECENT_SORT = [{"created_at": {"order": "desc"}}, {"id": {"order": "asc"}}]
+
+# IDs aceitos por chamada de get_documents_by_ids (cada um vira um item do _mget)
+MAX_DOCUMENT_IDS = 1000
+
+
+class InvalidCursorError(ValueError):
+    """Cursor malformado ou point-in-time expirado"""
+
+
+class InvalidArgumentError(ValueError):
+    """Argumento de ferramenta com tipo ou tamanho inválido"""
+
+
+class InvalidPageSizeError(InvalidArgumentError):
+    """Tamanho de página (size/limit) menor que 1 ou não inteiro"""
+
+
+def page_size(value: Any, name: str = "size") -> int:
+    """Valida o tamanho de página pedido por uma ferramenta"""
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise InvalidPageSizeError(f"'{name}' deve ser um inteiro maior ou igual a 1")
+    return value
+
+
+def document_ids(value: Any, name: str = "document_ids") -> List[str]:
+    """Valida a lista de IDs pedida por uma ferramenta (não vazia, só strings, até MAX_DOCUMENT_IDS)"""
+    if not isinstance(value, list) or not value or not all(isinstance(i, str) for i in value):
+        raise InvalidArgumentError(f"'{name}' deve ser uma lista não vazia de strings")
+    if len(value) > MAX_DOCUMENT_IDS:
+        raise InvalidArgumentError(f"'{name}' aceita no máximo {MAX_DOCUMENT_IDS} IDs")
+    return value
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Serializa o estado da paginação em um token opaco"""
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, required: Iterable[str] = ("pit", "after", "kind", "size")) -> Dict[str, Any]:
+    """Recupera o estado da paginação a partir do token"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Cursor inválido")
+
+    if not isinstance(state, dict) or not set(required) <= state.keys():
+        raise InvalidCursorError("Cursor inválido")
+    return state
@@ -0,0 +1,243 @@
+"""Partições por tempo atrás de aliases de leitura e escrita.
+
+- `sample_data` (leitura) aponta para todas as partições;
+- `sample_data-write` aponta só para a mais nova (is_write_index);
+- as partições se chamam `<alias>_v<versão>-<geração>` (ex: sample_data_v2-000003) e o
+  rollover cria a próxima quando a atual passa do tamanho, do número de documentos
+  ou da idade configurados (ELASTICSEARCH_ROLLOVER_*);
+- a retenção apaga partições inteiras cujo documento mais novo já passou do prazo,
+  sem delete-by-query nem merges para expurgar documentos apagados.
+
+Uso: cd src && python -m elasticsearch_client.partitions list|rollover|retention
+     [--alias sample_data] [--max-age 30d] [--max-docs N] [--max-size 50gb] [--retention 365d] [--dry-run]
+"""
+import os
+import re
+import time
+import argparse
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+from elasticsearch import Elasticsearch, NotFoundError
+from elasticsearch_client.cache import ResultCache, default_cache
+from elasticsearch_client.connection import connections
+from elasticsearch_client.mappings import DEFAULT_INDEX, index_definition, mapping_version, versioned_index
+
+WRITE_ALIAS_SUFFIX = "-write"
+# <alias>_v<versão>[-<geração>]; nomes fora do padrão (índice antigo sem versão) ficam por último
+PARTITION_NAME = re.compile(r"_v(\d+)(?:-(\d+))?$")
+DURATION = re.compile(r"^(\d+)([dhms])$")
+DURATION_UNITS = {"d": "days", "h": "hours", "m": "minutes", "s": "seconds"}
+
+
+def write_alias(alias: str) -> str:
+    return f"{alias}{WRITE_ALIAS_SUFFIX}"
+
+
+def partition_index(alias: str, version: int, generation: int = 1) -> str:
+    """Nome de uma partição; o sufixo numérico é o que o rollover incrementa"""
+    return f"{versioned_index(alias, version)}-{generation:06d}"
+
+
+def partition_order(indices: Iterable[str]) -> List[str]:
+    """Partições da mais nova para a mais antiga (versão, depois geração)"""
+    def key(index: str):
+        match = PARTITION_NAME.search(index)
+        return (int(match.group(1)), int(match.group(2) or 0)) if match else (0, 0)
+    return sorted(indices, key=key, reverse=True)
+
+
+def partition_bounds_body() -> Dict[str, Any]:
+    """Uma busca size: 0 com o `created_at` mais novo de cada partição"""
+    return {
+        "size": 0,
+        "aggs": {
+            "partitions": {
+                "terms": {"field": "_index", "size": 1000},
+                "aggs": {"newest": {"max": {"field": "created_at"}}}
+            }
+        }
+    }
+
+
+def parse_partition_bounds(response: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """{partição: created_at mais novo em epoch ms}; partições vazias não aparecem"""
+    buckets = response.get('aggregations', {}).get('partitions', {}).get('buckets', [])
+    return {bucket['key']: bucket['newest'].get('value') for bucket in buckets}
+
+
+def fanout_docs(ids: List[str], partitions: List[str]) -> List[Dict[str, str]]:
+    """Itens de um _mget que procura cada id em todas as partições, da mais nova para a mais antiga.
+
+    Um alias com vários índices não aceita operações de índice único (get/mget
+    pelo alias), e o _mget continua em tempo real, ao contrário de uma busca.
+    """
+    return [{"_index": index, "_id": doc_id} for doc_id in ids for index in partitions]
+
+
+def first_found(docs: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Primeira ocorrência encontrada de cada id (a da partição mais nova)"""
+    found: Dict[str, Dict[str, Any]] = {}
+    for doc in docs:
+        if doc.get('found') and doc['_id'] not in found:
+            found[doc['_id']] = doc
+    return found
+
+
+def parse_duration(value: str) -> timedelta:
+    match = DURATION.match(value.strip())
+    if not match:
+        raise ValueError(f"Duração inválida: '{value}' (use ex: 30d, 12h)")
+    return timedelta(**{DURATION_UNITS[match.group(2)]: int(match.group(1))})
+
+
+@dataclass
+class RolloverPolicy:
+    """Condições do rollover; basta uma delas para criar a próxima partição"""
+    max_primary_shard_size: Optional[str] = "50gb"
+    max_docs: Optional[int] = None
+    max_age: Optional[str] = None
+
+    @classmethod
+    def from_env(cls) -> "RolloverPolicy":
+        max_docs = os.getenv("ELASTICSEARCH_ROLLOVER_MAX_DOCS")
+        return cls(
+            max_primary_shard_size=os.getenv("ELASTICSEARCH_ROLLOVER_MAX_SIZE", "50gb") or None,
+            max_docs=int(max_docs) if max_docs else None,
+            max_age=os.getenv("ELASTICSEARCH_ROLLOVER_MAX_AGE") or None
+        )
+
+    def conditions(self) -> Dict[str, Any]:
+        conditions = {"max_primary_shard_size": self.max_primary_shard_size, "max_docs": self.max_docs,
+                      "max_age": self.max_age}
+        return {k: v for k, v in conditions.items() if v is not None}
+
+
+class PartitionManager:
+    """Rollover, retenção e inventário das partições de um alias"""
+
+    def __init__(self, es: Optional[Elasticsearch] = None, alias: str = DEFAULT_INDEX,
+                 policy: Optional[RolloverPolicy] = None, cache: ResultCache = None):
+        self.es = es or connections.get_client()
+        self.alias = alias
+        self.policy = policy or RolloverPolicy.from_env()
+        self.cache = cache or default_cache
+
+    def partitions(self) -> List[str]:
+        """Índices do alias de leitura, do mais novo para o mais antigo"""
+        try:
+            return partition_order(self.es.indices.get_alias(name=self.alias))
+        except NotFoundError:
+            return [self.alias] if self.es.indices.exists(index=self.alias) else []
+
+    def write_index(self) -> Optional[str]:
+        try:
+            aliases = self.es.indices.get_alias(name=write_alias(self.alias))
+        except NotFoundError:
+            return None
+        for index, info in aliases.items():
+            props = info.get('aliases', {}).get(write_alias(self.alias), {})
+            if props.get('is_write_index') or len(aliases) == 1:
+                return index
+        return None
+
+    def write_target(self) -> str:
+        """Nome para escrever: o alias de escrita, ou o de leitura em instalações sem partições"""
+        return write_alias(self.alias) if self.write_index() else self.alias
+
+    def bounds(self) -> Dict[str, Optional[float]]:
+        return parse_partition_bounds(self.es.search(index=self.alias, body=partition_bounds_body()))
+
+    def rollover(self, dry_run: bool = False) -> Dict[str, Any]:
+        """Cria a próxima partição se a atual atingiu alguma condição da política"""
+        conditions = self.policy.conditions()
+        current = self.write_index()
+        if not conditions or current is None:
+            return {"rolled_over": False, "old_index": current}
+
+        # A partição nova nasce com o mapeamento da atual e já no alias de leitura
+        mapping = self.es.indices.get_mapping(index=current)[current]['mappings']
+        definition = index_definition(mapping_version(mapping))
+        response = self.es.indices.rollover(
+            alias=write_alias(self.alias),
+            conditions=conditions,
+            dry_run=dry_run,
+            aliases={self.alias: {}},
+            settings=definition["settings"],
+            mappings=definition["mappings"]
+        )
+        if response.get('rolled_over'):
+            self.cache.invalidate(self.alias)
+            print(f"Rollover: '{response['old_index']}' -> '{response['new_index']}' "
+                  f"({', '.join(k for k, hit in response.get('conditions', {}).items() if hit)})")
+        return response
+
+    def apply_retention(self, max_age: str, dry_run: bool = False) -> List[str]:
+        """Apaga as partições (nunca a de escrita) cujo documento mais novo é anterior ao prazo"""
+        cutoff = (time.time() - parse_duration(max_age).total_seconds()) * 1000
+        partitions = self.partitions()
+        protected = {self.write_index(), partitions[0] if partitions else None}
+        bounds = self.bounds()
+        expired = [index for index in partitions
+                   if index not in protected and (bounds.get(index) is None or bounds[index] < cutoff)]
+        if expired and not dry_run:
+            self.es.indices.delete(index=expired)
+            self.cache.invalidate(self.alias)
+        if expired:
+            print(f"Retenção ({max_age}): {'seriam removidas' if dry_run else 'removidas'} {', '.join(expired)}")
+        return expired
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Documentos, tamanho e documento mais novo de cada partição"""
+        partitions = self.partitions()
+        if not partitions:
+            return []
+        stats = self.es.indices.stats(index=self.alias, metric="docs,store")['indices']
+        bounds = self.bounds()
+        write = self.write_index()
+        return [{
+            "index": index,
+            "write": index == write,
+            "docs": stats.get(index, {}).get('primaries', {}).get('docs', {}).get('count', 0),
+            "size_in_bytes": stats.get(index, {}).get('primaries', {}).get('store', {}).get('size_in_bytes', 0),
+            "newest": bounds.get(index)
+        } for index in partitions]
+
+
+def _date(millis: Optional[float]) -> str:
+    return datetime.fromtimestamp(millis / 1000, timezone.utc).isoformat(timespec="seconds") if millis else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rollover e retenção das partições do índice.")
+    parser.add_argument("command", choices=["list", "rollover", "retention"])
+    parser.add_argument("--alias", default=DEFAULT_INDEX)
+    parser.add_argument("--max-size", help="tamanho máximo do shard primário (ex: 50gb)")
+    parser.add_argument("--max-docs", type=int)
+    parser.add_argument("--max-age", help="idade máxima da partição de escrita (ex: 30d)")
+    parser.add_argument("--retention", default=os.getenv("ELASTICSEARCH_RETENTION"),
+                        help="apaga partições cujo documento mais novo é mais antigo que isto (ex: 365d)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    policy = RolloverPolicy.from_env()
+    if args.max_size or args.max_docs or args.max_age:
+        policy = RolloverPolicy(args.max_size, args.max_docs, args.max_age)
+    manager = PartitionManager(alias=args.alias, policy=policy)
+
+    if args.command == "rollover":
+        response = manager.rollover(dry_run=args.dry_run)
+        if not response.get('rolled_over'):
+            print(f"Sem rollover: {response.get('conditions') or 'nenhuma condição atingida'}")
+    elif args.command == "retention":
+        if not args.retention:
+            parser.error("informe --retention ou ELASTICSEARCH_RETENTION")
+        if not manager.apply_retention(args.retention, dry_run=args.dry_run):
+            print("Nenhuma partição fora do prazo")
+    for partition in manager.describe():
+        print(f"   {'*' if partition['write'] else ' '} {partition['index']:<32} {partition['docs']:>10} docs "
+              f"{partition['size_in_bytes'] / 1024 / 1024:>10.1f} MB   mais novo: {_date(partition['newest'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+# Fração do tempo restante dada ao Elasticsearch (`timeout` da busca); a folga
+# garante que os shards devolvam resultados parciais antes do request_timeout
+ES_TIMEOUT_FRACTION = 0.8
+
+
+class RequestContext:
+    """Prazo e identificação de uma requisição MCP, visíveis a todas as chamadas ao ES.
+
+    Fica em uma ContextVar, então as tasks criadas durante a requisição herdam
+    o mesmo objeto; `partial` é marcado quando alguma busca volta com timed_out.
+    """
+
+    def __init__(self, timeout: Optional[float] = None, opaque_id: Optional[str] = None):
+        self.deadline = time.monotonic() + timeout if timeout else None
+        self.opaque_id = opaque_id or f"mcp-{uuid.uuid4().hex[:16]}"
+        self.partial = False
+        # Quando é uma lista, cada busca da requisição é anotada nela (log de lentas)
+        self.searches: Optional[List[Dict[str, Any]]] = None
+        self._clients: Dict[int, Any] = {}
+
+    def remaining(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0.001)
+
+    def es_timeout(self) -> Optional[str]:
+        """Valor do parâmetro `timeout` das buscas (ex: '800ms')"""
+        remaining = self.remaining()
+        if remaining is None:
+            return None
+        return f"{max(int(remaining * ES_TIMEOUT_FRACTION * 1000), 1)}ms"
+
+    def es_options(self) -> Dict[str, Any]:
+        """Opções por requisição do cliente: X-Opaque-Id e, com prazo, request_timeout sem retry"""
+        options: Dict[str, Any] = {"opaque_id": self.opaque_id}
+        remaining = self.remaining()
+        if remaining is not None:
+            # Repetir após estourar o prazo só gastaria o cluster com uma resposta que ninguém lerá
+            options.update(request_timeout=remaining, retry_on_timeout=False)
+        return options
+
+    def client(self, es):
+        """`es.options()` desta requisição, criado uma vez só.
+
+        Cada options() recria os ~35 clientes de namespace (~120 µs); o
+        request_timeout fica o do primeiro uso, e o prazo exato continua
+        garantido pelo asyncio.timeout do servidor e pelo `timeout` das buscas.
+        """
+        client = self._clients.get(id(es))
+        if client is None:
+            client = self._clients[id(es)] = es.options(**self.es_options())
+        return client
+
+
+current_request: ContextVar[Optional[RequestContext]] = ContextVar("current_request", default=None)
+
+
+def with_timeout(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Cópia do corpo da busca com o `timeout` do prazo atual (o original segue como chave de cache)"""
+    context = current_request.get()
+    timeout = context.es_timeout() if context is not None else None
+    return {**body, "timeout": timeout} if timeout else body
+
+
+def mark_partial(response: Dict[str, Any]) -> bool:
+    """Sinaliza na requisição atual que a resposta veio incompleta (timed_out)"""
+    if not response.get('timed_out'):
+        return False
+    context = current_request.get()
+    if context is not None:
+        context.partial = True
+    return True
@@ -0,0 +1,19 @@
+from typing import Any
+from elasticsearch.serializer import JsonSerializer
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele o cliente usa o json da stdlib
+    orjson = None
+
+
+class FastJsonSerializer(JsonSerializer):
+    """Decodifica as respostas do Elasticsearch com orjson quando disponível"""
+
+    def loads(self, data: bytes) -> Any:
+        if orjson is None or data == b"":
+            return super().loads(data)
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return super().loads(data)
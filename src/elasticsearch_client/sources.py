@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import queue
+import asyncio
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+import aiohttp
+from elasticsearch_client.file_loader import DATA_DIR
+
+SAMPLE_DATA_URL = os.getenv("SAMPLE_DATA_URL", "https://jsonplaceholder.typicode.com")
+
+_DONE = object()
+
+
+class HttpCache:
+    """Cache em disco de respostas JSON, revalidado com ETag/Last-Modified (data/.http_cache)"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.path.join(DATA_DIR, ".http_cache")
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, url: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(url)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, data: Any, etag: Optional[str], last_modified: Optional[str]):
+        """Grava a resposta de forma atômica"""
+        path = self._path(url)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": time.time(),
+                "data": data
+            }, f)
+        os.replace(tmp, path)
+
+
+class SourceFetcher:
+    """Busca JSON de uma API HTTP com concorrência limitada, timeout e cache condicional.
+
+    Cópias em disco mais novas que `max_age` segundos são usadas sem requisição;
+    as demais são revalidadas e respostas 304 vêm do disco. Se a origem falhar
+    ou estourar o timeout e houver cópia em disco, ela é usada no lugar.
+    """
+
+    def __init__(self, base_url: str = SAMPLE_DATA_URL, concurrency: int = 4, timeout: float = 10.0,
+                 max_age: float = 300.0, cache: Optional[HttpCache] = None):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.max_age = max_age
+        self.cache = cache or HttpCache()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {"requests": 0, "fresh": 0, "not_modified": 0, "stale_fallbacks": 0}
+
+    def session(self) -> aiohttp.ClientSession:
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return aiohttp.ClientSession(timeout=self.timeout)
+
+    def _url(self, path: str, params: Optional[Dict[str, Any]]) -> str:
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        if params:
+            url += "?" + "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+        return url
+
+    async def get_json(self, session: aiohttp.ClientSession, path: str,
+                       params: Optional[Dict[str, Any]] = None) -> Any:
+        url = self._url(path, params)
+        cached = self.cache.get(url)
+        if cached and time.time() - cached.get("fetched_at", 0) < self.max_age:
+            self.stats["fresh"] += 1
+            return cached["data"]
+
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached and cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self._semaphore:
+            self.stats["requests"] += 1
+            try:
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304 and cached:
+                        self.stats["not_modified"] += 1
+                        self.cache.put(url, cached["data"], cached.get("etag"), cached.get("last_modified"))
+                        return cached["data"]
+                    response.raise_for_status()
+                    data = await response.json(content_type=None)
+                    self.cache.put(url, data, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+                    return data
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if cached is None:
+                    raise
+                print(f"Falha ao buscar {url} ({e or type(e).__name__}); usando cópia em disco")
+                self.stats["stale_fallbacks"] += 1
+                return cached["data"]
+
+    async def get_pages(self, session: aiohttp.ClientSession, path: str, page_size: int,
+                        max_records: Optional[int] = None) -> AsyncIterator[List[Any]]:
+        """Gera as páginas em ordem, mantendo até `concurrency` páginas em voo.
+
+        Usa a paginação do json-server (_page/_limit); para na primeira página
+        incompleta ou ao atingir max_records.
+        """
+        last_page = -(-max_records // page_size) if max_records else None
+        pending: Dict[int, asyncio.Task] = {}
+        next_page = 1
+
+        def schedule():
+            nonlocal next_page
+            while len(pending) < self.concurrency and (last_page is None or next_page <= last_page):
+                params = {"_page": next_page, "_limit": page_size}
+                pending[next_page] = asyncio.create_task(self.get_json(session, path, params))
+                next_page += 1
+
+        page, count = 1, 0
+        schedule()
+        try:
+            while page in pending:
+                records = await pending.pop(page)
+                page += 1
+                full = len(records) >= page_size
+                if max_records is not None:
+                    records = records[:max_records - count]
+                count += len(records)
+                if records:
+                    yield records
+                if not full or (max_records is not None and count >= max_records):
+                    break
+                schedule()
+        finally:
+            for task in pending.values():
+                task.cancel()
+
+    def report(self):
+        print(f"Fontes HTTP: {self.stats['fresh']} servidas do disco, {self.stats['requests']} requisições, "
+              f"{self.stats['not_modified']} não modificadas (304), "
+              f"{self.stats['stale_fallbacks']} servidas do disco após falha")
+
+
+class SampleDataSource:
+    """Conector dos dados de exemplo (posts + usuários do JSONPlaceholder).
+
+    Usuários e páginas de posts são buscados concorrentemente; records() entrega
+    os documentos assim que cada página chega, direto para o pipeline de
+    indexação (síncrono), via uma fila limitada alimentada por outra thread.
+    """
+
+    def __init__(self, fetcher: Optional[SourceFetcher] = None, max_posts: int = 20, page_size: int = 10,
+                 queue_size: int = 1000):
+        self.fetcher = fetcher or SourceFetcher()
+        self.max_posts = max_posts
+        self.page_size = page_size
+        self.queue_size = queue_size
+
+    @staticmethod
+    def to_document(post: Dict[str, Any], users: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        now = datetime.now().isoformat()
+        user = users.get(post['userId'], {})
+        return {
+            "id": f"post_{post['id']}",
+            "title": post['title'],
+            "content": post['body'],
+            "category": "blog_post",
+            "tags": ["sample", "jsonplaceholder", f"user_{post['userId']}"],
+            "created_at": now,
+            "updated_at": now,
+            "metadata": {
+                "user_id": post['userId'],
+                "user_name": user.get('name', 'Unknown'),
+                "user_email": user.get('email', '')
+            }
+        }
+
+    async def documents(self) -> AsyncIterator[Dict[str, Any]]:
+        async with self.fetcher.session() as session:
+            users_task = asyncio.create_task(self.fetcher.get_json(session, "/users"))
+            try:
+                pages = self.fetcher.get_pages(session, "/posts", self.page_size, self.max_posts)
+                users = None
+                async for posts in pages:
+                    if users is None:
+                        users = {user['id']: user for user in await users_task}
+                    for post in posts:
+                        yield self.to_document(post, users)
+            finally:
+                users_task.cancel()
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        """Versão síncrona de documents() para o BulkIndexer.
+
+        Se o consumidor parar antes do fim (erro na indexação ou gerador fechado),
+        o produtor é avisado, a fila é esvaziada e a thread termina.
+        """
+        items: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+
+        def put(item: Any) -> bool:
+            # Espera por espaço na fila, desistindo se o consumidor já parou
+            while not stop.is_set():
+                try:
+                    items.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        async def produce():
+            try:
+                async for doc in self.documents():
+                    if stop.is_set():
+                        return
+                    try:
+                        items.put_nowait(doc)
+                    except queue.Full:
+                        # Indexação mais lenta que a origem: espera sem travar o event loop
+                        if not await asyncio.to_thread(put, doc):
+                            return
+            except BaseException as e:
+                put(e)
+                return
+            put(_DONE)
+
+        thread = threading.Thread(target=asyncio.run, args=(produce(),), daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            # Libera um produtor bloqueado na fila cheia
+            while True:
+                try:
+                    items.get_nowait()
+                except queue.Empty:
+                    break
+            thread.join()
+        self.fetcher.report()
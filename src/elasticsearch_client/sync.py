@@ -0,0 +1,121 @@
+import json
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from elasticsearch import Elasticsearch, NotFoundError
+from elasticsearch_client.partitions import fanout_docs, first_found
+
+# Campos que não entram no hash: carimbos de tempo e dados derivados
+HASH_EXCLUDED_FIELDS = {"created_at", "updated_at", "embedding", "content_hash"}
+
+
+def content_hash(doc: Dict[str, Any]) -> str:
+    """Hash estável do conteúdo de um documento (independe da ordem das chaves)"""
+    content = {k: v for k, v in doc.items() if k not in HASH_EXCLUDED_FIELDS}
+    data = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SyncStats:
+    seen: int = 0
+    new: int = 0
+    changed: int = 0
+    unchanged: int = 0
+
+    @property
+    def to_write(self) -> int:
+        return self.new + self.changed
+
+
+class IncrementalSync:
+    """Filtra uma carga para escrever só documentos novos ou alterados.
+
+    Cada documento recebe `content_hash`; um _mget por lote traz o hash e o
+    `created_at` já indexados. Documentos iguais são descartados; os alterados
+    mantêm o `created_at` original e ganham um novo `updated_at`.
+
+    Cargas completas usam só `locate`: nada é filtrado, mas cada documento recebe
+    `content_hash` (a próxima carga incremental já compara) e o que já existe
+    volta para a sua partição (via `location`), sem duplicar o id.
+    """
+
+    def __init__(self, es: Elasticsearch, index_name: str, batch_size: int = 1000, id_field: str = "id",
+                 partitions: Optional[List[str]] = None):
+        self.es = es
+        self.index_name = index_name
+        # Com várias partições, o _mget procura em todas e guarda onde cada documento está
+        self.partitions = partitions or [index_name]
+        self.locations: Dict[str, str] = {}
+        self.batch_size = batch_size
+        self.id_field = id_field
+        self.stats = SyncStats()
+
+    def _indexed(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """_source reduzido (hash e created_at) dos documentos que já existem"""
+        try:
+            if len(self.partitions) == 1:
+                response = self.es.mget(index=self.partitions[0], ids=ids,
+                                        source_includes=["content_hash", "created_at"])
+            else:
+                response = self.es.mget(docs=fanout_docs(ids, self.partitions),
+                                        source_includes=["content_hash", "created_at"])
+        except NotFoundError:
+            return {}
+        found = first_found(response["docs"])
+        self.locations.update({doc_id: doc["_index"] for doc_id, doc in found.items()})
+        return {doc_id: doc.get("_source", {}) for doc_id, doc in found.items()}
+
+    def location(self, doc: Dict[str, Any]) -> Optional[str]:
+        """Partição de um documento que já existia (para o BulkIndexer gravar a alteração nela)"""
+        if len(self.partitions) == 1:
+            return None
+        return self.locations.get(str(doc.get(self.id_field)))
+
+    def _filter_batch(self, batch: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        indexed = self._indexed([str(doc[self.id_field]) for doc in batch if self.id_field in doc])
+        for doc in batch:
+            self.stats.seen += 1
+            doc["content_hash"] = content_hash(doc)
+            current = indexed.get(str(doc.get(self.id_field)))
+
+            if current is None:
+                self.stats.new += 1
+            elif current.get("content_hash") == doc["content_hash"]:
+                self.stats.unchanged += 1
+                continue
+            else:
+                self.stats.changed += 1
+                if current.get("created_at"):
+                    doc["created_at"] = current["created_at"]
+                doc["updated_at"] = datetime.now().isoformat()
+            yield doc
+
+    def _batches(self, docs: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        batch = []
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def filter(self, docs: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Gera apenas os documentos que precisam ser escritos"""
+        for batch in self._batches(docs):
+            yield from self._filter_batch(batch)
+
+    def locate(self, docs: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Gera todos os documentos com `content_hash`, registrando a partição dos que já existem"""
+        for batch in self._batches(docs):
+            if len(self.partitions) > 1:
+                self._indexed([str(doc[self.id_field]) for doc in batch if self.id_field in doc])
+            for doc in batch:
+                doc["content_hash"] = content_hash(doc)
+                yield doc
+
+    def report(self):
+        print(f"Sincronização: {self.stats.seen} documentos lidos, {self.stats.new} novos, "
+              f"{self.stats.changed} alterados, {self.stats.unchanged} inalterados")
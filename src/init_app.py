@@ -2,6 +2,7 @@ import sys
 import time
 import asyncio
 from elasticsearch_client.es_client import ElasticsearchClient
+from elasticsearch_client.migration import IndexMigration
 from agents.elasticsearch_agent import main as simple_agent_main
 from agents.elasticsearch_agent import main as agent_main
 from mcp_server.server import MCPServer
@@ -55,6 +56,8 @@ def show_menu():
     print("3. Iniciar agente simplificado (recomendado)")
     print("4. Executar exemplo completo")
     print("5. Limpar dados")
+    print("6. Carregar arquivos NDJSON/JSONL de data/")
+    print("7. Migrar o índice para o mapeamento atual")
     print("0. Sair")
     print("-"*50)
 
@@ -99,7 +102,7 @@ def run_complete_example():
     print("\n Executando exemplo completo...")
    
     client = ElasticsearchClient()
-    total_docs = len(client.search("*", size=100))
+    total_docs = client.count()
     print(f"\n Total de documentos: {total_docs}")
 
     queries = [
@@ -143,6 +146,26 @@ def clear_data():
     else:
         print("Operação cancelada")
 
+def load_data_files():
+    """Carrega arquivos NDJSON/JSONL do diretório data/"""
+    print("\n Carregando arquivos de data/...")
+
+    client = ElasticsearchClient()
+    client.create_index()
+    results = client.load_files()
+    if not results:
+        print("Nenhum arquivo .ndjson/.jsonl(.gz) encontrado")
+
+def migrate_index():
+    """Recria o índice com o mapeamento atual e troca o alias (sem parar as buscas)"""
+    print("\n Migrando o índice...")
+
+    migration = IndexMigration()
+    if not migration.needed():
+        print(f"O índice já está no mapeamento v{migration.current_version()}, com partições")
+        return
+    migration.run()
+
 def main():
     """Função principal"""
 
@@ -169,10 +192,14 @@ def main():
                 run_complete_example()
             elif option == "5":
                 clear_data()
+            elif option == "6":
+                load_data_files()
+            elif option == "7":
+                migrate_index()
             else:
                 print("Opção inválida!")
             
-            if option in ["1", "5", "6"]:
+            if option in ["1", "5", "6", "7"]:
                 input("\nPressione ENTER para continuar...")
                 
         except KeyboardInterrupt:
@@ -0,0 +1,166 @@
+import os
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+# Código JSON-RPC (faixa de erros do servidor) para requisições recusadas por sobrecarga
+OVERLOADED = -32001
+
+# (execuções simultâneas, máximo de chamadas esperando) por ferramenta
+DEFAULT_LIMITS: Dict[str, Tuple[int, int]] = {
+    "get_document_by_id": (64, 512),  # barato e agrupado em _mget
+    "get_documents_by_ids": (16, 64),
+    "search_documents": (16, 64),
+    "semantic_search": (8, 32),
+    "list_recent_documents": (16, 64),
+    "aggregate_by_category": (4, 16),  # caro: não pode tomar o lugar das buscas
+    "aggregate": (4, 16),
+}
+
+
+def parse_limits(spec: Optional[str]) -> Dict[str, Tuple[int, int]]:
+    """Lê limites no formato 'ferramenta=concorrência:fila,...' (ex: MCP_TOOL_LIMITS)"""
+    limits = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        name, value = item.split("=", 1)
+        concurrency, _, queue = value.partition(":")
+        limits[name.strip()] = (int(concurrency), int(queue or concurrency))
+    return limits
+
+
+class OverloadedError(Exception):
+    """Chamada recusada antes de executar; o cliente deve tentar de novo após retry_after"""
+
+    def __init__(self, tool: str, reason: str, retry_after: float):
+        super().__init__(f"Servidor sobrecarregado ({reason}) para '{tool}'")
+        self.tool = tool
+        self.reason = reason
+        self.retry_after = retry_after
+
+    def to_error(self) -> Dict[str, Any]:
+        return {
+            "code": OVERLOADED,
+            "message": str(self),
+            "data": {"tool": self.tool, "reason": self.reason, "retry_after": self.retry_after}
+        }
+
+
+@dataclass
+class GateStats:
+    admitted: int = 0
+    rejected: int = 0
+    throttled: int = 0
+    queue_wait: float = 0.0
+    max_queue_wait: float = 0.0
+    execution: float = 0.0
+
+
+class _Gate:
+    """Semáforo de uma ferramenta com fila limitada e janela de backoff após 429"""
+
+    def __init__(self, concurrency: int, queue: int):
+        self.concurrency = concurrency
+        self.queue = queue
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.blocked_until = 0.0
+        self.backoff = 0.0
+        self.stats = GateStats()
+
+    def retry_after(self) -> float:
+        """Estimativa de quando haverá vaga: tempo médio de execução x filas à frente"""
+        completed = max(self.stats.admitted - self.running, 1)
+        average = self.stats.execution / completed if self.stats.execution else 0.1
+        return round(max(0.1, average * (self.waiting / self.concurrency + 1)), 2)
+
+
+class AdmissionController:
+    """Controle de admissão por ferramenta.
+
+    Cada ferramenta tem um limite de execuções simultâneas e de chamadas em
+    espera; acima disso a chamada falha na hora com OverloadedError. Depois de
+    um 429 do Elasticsearch a ferramenta entra em backoff exponencial e novas
+    chamadas são recusadas até a janela acabar. O tempo de fila e o de execução
+    são medidos separadamente.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, int]]] = None,
+                 default: Tuple[int, int] = (8, 32), max_backoff: float = 30.0):
+        limits = {**DEFAULT_LIMITS, **parse_limits(os.getenv("MCP_TOOL_LIMITS")), **(limits or {})}
+        self.default = default
+        self.max_backoff = max_backoff
+        self._gates: Dict[str, _Gate] = {name: _Gate(*limit) for name, limit in limits.items()}
+
+    def _gate(self, tool: str) -> _Gate:
+        gate = self._gates.get(tool)
+        if gate is None:
+            gate = self._gates[tool] = _Gate(*self.default)
+        return gate
+
+    @asynccontextmanager
+    async def admit(self, tool: str):
+        gate = self._gate(tool)
+        now = time.monotonic()
+        if now < gate.blocked_until:
+            gate.stats.rejected += 1
+            raise OverloadedError(tool, "es_backpressure", round(gate.blocked_until - now, 2))
+        if gate.semaphore.locked() and gate.waiting >= gate.queue:
+            gate.stats.rejected += 1
+            raise OverloadedError(tool, "queue_full", gate.retry_after())
+
+        gate.waiting += 1
+        try:
+            await gate.semaphore.acquire()
+        finally:
+            gate.waiting -= 1
+
+        started = time.monotonic()
+        wait = started - now
+        gate.stats.admitted += 1
+        gate.stats.queue_wait += wait
+        gate.stats.max_queue_wait = max(gate.stats.max_queue_wait, wait)
+        gate.running += 1
+        try:
+            yield
+        finally:
+            gate.running -= 1
+            gate.stats.execution += time.monotonic() - started
+            gate.semaphore.release()
+
+    def throttle(self, tool: str) -> OverloadedError:
+        """Registra um 429 do Elasticsearch e abre (ou dobra) a janela de backoff"""
+        gate = self._gate(tool)
+        gate.backoff = min(self.max_backoff, gate.backoff * 2 if gate.backoff else 0.5)
+        gate.blocked_until = time.monotonic() + gate.backoff
+        gate.stats.throttled += 1
+        return OverloadedError(tool, "es_backpressure", gate.backoff)
+
+    def succeeded(self, tool: str):
+        """Chamada concluída sem rejeição: encerra o backoff da ferramenta"""
+        gate = self._gates.get(tool)
+        if gate is not None:
+            gate.backoff = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for name, gate in self._gates.items():
+            s = gate.stats
+            completed = max(s.admitted - gate.running, 1)
+            result[name] = {
+                "concurrency": gate.concurrency,
+                "queue_limit": gate.queue,
+                "running": gate.running,
+                "waiting": gate.waiting,
+                "admitted": s.admitted,
+                "rejected": s.rejected,
+                "es_throttled": s.throttled,
+                "avg_queue_wait_ms": round(s.queue_wait / max(s.admitted, 1) * 1000, 2),
+                "max_queue_wait_ms": round(s.max_queue_wait * 1000, 2),
+                "avg_execution_ms": round(s.execution / completed * 1000, 2),
+            }
+        return result
@@ -0,0 +1,87 @@
+import json
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from elasticsearch_client.request_context import current_request
+
+FetchMany = Callable[[List[str], Optional[Dict[str, Any]]], Awaitable[Dict[str, Dict[str, Any]]]]
+
+
+class DocumentBatcher:
+    """Agrupa buscas por ID em uma única chamada _mget (estilo DataLoader).
+
+    IDs pedidos dentro da janela `window` (ou até `max_batch` IDs distintos) são
+    enviados juntos; cada chamador recebe apenas o seu documento, ou None quando
+    ele não existe. Pedidos com filtros de _source diferentes vão em _mget separados.
+    """
+
+    def __init__(self, fetch_many: FetchMany, window: float = 0.002, max_batch: int = 100):
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        # filtro de _source (serializado) -> ID -> futures aguardando
+        self._pending: Dict[Optional[str], Dict[str, List[asyncio.Future]]] = {}
+        self._pending_ids = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.requested = 0
+
+    def _flush(self):
+        """Dispara o lote acumulado"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        self._pending_ids = 0
+        for source_key, by_id in pending.items():
+            source = json.loads(source_key) if source_key else None
+            task = asyncio.ensure_future(self._dispatch(by_id, source))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, pending: Dict[str, List[asyncio.Future]], source: Optional[Dict[str, Any]]):
+        """Executa o _mget e resolve os futures de cada chamador"""
+        self.batches += 1
+        # O lote atende vários chamadores: não herda o prazo de quem disparou o flush
+        # (cada um continua limitado pelo próprio prazo enquanto espera o future)
+        current_request.set(None)
+        try:
+            docs = await self.fetch_many(list(pending), source)
+        except Exception as e:
+            for futures in pending.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for doc_id, futures in pending.items():
+            doc = docs.get(doc_id)
+            for future in futures:
+                if not future.done():
+                    future.set_result(doc)
+
+    def load(self, doc_id: str, source: Optional[Dict[str, Any]] = None) -> "asyncio.Future[Optional[Dict[str, Any]]]":
+        """Agenda a busca de um ID e retorna um future com o documento"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.requested += 1
+
+        source_key = json.dumps(source, sort_keys=True) if source else None
+        by_id = self._pending.setdefault(source_key, {})
+        if doc_id not in by_id:
+            by_id[doc_id] = []
+            self._pending_ids += 1
+        by_id[doc_id].append(future)
+
+        if self._pending_ids >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return future
+
+    async def load_many(self, doc_ids: List[str], source: Optional[Dict[str, Any]] = None) -> List[Optional[Dict[str, Any]]]:
+        """Busca vários IDs, preservando a ordem pedida"""
+        return list(await asyncio.gather(*(self.load(doc_id, source) for doc_id in doc_ids)))
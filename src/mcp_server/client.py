@@ -0,0 +1,259 @@
+import os
+import sys
+import asyncio
+import itertools
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+import aiohttp
+from mcp_server.serialization import PreEncoded, get_serializer
+from mcp_server.transport import SESSION_HEADER
+
+
+class MCPToolError(Exception):
+    """Erro devolvido pelo servidor MCP (ex: TOOL_ERROR, UNKNOWN_TOOL, -32001 sobrecarga)"""
+
+    def __init__(self, code: str, message: str, data: Optional[Dict[str, Any]] = None):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+        self.message = message
+        self.data = data or {}
+
+    @property
+    def retry_after(self) -> Optional[float]:
+        """Segundos sugeridos pelo servidor antes de repetir uma chamada recusada por sobrecarga"""
+        return self.data.get("retry_after")
+
+
+class InProcessTransport:
+    """Chama o MCPServer no mesmo processo, sem serialização.
+
+    Resultados PreEncoded são lidos por .value, então o JSON nunca é gerado.
+    Os dicts retornados podem ser compartilhados com o cache do servidor e não
+    devem ser modificados.
+    """
+
+    def __init__(self, server=None):
+        if server is None:
+            from mcp_server.server import MCPServer
+            server = MCPServer()
+        self.server = server
+
+    async def start(self) -> bool:
+        return await self.server.async_es.check_connection()
+
+    async def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self.server.process_message(message)
+        result = response.get("result")
+        if isinstance(result, PreEncoded):
+            response = {**response, "result": result.value}
+        return response
+
+    async def notify(self, message: Dict[str, Any]):
+        await self.server.process_message(message)
+
+    async def close(self):
+        await self.server.async_es.close()
+
+
+def _decode_tool_result(serializer, response: Dict[str, Any]) -> Dict[str, Any]:
+    """Resultados de ferramentas chegam como texto JSON dentro do envelope MCP"""
+    result = response.get("result")
+    if isinstance(result, dict) and "content" in result:
+        response["result"] = serializer.loads(result["content"][0]["text"])
+    return response
+
+
+class StdioClientTransport:
+    """Fala com um servidor MCP em outro processo via NDJSON no stdin/stdout"""
+
+    def __init__(self, command: Optional[List[str]] = None):
+        self.command = command or [sys.executable, "-m", "mcp_server.server"]
+        self.serializer = get_serializer()
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._pending: Dict[Any, asyncio.Future] = {}
+        self._reader: Optional[asyncio.Task] = None
+
+    async def start(self) -> bool:
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+            limit=16 * 1024 * 1024
+        )
+        self._reader = asyncio.create_task(self._read_responses())
+        response = await self.request({"jsonrpc": "2.0", "id": "initialize", "method": "initialize", "params": {}})
+        return "result" in response
+
+    async def _read_responses(self):
+        """Entrega cada resposta à requisição de mesmo id"""
+        while True:
+            line = await self.process.stdout.readline()
+            if not line:
+                break
+            message = self.serializer.loads(line)
+            for response in message if isinstance(message, list) else [message]:
+                future = self._pending.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("Servidor MCP encerrou a conexão"))
+        self._pending.clear()
+
+    async def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        future = asyncio.get_running_loop().create_future()
+        self._pending[message["id"]] = future
+        self.process.stdin.write(self.serializer.dumps(message) + b"\n")
+        await self.process.stdin.drain()
+        try:
+            return _decode_tool_result(self.serializer, await future)
+        finally:
+            self._pending.pop(message["id"], None)
+
+    async def notify(self, message: Dict[str, Any]):
+        self.process.stdin.write(self.serializer.dumps(message) + b"\n")
+        await self.process.stdin.drain()
+
+    async def close(self):
+        if self.process is not None:
+            self.process.stdin.close()
+            await self.process.wait()
+        if self._reader is not None:
+            await self._reader
+
+
+class HttpClientTransport:
+    """Fala com um servidor MCP via HTTP (POST /mcp), reaproveitando conexões keep-alive"""
+
+    def __init__(self, url: Optional[str] = None, timeout: float = 30.0):
+        self.url = url or os.getenv("MCP_SERVER_URL", "http://localhost:8000/mcp")
+        self.timeout = timeout
+        self.serializer = get_serializer()
+        self.session = None
+        # Sessão MCP devolvida pelo initialize (escopo dos ids e dos cancelamentos)
+        self.headers = {"Content-Type": "application/json"}
+
+    async def start(self) -> bool:
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        response = await self.request({"jsonrpc": "2.0", "id": "initialize", "method": "initialize", "params": {}})
+        return "result" in response
+
+    async def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        async with self.session.post(self.url, data=self.serializer.dumps(message),
+                                     headers={**self.headers, "Accept": "application/json"}) as response:
+            if SESSION_HEADER in response.headers:
+                self.headers[SESSION_HEADER] = response.headers[SESSION_HEADER]
+            return _decode_tool_result(self.serializer, self.serializer.loads(await response.read()))
+
+    async def notify(self, message: Dict[str, Any]):
+        async with self.session.post(self.url, data=self.serializer.dumps(message),
+                                     headers=self.headers) as response:
+            await response.read()
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+
+
+class MCPClient:
+    """Cliente MCP com a mesma interface para uso em processo ou via transporte real"""
+
+    def __init__(self, transport):
+        self.transport = transport
+        self._ids = itertools.count(1)
+
+    @classmethod
+    def in_process(cls, server=None) -> "MCPClient":
+        return cls(InProcessTransport(server))
+
+    @classmethod
+    def stdio(cls, command: Optional[List[str]] = None) -> "MCPClient":
+        return cls(StdioClientTransport(command))
+
+    @classmethod
+    def http(cls, url: Optional[str] = None) -> "MCPClient":
+        return cls(HttpClientTransport(url))
+
+    async def connect(self) -> bool:
+        return await self.transport.start()
+
+    async def _call(self, method: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        request_id = next(self._ids)
+        try:
+            response = await self.transport.request({
+                "jsonrpc": "2.0", "id": request_id, "method": method, "params": params or {}
+            })
+        except asyncio.CancelledError:
+            # Quem chamou desistiu: avisa o servidor para não gastar o cluster com a resposta
+            await asyncio.shield(self._cancel(request_id))
+            raise
+        if "error" in response:
+            error = response["error"]
+            raise MCPToolError(str(error.get("code")), error.get("message", ""), error.get("data"))
+        result = response.get("result")
+        if isinstance(result, dict) and isinstance(result.get("error"), dict):
+            raise MCPToolError(result["error"].get("code"), result["error"].get("message", ""))
+        return result
+
+    async def _cancel(self, request_id: int):
+        try:
+            await self.transport.notify({
+                "jsonrpc": "2.0", "method": "notifications/cancelled",
+                "params": {"requestId": request_id, "reason": "Cancelado pelo cliente"}
+            })
+        except Exception:
+            pass
+
+    async def call_tool(self, name: str, timeout: Optional[float] = None, **arguments) -> Dict[str, Any]:
+        """Executa uma ferramenta e retorna o payload já decodificado.
+
+        `timeout` (segundos) substitui o prazo padrão da ferramenta no servidor.
+        """
+        params: Dict[str, Any] = {"name": name, "arguments": arguments}
+        if timeout is not None:
+            params["_meta"] = {"timeout": timeout}
+        return await self._call("tools/call", params)
+
+    async def list_tools(self) -> List[Dict[str, Any]]:
+        return (await self._call("tools/list"))["tools"]
+
+    async def read_resource(self, uri: str) -> Dict[str, Any]:
+        return await self._call("resources/read", {"uri": uri})
+
+    async def close(self):
+        await self.transport.close()
+
+
+class BlockingMCPClient:
+    """Fachada síncrona: roda o MCPClient em um event loop próprio numa thread.
+
+    Pode ser usada de várias threads ao mesmo tempo; as chamadas concorrentes
+    compartilham o loop (e, em processo, o batching e o cache do servidor).
+    """
+
+    def __init__(self, client: MCPClient):
+        self.client = client
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def connect(self) -> bool:
+        return self._run(self.client.connect())
+
+    def call_tool(self, name: str, timeout: Optional[float] = None, **arguments) -> Dict[str, Any]:
+        return self._run(self.client.call_tool(name, timeout, **arguments))
+
+    def submit_tool(self, name: str, timeout: Optional[float] = None, **arguments) -> Future:
+        """Agenda a chamada no loop sem bloquear (não ocupa thread enquanto espera a resposta)"""
+        return asyncio.run_coroutine_threadsafe(self.client.call_tool(name, timeout, **arguments), self._loop)
+
+    def read_resource(self, uri: str) -> Dict[str, Any]:
+        return self._run(self.client.read_resource(uri))
+
+    def close(self):
+        self._run(self.client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
@@ -0,0 +1,39 @@
+import os
+from typing import Any, Dict, Optional
+
+# Prazo padrão (segundos) por ferramenta, incluindo a espera na fila de admissão
+DEFAULT_TIMEOUTS: Dict[str, float] = {
+    "get_document_by_id": 2.0,
+    "get_documents_by_ids": 5.0,
+    "search_documents": 5.0,
+    "semantic_search": 8.0,
+    "list_recent_documents": 5.0,
+    "aggregate_by_category": 10.0,
+    "aggregate": 10.0,
+}
+
+
+def parse_timeouts(spec: Optional[str]) -> Dict[str, float]:
+    """Lê prazos no formato 'ferramenta=segundos,...' (ex: MCP_TOOL_TIMEOUTS)"""
+    timeouts = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            timeouts[name.strip()] = float(value)
+    return timeouts
+
+
+class DeadlinePolicy:
+    """Escolhe o prazo de cada chamada: o pedido pelo cliente em `_meta.timeout` ou o padrão da ferramenta"""
+
+    def __init__(self, timeouts: Optional[Dict[str, float]] = None, default: float = 10.0,
+                 max_timeout: float = 60.0):
+        self.timeouts = {**DEFAULT_TIMEOUTS, **parse_timeouts(os.getenv("MCP_TOOL_TIMEOUTS")), **(timeouts or {})}
+        self.default = default
+        self.max_timeout = max_timeout
+
+    def timeout_for(self, tool: Optional[str], meta: Optional[Dict[str, Any]] = None) -> float:
+        requested = (meta or {}).get("timeout")
+        if isinstance(requested, (int, float)) and requested > 0:
+            return min(float(requested), self.max_timeout)
+        return self.timeouts.get(tool, self.default)
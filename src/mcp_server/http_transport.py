@@ -0,0 +1,244 @@
+import os
+import math
+import uuid
+import ipaddress
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, FrozenSet, List, Optional, Set, Tuple
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response, StreamingResponse
+from mcp_server.admission import OVERLOADED
+from mcp_server.transport import INVALID_REQUEST, PARSE_ERROR, SESSION_HEADER, _error_response, dispatch_message
+
+# Intervalo dos comentários de keep-alive no stream SSE
+SSE_PING_INTERVAL = 15.0
+
+# Respostas em stream não passam pelo GZipMiddleware (ele bufferiza e atrasaria os eventos)
+SSE_HEADERS = {"Cache-Control": "no-cache", "Content-Encoding": "identity", "X-Accel-Buffering": "no"}
+
+
+class NotificationHub:
+    """Distribui notificações do servidor aos clientes conectados via GET /mcp (SSE).
+
+    Cada canal pertence à sessão do cabeçalho Mcp-Session-Id (sem ele, não recebe
+    nada) e tem uma fila limitada; se ela encher (cliente lento), as
+    notificações excedentes são descartadas para esse cliente.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[asyncio.Queue, Any] = {}
+
+    def subscribe(self, session: Any) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[queue] = session
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.pop(queue, None)
+
+    def publish(self, message: Dict[str, Any], sessions: FrozenSet[Any]):
+        for queue, session in self._subscribers.items():
+            if session not in sessions:
+                continue
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                pass
+
+
+def _admin_hosts() -> Set[str]:
+    """Endereços extras (ex: o Prometheus) aceitos em /metrics e /debug/*, de MCP_ADMIN_HOSTS"""
+    return {host.strip() for host in os.getenv("MCP_ADMIN_HOSTS", "").split(",") if host.strip()}
+
+
+def _is_admin(request: Request) -> bool:
+    """Métricas e profiling não têm autenticação: só loopback ou MCP_ADMIN_HOSTS"""
+    host = request.client.host if request.client else ""
+    try:
+        if ipaddress.ip_address(host).is_loopback:
+            return True
+    except ValueError:
+        pass
+    return host in _admin_hosts()
+
+
+def _forbidden() -> Response:
+    return Response(b'{"error":"forbidden"}', status_code=403, media_type="application/json")
+
+
+def _sse_event(data: bytes) -> bytes:
+    return b"event: message\ndata: " + data + b"\n\n"
+
+
+def _wants_stream(request: Request) -> bool:
+    """SSE quando o cliente aceita apenas text/event-stream"""
+    accept = request.headers.get("accept", "")
+    return "text/event-stream" in accept and "application/json" not in accept
+
+
+def _session(request: Request, messages: List[Any]) -> Tuple[Any, Dict[str, str]]:
+    """Sessão da requisição e os cabeçalhos que a devolvem ao cliente
+
+    Sem o cabeçalho, um initialize abre uma sessão nova; as demais requisições
+    ficam isoladas em uma sessão própria (ids não colidem com os de outros
+    clientes, mas um notifications/cancelled em outro POST não as alcança).
+    """
+    session = request.headers.get(SESSION_HEADER)
+    if session:
+        return session, {}
+    if any(isinstance(m, dict) and m.get("method") == "initialize" for m in messages):
+        session = uuid.uuid4().hex
+        return session, {SESSION_HEADER: session}
+    return object(), {}
+
+
+async def _stream_responses(server, messages: List[Any], session: Any) -> AsyncIterator[bytes]:
+    """Um evento por resposta, na ordem em que ficam prontas"""
+    for done in asyncio.as_completed([dispatch_message(server, m, session) for m in messages]):
+        response = await done
+        if response is not None:
+            yield _sse_event(server.encoder.encode(response))
+
+
+async def _notifications(hub: NotificationHub, encoder, request: Request) -> AsyncIterator[bytes]:
+    queue = hub.subscribe(request.headers.get(SESSION_HEADER))
+    try:
+        while not await request.is_disconnected():
+            try:
+                message = await asyncio.wait_for(queue.get(), SSE_PING_INTERVAL)
+            except asyncio.TimeoutError:
+                yield b": ping\n\n"
+                continue
+            yield _sse_event(encoder.encode(message))
+    finally:
+        hub.unsubscribe(queue)
+
+
+def _single_response(encoder, response: Dict[str, Any], headers: Dict[str, str]) -> Response:
+    """Recusas por sobrecarga viram HTTP 429 com Retry-After (em lote, só o erro JSON-RPC)"""
+    error = response.get("error")
+    if isinstance(error, dict) and error.get("code") == OVERLOADED:
+        retry_after = (error.get("data") or {}).get("retry_after") or 1
+        return Response(encoder.encode(response), status_code=429, media_type="application/json",
+                        headers={**headers, "Retry-After": str(math.ceil(retry_after))})
+    return Response(encoder.encode(response), media_type="application/json", headers=headers)
+
+
+def create_app(server=None) -> FastAPI:
+    """Aplicação HTTP do servidor MCP (um MCPServer, e portanto um pool ES, por worker)"""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if server is None:
+            from mcp_server.server import MCPServer
+            app.state.server = MCPServer()
+        else:
+            app.state.server = server
+        app.state.hub = NotificationHub()
+        # Snapshots dos recursos por worker; mudanças saem como notificações no GET /mcp
+        app.state.server.snapshots.notifiers.append(app.state.hub.publish)
+        app.state.server.snapshots.start()
+        try:
+            yield
+        finally:
+            await app.state.server.snapshots.stop()
+            await app.state.server.async_es.close()
+
+    app = FastAPI(title="elasticsearch-mcp-server", lifespan=lifespan)
+    app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+    @app.post("/mcp")
+    async def rpc(request: Request):
+        """Requisição JSON-RPC (única ou em lote)"""
+        mcp = request.app.state.server
+        encoder = mcp.encoder
+        try:
+            payload = encoder.serializer.loads(await request.body())
+        except ValueError as e:
+            return Response(encoder.encode(_error_response(PARSE_ERROR, f"JSON inválido: {e}")),
+                            status_code=400, media_type="application/json")
+
+        messages = payload if isinstance(payload, list) else [payload]
+        if not messages:
+            return Response(encoder.encode(_error_response(INVALID_REQUEST, "Lote JSON-RPC vazio")),
+                            status_code=400, media_type="application/json")
+
+        session, headers = _session(request, messages)
+        if _wants_stream(request):
+            return StreamingResponse(_stream_responses(mcp, messages, session), media_type="text/event-stream",
+                                     headers={**SSE_HEADERS, **headers})
+
+        responses = await asyncio.gather(*(dispatch_message(mcp, m, session) for m in messages))
+        responses = [r for r in responses if r is not None]
+        if not responses:
+            return Response(status_code=202, headers=headers)  # apenas notificações
+        if isinstance(payload, list):
+            return Response(encoder.encode(responses), media_type="application/json", headers=headers)
+        return _single_response(encoder, responses[0], headers)
+
+    @app.get("/mcp")
+    async def notifications(request: Request):
+        """Canal SSE para notificações do servidor"""
+        stream = _notifications(request.app.state.hub, request.app.state.server.encoder, request)
+        return StreamingResponse(stream, media_type="text/event-stream", headers=SSE_HEADERS)
+
+    @app.delete("/mcp")
+    async def end_session(request: Request):
+        """Encerra a sessão do cabeçalho Mcp-Session-Id (descarta as assinaturas de recursos)"""
+        session = request.headers.get(SESSION_HEADER)
+        if not session:
+            return Response(status_code=400)
+        request.app.state.server.snapshots.forget(session)
+        return Response(status_code=204)
+
+    @app.get("/metrics")
+    async def metrics(request: Request):
+        """Métricas deste worker no formato texto do Prometheus"""
+        if not _is_admin(request):
+            return _forbidden()
+        mcp = request.app.state.server
+        return Response(mcp.metrics.prometheus(mcp.async_es.cache.stats()),
+                        media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    @app.get("/debug/profiling")
+    async def profiling_status(request: Request):
+        if not _is_admin(request):
+            return _forbidden()
+        return request.app.state.server.profiler.status()
+
+    @app.post("/debug/profiling")
+    async def configure_profiling(request: Request, sample_every: Optional[int] = None,
+                                  slow_ms: Optional[int] = None):
+        """Ajusta o profiling deste worker (ex: ?sample_every=100&slow_ms=500)"""
+        if not _is_admin(request):
+            return _forbidden()
+        return request.app.state.server.profiler.configure(sample_every, slow_ms)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return app
+
+
+def serve_http(host: str = "0.0.0.0", port: int = 8000, workers: int = 1, setup: bool = True,
+               keep_alive: int = 30, log_level: Optional[str] = "warning"):
+    """Serve o MCP via HTTP com uvicorn; a preparação do índice roda uma vez, antes dos workers"""
+    if setup:
+        from mcp_server.server import MCPServer
+        if not MCPServer().setup():
+            return
+
+    print(f"Servidor MCP em http://{host}:{port}/mcp ({workers} worker(s))")
+    uvicorn.run(
+        "mcp_server.http_transport:create_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        timeout_keep_alive=keep_alive,
+        log_level=log_level,
+    )
@@ -0,0 +1,205 @@
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 8 sub-buckets por potência de 2: erro relativo de no máximo 1/8 (~12%) por bucket
+SUB_BUCKET_BITS = 3
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+# Valores até 2^40 µs (~12 dias) ou bytes (~1 TB)
+MAX_BITS = 40
+
+
+class Histogram:
+    """Histograma log-linear no estilo HDR para valores inteiros (µs ou bytes).
+
+    Registrar um valor é só um bit_length, um shift e um incremento de lista,
+    sem alocação; os percentis são calculados apenas na leitura.
+    """
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * ((MAX_BITS - SUB_BUCKET_BITS) * SUB_BUCKETS + 2 * SUB_BUCKETS)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    @staticmethod
+    def _index(value: int) -> int:
+        shift = value.bit_length() - SUB_BUCKET_BITS - 1
+        if shift <= 0:
+            return value
+        return shift * SUB_BUCKETS + (value >> shift)
+
+    @staticmethod
+    def _upper_bound(index: int) -> int:
+        """Maior valor que cai no bucket `index`"""
+        if index < 2 * SUB_BUCKETS:
+            return index
+        shift, top = divmod(index, SUB_BUCKETS)
+        shift -= 1
+        return ((top + SUB_BUCKETS + 1) << shift) - 1
+
+    def record(self, value: int):
+        if value < 0:
+            value = 0
+        index = self._index(value)
+        if index >= len(self.counts):
+            index = len(self.counts) - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> int:
+        if not self.count:
+            return 0
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self, scale: float = 1.0) -> Dict[str, Any]:
+        """Contagem, média e percentis (valores divididos por `scale`, ex: 1000 para ms)"""
+        return {
+            "count": self.count,
+            "mean": round(self.mean() / scale, 3),
+            "p50": round(self.percentile(0.50) / scale, 3),
+            "p90": round(self.percentile(0.90) / scale, 3),
+            "p99": round(self.percentile(0.99) / scale, 3),
+            "max": round(self.max / scale, 3),
+        }
+
+
+def _error_code(response: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Código de erro de uma resposta: erro JSON-RPC ou erro embutido no resultado da ferramenta"""
+    if response is None:
+        return "CANCELLED"
+    error = response.get("error")
+    if error is None:
+        result = response.get("result")
+        error = result.get("error") if type(result) is dict else None
+    if isinstance(error, dict):
+        return str(error.get("code"))
+    return None
+
+
+class Metrics:
+    """Métricas em memória do servidor MCP (por processo/worker).
+
+    - latência por método JSON-RPC e por ferramenta;
+    - latência de cada chamada ao Elasticsearch e o `took` informado pelo cluster;
+    - tempo de serialização e tamanho das respostas;
+    - erros por código.
+    """
+
+    def __init__(self):
+        self.requests: Dict[Tuple[str, str], Histogram] = {}
+        self.es_wall: Dict[str, Histogram] = {}
+        self.es_took: Dict[str, Histogram] = {}
+        self.serialization = Histogram()
+        self.response_bytes = Histogram()
+        self.errors: Dict[str, int] = {}
+        self.started_at = time.time()
+
+    def _histogram(self, table: Dict[Any, Histogram], key: Any) -> Histogram:
+        histogram = table.get(key)
+        if histogram is None:
+            histogram = table[key] = Histogram()
+        return histogram
+
+    def _error(self, code: str):
+        self.errors[code] = self.errors.get(code, 0) + 1
+
+    def observe_request(self, method: Optional[str], tool: Optional[str], elapsed: float,
+                        response: Optional[Dict[str, Any]]):
+        micros = int(elapsed * 1_000_000)
+        self._histogram(self.requests, ("method", method or "")).record(micros)
+        if tool:
+            self._histogram(self.requests, ("tool", tool)).record(micros)
+        code = _error_code(response)
+        if code is not None:
+            self._error(code)
+
+    def observe_es(self, endpoint: str, elapsed: float, took: Optional[int] = None,
+                   error: Optional[Exception] = None):
+        self._histogram(self.es_wall, endpoint).record(int(elapsed * 1_000_000))
+        if took is not None:
+            self._histogram(self.es_took, endpoint).record(took * 1000)
+        if error is not None:
+            status = getattr(getattr(error, "meta", None), "status", None)
+            self._error(f"ES_{status}" if status else f"ES_{type(error).__name__}")
+
+    def observe_encode(self, elapsed: float, size: int):
+        self.serialization.record(int(elapsed * 1_000_000))
+        self.response_bytes.record(size)
+
+    def snapshot(self, cache_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Resumo em JSON (latências em ms) para o recurso elasticsearch://sample_data/metrics"""
+        requests: Dict[str, Dict[str, Any]] = {"method": {}, "tool": {}}
+        for (kind, name), histogram in sorted(self.requests.items()):
+            requests[kind][name] = histogram.summary(1000)
+        elasticsearch = {}
+        for endpoint, wall in sorted(self.es_wall.items()):
+            took = self.es_took.get(endpoint)
+            elasticsearch[endpoint] = {
+                "wall_ms": wall.summary(1000),
+                "took_ms": took.summary(1000) if took else None,
+                # Tempo fora do cluster: rede, fila do pool e (de)serialização no cliente
+                "client_overhead_ms": round((wall.mean() - took.mean()) / 1000, 3) if took else None,
+            }
+        snapshot = {
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "requests": requests,
+            "elasticsearch": elasticsearch,
+            "serialization_ms": self.serialization.summary(1000),
+            "response_bytes": {**self.response_bytes.summary(), "total": self.response_bytes.total},
+            "errors": dict(self.errors),
+        }
+        if cache_stats is not None:
+            snapshot["cache"] = cache_stats
+        return snapshot
+
+    def prometheus(self, cache_stats: Optional[Dict[str, Any]] = None) -> str:
+        """Exposição no formato texto do Prometheus (summaries com quantis, em segundos)"""
+        lines: List[str] = []
+
+        def summary(name: str, help_text: str, series: Iterator[Tuple[str, Histogram]], scale: float):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} summary")
+            for labels, histogram in series:
+                for q in (0.5, 0.9, 0.99):
+                    lines.append(f'{name}{{{labels},quantile="{q}"}} {histogram.percentile(q) / scale}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.total / scale}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        summary("mcp_request_duration_seconds", "Latência das requisições MCP",
+                ((f'kind="{kind}",name="{name}"', h) for (kind, name), h in sorted(self.requests.items())),
+                1_000_000)
+        summary("mcp_es_request_duration_seconds", "Latência das chamadas ao Elasticsearch (relógio)",
+                ((f'endpoint="{e}"', h) for e, h in sorted(self.es_wall.items())), 1_000_000)
+        summary("mcp_es_took_seconds", "Tempo informado pelo Elasticsearch (took)",
+                ((f'endpoint="{e}"', h) for e, h in sorted(self.es_took.items())), 1_000_000)
+        summary("mcp_serialization_duration_seconds", "Tempo de serialização das respostas",
+                iter([('transport="any"', self.serialization)]), 1_000_000)
+        summary("mcp_response_bytes", "Tamanho das respostas serializadas",
+                iter([('transport="any"', self.response_bytes)]), 1)
+
+        lines.append("# HELP mcp_errors_total Erros por código")
+        lines.append("# TYPE mcp_errors_total counter")
+        for code, count in sorted(self.errors.items()):
+            lines.append(f'mcp_errors_total{{code="{code}"}} {count}')
+
+        if cache_stats is not None:
+            lines.append("# HELP mcp_cache_hit_ratio Taxa de acerto do cache de resultados")
+            lines.append("# TYPE mcp_cache_hit_ratio gauge")
+            lines.append(f"mcp_cache_hit_ratio {cache_stats.get('hit_ratio', 0.0)}")
+            for counter in ("hits", "misses", "evictions", "coalesced"):
+                lines.append(f"# TYPE mcp_cache_{counter}_total counter")
+                lines.append(f"mcp_cache_{counter}_total {cache_stats.get(counter, 0)}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,290 @@
+"""Profiling opcional e log de requisições lentas.
+
+- Perfil Python por amostragem: uma thread lê a pilha da thread do event loop
+  a cada `interval` segundos enquanto houver requisição sendo perfilada. O
+  código perfilado não é instrumentado; o custo fica na thread amostradora e
+  só existe nas requisições sorteadas (1 a cada `sample_every`).
+- Log de lentas: requisições acima de `slow_ms` vão para um arquivo rotativo
+  (JSON por linha) com argumentos, tempos, corpo das buscas e, quando houve
+  amostragem, os frames Python mais quentes. A busca mais lenta é repetida em
+  segundo plano com `profile: true` e o perfil do Elasticsearch entra no log:
+  uma repetição por vez, no máximo uma por formato de consulta a cada
+  `MCP_ES_PROFILE_INTERVAL` segundos e com prazo próprio; as excedentes são
+  descartadas, para não dobrar a carga justamente quando o cluster está lento.
+
+Como as requisições compartilham o event loop, as amostras de uma requisição
+incluem o trabalho das que rodaram ao mesmo tempo; frames em `select` indicam
+o loop ocioso, esperando o Elasticsearch.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import itertools
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from elasticsearch_client.file_loader import DATA_DIR
+
+Stack = Tuple[Tuple[str, str, int], ...]
+
+ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _query_shape(value: Any) -> Any:
+    """Estrutura de um corpo de busca sem os valores (consultas iguais com termos diferentes)"""
+    if isinstance(value, dict):
+        return {key: _query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_query_shape(item) for item in value]
+    return "?"
+
+
+def _stack(frame, limit: int = 40) -> Stack:
+    """Pilha do frame mais interno para fora, como (arquivo, função, linha)"""
+    stack = []
+    while frame is not None and len(stack) < limit:
+        code = frame.f_code
+        if code.co_name == "_run_once" and code.co_filename.startswith(ASYNCIO_DIR):
+            break  # daqui para fora é só o event loop
+        stack.append((os.path.basename(code.co_filename), code.co_name, frame.f_lineno))
+        frame = frame.f_back
+    return tuple(stack)
+
+
+def top_frames(samples: Counter, limit: int = 10) -> Dict[str, Any]:
+    """Frames com mais amostras: como frame mais interno (self) e em qualquer ponto da pilha"""
+    total = sum(samples.values())
+    own: Counter = Counter()
+    inclusive: Counter = Counter()
+    for stack, count in samples.items():
+        if stack:
+            own[stack[0]] += count
+        for frame in set(stack):
+            inclusive[frame] += count
+
+    def rows(counter: Counter) -> List[Dict[str, Any]]:
+        return [{"frame": f"{file}:{line} {func}", "samples": n, "percent": round(100 * n / total, 1)}
+                for (file, func, line), n in counter.most_common(limit)]
+
+    return {"samples": total, "self": rows(own), "inclusive": rows(inclusive)} if total else {"samples": 0}
+
+
+class StackSampler:
+    """Amostra a pilha de uma thread enquanto houver sessões abertas"""
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self._sessions: Dict[int, Tuple[int, Counter]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._active = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> int:
+        """Abre uma sessão para a thread atual (a do event loop)"""
+        with self._lock:
+            session = next(self._ids)
+            self._sessions[session] = (threading.get_ident(), Counter())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+            self._active.set()
+        return session
+
+    def stop(self, session: int) -> Counter:
+        with self._lock:
+            _, samples = self._sessions.pop(session, (None, Counter()))
+            if not self._sessions:
+                self._active.clear()
+        return samples
+
+    def _run(self):
+        while True:
+            self._active.wait()
+            frames = sys._current_frames()
+            with self._lock:
+                stacks: Dict[int, Stack] = {}
+                for thread_id, samples in self._sessions.values():
+                    if thread_id not in stacks:
+                        frame = frames.get(thread_id)
+                        stacks[thread_id] = _stack(frame) if frame is not None else ()
+                    samples[stacks[thread_id]] += 1
+            del frames
+            time.sleep(self.interval)
+
+
+def _summarize_es_profile(response: Dict[str, Any], limit: int = 5) -> List[Dict[str, Any]]:
+    """Resumo do `profile` do Elasticsearch: consultas e agregações mais caras por shard"""
+    shards = []
+    for shard in response.get('profile', {}).get('shards', []):
+        queries = [
+            {"type": q.get('type'), "description": (q.get('description') or "")[:200],
+             "time_ms": round(q.get('time_in_nanos', 0) / 1e6, 3)}
+            for search in shard.get('searches', []) for q in search.get('query', [])
+        ]
+        aggregations = [
+            {"type": a.get('type'), "name": a.get('description'),
+             "time_ms": round(a.get('time_in_nanos', 0) / 1e6, 3)}
+            for a in shard.get('aggregations', [])
+        ]
+        shards.append({
+            "shard": shard.get('id'),
+            "queries": sorted(queries, key=lambda q: -q["time_ms"])[:limit],
+            "aggregations": sorted(aggregations, key=lambda a: -a["time_ms"])[:limit],
+        })
+    return shards
+
+
+class Profiler:
+    """Perfil por amostragem de requisições e log de requisições lentas.
+
+    `sample_every`: 0 desliga o perfil Python, 1 perfila todas as requisições,
+    N perfila uma a cada N. `slow_ms`: limiar do log de lentas (0 desliga).
+    Ambos podem ser alterados em tempo de execução por configure().
+    """
+
+    def __init__(self, sample_every: Optional[int] = None, slow_ms: Optional[int] = None,
+                 log_path: Optional[str] = None, max_bytes: int = 10 * 1024 * 1024, backups: int = 5,
+                 es_profile: Optional[Callable[[Optional[str], Dict[str, Any], float],
+                                               Awaitable[Dict[str, Any]]]] = None,
+                 es_profile_interval: Optional[float] = None, es_profile_timeout: Optional[float] = None):
+        self.sample_every = _env_int("MCP_PROFILE_SAMPLE", 0) if sample_every is None else sample_every
+        self.slow_ms = _env_int("MCP_SLOW_MS", 1000) if slow_ms is None else slow_ms
+        self.log_path = log_path or os.getenv("MCP_SLOW_LOG") or os.path.join(DATA_DIR, "logs", "slow_requests.log")
+        self.max_bytes = max_bytes
+        self.backups = backups
+        # Repete uma busca com profile: true (AsyncElasticsearchClient.profile_search)
+        self.es_profile = es_profile
+        # Limites das repetições: intervalo por formato de consulta e prazo de cada uma (segundos)
+        self.es_profile_interval = float(os.getenv("MCP_ES_PROFILE_INTERVAL", "60")) \
+            if es_profile_interval is None else es_profile_interval
+        self.es_profile_timeout = float(os.getenv("MCP_ES_PROFILE_TIMEOUT", "5")) \
+            if es_profile_timeout is None else es_profile_timeout
+        # Uma repetição por vez; reservada sem esperar (quem não consegue é descartado)
+        self._es_profile_slot = threading.BoundedSemaphore(1)
+        self._profiled_at: Dict[str, float] = {}
+        self.sampler = StackSampler()
+        self.counters = {"requests": 0, "profiled": 0, "slow": 0, "es_profiles": 0, "es_profiles_dropped": 0}
+        self._logger: Optional[logging.Logger] = None
+        self._background: Set[asyncio.Task] = set()
+
+    def configure(self, sample_every: Optional[int] = None, slow_ms: Optional[int] = None) -> Dict[str, Any]:
+        if sample_every is not None:
+            self.sample_every = max(0, int(sample_every))
+        if slow_ms is not None:
+            self.slow_ms = max(0, int(slow_ms))
+        return self.status()
+
+    def status(self) -> Dict[str, Any]:
+        return {"sample_every": self.sample_every, "slow_ms": self.slow_ms, "log_path": self.log_path,
+                **self.counters}
+
+    @property
+    def logger(self) -> logging.Logger:
+        """Logger do arquivo de lentas, criado só na primeira requisição lenta"""
+        if self._logger is None:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            logger = logging.getLogger(f"mcp_server.slow.{id(self)}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(self.log_path, maxBytes=self.max_bytes, backupCount=self.backups,
+                                          encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def _sampled(self) -> bool:
+        self.counters["requests"] += 1
+        return self.sample_every > 0 and self.counters["requests"] % self.sample_every == 0
+
+    @contextmanager
+    def request(self, method: str, name: Optional[str], arguments: Any, context=None):
+        """Envolve um handler: amostra a pilha se sorteado e registra a requisição se lenta.
+
+        Com `context` (RequestContext), as buscas feitas durante a requisição
+        são guardadas para o log de lentas.
+        """
+        session = self.sampler.start() if self._sampled() else None
+        if context is not None and self.slow_ms:
+            context.searches = []
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            samples = self.sampler.stop(session) if session is not None else None
+            if session is not None:
+                self.counters["profiled"] += 1
+            if self.slow_ms and elapsed * 1000 >= self.slow_ms:
+                searches = getattr(context, "searches", None) or []
+                self._slow(method, name, arguments, elapsed, searches, samples)
+
+    def _slow(self, method: str, name: Optional[str], arguments: Any, elapsed: float,
+              searches: List[Dict[str, Any]], samples: Optional[Counter]):
+        self.counters["slow"] += 1
+        entry = {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "method": method,
+            "name": name,
+            "arguments": arguments,
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "searches": searches,
+        }
+        if samples is not None:
+            entry["python"] = top_frames(samples)
+
+        slowest = max(searches, key=lambda s: s["wall_ms"], default=None)
+        if slowest is None or self.es_profile is None:
+            self._write(entry)
+            return
+        skipped = self._es_profile_skipped(slowest)
+        if skipped:
+            self.counters["es_profiles_dropped"] += 1
+            entry["es_profile_skipped"] = skipped
+            self._write(entry)
+            return
+        # O perfil do ES sai de uma repetição da busca, fora do caminho da resposta
+        task = asyncio.ensure_future(self._with_es_profile(entry, slowest))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        # Liberada ao fim da task, mesmo se ela for cancelada antes de começar
+        task.add_done_callback(lambda _: self._es_profile_slot.release())
+
+    def _es_profile_skipped(self, search: Dict[str, Any]) -> Optional[str]:
+        """Motivo para não repetir a busca agora, ou None (e reserva a vaga e o formato da consulta)"""
+        now = time.monotonic()
+        shape = json.dumps([search.get("index"), _query_shape(search["body"])], sort_keys=True, default=str)
+        if now - self._profiled_at.get(shape, float("-inf")) < self.es_profile_interval:
+            return "recent"
+        if not self._es_profile_slot.acquire(blocking=False):
+            return "busy"
+        if len(self._profiled_at) >= 1000:
+            self._profiled_at = {k: t for k, t in self._profiled_at.items() if now - t < self.es_profile_interval}
+        self._profiled_at[shape] = now
+        return None
+
+    async def _with_es_profile(self, entry: Dict[str, Any], search: Dict[str, Any]):
+        self.counters["es_profiles"] += 1
+        try:
+            response = await self.es_profile(search.get("index"), search["body"], self.es_profile_timeout)
+            entry["es_profile"] = _summarize_es_profile(response)
+        except Exception as e:
+            entry["es_profile_error"] = str(e)
+        self._write(entry)
+
+    def _write(self, entry: Dict[str, Any]):
+        try:
+            self.logger.info(json.dumps(entry, ensure_ascii=False, default=str))
+        except Exception as e:
+            print(f"Erro ao gravar o log de requisições lentas: {e}", file=sys.stderr)
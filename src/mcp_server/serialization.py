@@ -0,0 +1,107 @@
+import os
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; sem ele usamos o json da stdlib
+    orjson = None
+
+
+class PreEncoded:
+    """Resultado já serializado, embutido no envelope JSON-RPC sem reprocessamento.
+
+    Guarda também o valor original para quem consome o resultado em processo.
+    Com `encode` em vez de `data`, a serialização só acontece no primeiro acesso
+    a .data; quem lê apenas .value (cliente em processo) não paga esse custo.
+    """
+    __slots__ = ("value", "_data", "_encode")
+
+    def __init__(self, value: Any, data: Optional[bytes] = None,
+                 encode: Optional[Callable[[Any], bytes]] = None):
+        self.value = value
+        self._data = data
+        self._encode = encode
+
+    @property
+    def data(self) -> bytes:
+        if self._data is None:
+            self._data = self._encode(self.value)
+        return self._data
+
+
+class JsonSerializer:
+    """Serializador compacto baseado no json da stdlib"""
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonSerializer(JsonSerializer):
+    """Serializador baseado em orjson (bem mais rápido em listas grandes de hits)"""
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+
+def get_serializer(name: str = None) -> JsonSerializer:
+    """Escolhe o serializador: MCP_SERIALIZER (json|orjson) ou orjson quando disponível"""
+    name = name or os.getenv("MCP_SERIALIZER")
+    if name == "json" or (name is None and orjson is None):
+        return JsonSerializer()
+    if orjson is None:
+        raise ValueError("orjson não está instalado")
+    return OrjsonSerializer()
+
+
+class MessageEncoder:
+    """Codifica envelopes JSON-RPC, emendando resultados PreEncoded sem re-serializar"""
+
+    def __init__(self, serializer: JsonSerializer, metrics=None):
+        self.serializer = serializer
+        # Opcional: recebe tempo de serialização e tamanho de cada resposta (mcp_server.metrics)
+        self.metrics = metrics
+
+    def pre_encode(self, value: Any) -> PreEncoded:
+        return PreEncoded(value, self.serializer.dumps(value))
+
+    def tool_result(self, payload: Any) -> PreEncoded:
+        """Resultado de tools/call: .value é o payload, .data o envelope MCP com o texto JSON"""
+        return PreEncoded(payload, encode=lambda value: self.serializer.dumps(
+            {"content": [{"type": "text", "text": self.text(value)}]}
+        ))
+
+    def text(self, value: Any) -> str:
+        """Conteúdo 'text' das respostas de ferramentas e recursos (JSON compacto)"""
+        return self.serializer.dumps(value).decode("utf-8")
+
+    def encode(self, message: Union[Dict[str, Any], List[Dict[str, Any]]]) -> bytes:
+        if self.metrics is None:
+            return self._encode(message)
+        start = time.perf_counter()
+        data = self._encode(message)
+        self.metrics.observe_encode(time.perf_counter() - start, len(data))
+        return data
+
+    def _encode(self, message: Union[Dict[str, Any], List[Dict[str, Any]]]) -> bytes:
+        if isinstance(message, list):
+            return b"[" + b",".join(self._encode(m) for m in message) + b"]"
+
+        result = message.get("result")
+        if not isinstance(result, PreEncoded):
+            return self.serializer.dumps(message)
+
+        envelope = {k: v for k, v in message.items() if k != "result"}
+        head = self.serializer.dumps(envelope)
+        # '{...}' -> '{...,"result":<bytes>}'
+        separator = b"," if len(head) > 2 else b""
+        return head[:-1] + separator + b'"result":' + result.data + b"}"
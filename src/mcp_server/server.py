@@ -1,11 +1,36 @@
-import json
+import time
+import signal
 import asyncio
+import argparse
+import contextlib
 import sys
 import os
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple, Union
 from dataclasses import dataclass
 from enum import Enum
 from elasticsearch_client.es_client import ElasticsearchClient
+from elasticsearch_client.async_es_client import AsyncElasticsearchClient
+from elasticsearch_client.es_client import build_source_filter
+from elasticsearch_client.mappings import DEFAULT_INDEX
+from elasticsearch_client.pagination import MAX_DOCUMENT_IDS, InvalidArgumentError, InvalidCursorError, document_ids
+from elasticsearch_client.aggregations import (
+    AGGREGATION_TYPES,
+    CALENDAR_INTERVALS,
+    DATE_FIELDS,
+    KEYWORD_FIELDS,
+    AggregationError,
+)
+from elasticsearch_client.connection import is_rejected
+from elasticsearch_client.request_context import RequestContext, current_request
+from elastic_transport import ConnectionTimeout
+from mcp_server.admission import AdmissionController, OverloadedError
+from mcp_server.deadlines import DeadlinePolicy
+from mcp_server.metrics import Metrics
+from mcp_server.profiling import Profiler
+from mcp_server.transport import INVALID_REQUEST, StdioTransport
+from mcp_server.batching import DocumentBatcher
+from mcp_server.serialization import MessageEncoder, PreEncoded, get_serializer
+from mcp_server.snapshots import ResourceSnapshots
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -13,8 +38,10 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 class ToolType(Enum):
     SEARCH = "search"
     GET_BY_ID = "get_by_id"
+    GET_BY_IDS = "get_by_ids"
     AGGREGATE = "aggregate"
     LIST_RECENT = "list_recent"
+    SEMANTIC_SEARCH = "semantic_search"
 
 @dataclass
 class Tool:
@@ -29,11 +56,68 @@ class Resource:
     description: str
     mime_type: str
 
+class DuplicateRequestError(Exception):
+    """Id de requisição já em uso por uma chamada em andamento da mesma sessão"""
+
+    def __init__(self, request_id: Any):
+        super().__init__(f"Id de requisição {request_id!r} já está em uso nesta sessão")
+        self.request_id = request_id
+
+    def to_error(self) -> Dict[str, Any]:
+        return {"code": INVALID_REQUEST, "message": str(self)}
+
+# Os recursos levam o nome do alias de leitura (ELASTICSEARCH_INDEX)
+RESOURCE_PREFIX = f"elasticsearch://{DEFAULT_INDEX}"
+
+# Projeções de _source aceitas pelas ferramentas que retornam documentos
+PROJECTION_PROPERTIES = {
+    "fields": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Campos a retornar (ex: [\"id\", \"title\"]); padrão: todos exceto embedding"
+    },
+    "exclude": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Campos a omitir da resposta"
+    }
+}
+
+# Métodos JSON-RPC atendidos pelo servidor
+METHODS = frozenset({
+    "initialize", "tools/list", "tools/call", "resources/list", "resources/read", "resources/subscribe",
+    "resources/unsubscribe", "notifications/cancelled"
+})
+
 class MCPServer:
-    def __init__(self):
-        self.es_client = ElasticsearchClient()
+    def __init__(self, batch_window: float = 0.002, max_batch_size: int = 100):
+        self.es_client = ElasticsearchClient()  # setup (criação do índice e carga)
+        self.async_es = AsyncElasticsearchClient()  # usado pelos handlers
+        # Histogramas de latência, tempos do ES, serialização e erros
+        self.metrics = Metrics()
+        self.async_es.metrics = self.metrics
+        # Buscas por ID que chegam juntas viram um único _mget
+        self.doc_loader = DocumentBatcher(self.async_es.get_many, batch_window, max_batch_size)
+        self.encoder = MessageEncoder(get_serializer(), self.metrics)
+        # stats e schema servidos da memória, atualizados em segundo plano (MCP_SNAPSHOT_*)
+        self.snapshots = ResourceSnapshots(self.async_es, self.encoder, {
+            "stats": f"{RESOURCE_PREFIX}/stats",
+            "schema": f"{RESOURCE_PREFIX}/schema"
+        })
+        # Perfil por amostragem (MCP_PROFILE_SAMPLE) e log de lentas (MCP_SLOW_MS)
+        self.profiler = Profiler(es_profile=self.async_es.profile_search)
         self.tools = self._initialize_tools()
         self.resources = self._initialize_resources()
+        # Limites de concorrência e de fila por ferramenta (MCP_TOOL_LIMITS)
+        self.admission = AdmissionController()
+        # Prazo por chamada (`_meta.timeout` do cliente ou MCP_TOOL_TIMEOUTS)
+        self.deadlines = DeadlinePolicy()
+        self._tool_names = {tool.name for tool in self.tools}
+        # Chamadas em andamento por (sessão, id), canceláveis por notifications/cancelled
+        self._inflight: Dict[Tuple[Any, Any], Tuple[asyncio.Task, RequestContext]] = {}
+        self._background: Set[asyncio.Task] = set()
+        # Respostas que não mudam (initialize, tools/list, resources/list) já codificadas
+        self._static_payloads: Dict[str, PreEncoded] = {}
         
     def _initialize_tools(self) -> List[Tool]:
         """Define as ferramentas disponíveis"""
@@ -51,8 +135,49 @@ class MCPServer:
                         "size": {
                             "type": "integer",
                             "description": "Número máximo de resultados",
+                            "minimum": 1,
                             "default": 10
-                        }
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": "Cursor opaco retornado em next_cursor para buscar a próxima página"
+                        },
+                        "highlight": {
+                            "type": "boolean",
+                            "description": "Retorna trechos destacados em 'highlights' no lugar do conteúdo completo",
+                            "default": False
+                        },
+                        **PROJECTION_PROPERTIES
+                    },
+                    "required": ["query"]
+                }
+            ),
+            Tool(
+                name="semantic_search",
+                description="Busca semântica por similaridade de vetores (kNN), opcionalmente híbrida com texto",
+                parameters={
+                    "type": "object",
+                    "properties": {
+                        "query": {
+                            "type": "string",
+                            "description": "Texto de busca"
+                        },
+                        "k": {
+                            "type": "integer",
+                            "description": "Número de vizinhos mais próximos a retornar",
+                            "default": 10
+                        },
+                        "num_candidates": {
+                            "type": "integer",
+                            "description": "Candidatos avaliados por shard (maior = melhor recall, mais lento)"
+                        },
+                        "mode": {
+                            "type": "string",
+                            "enum": ["knn", "hybrid"],
+                            "description": "'knn' puro ou 'hybrid' (fusão BM25 + kNN por RRF)",
+                            "default": "knn"
+                        },
+                        **PROJECTION_PROPERTIES
                     },
                     "required": ["query"]
                 }
@@ -66,11 +191,30 @@ class MCPServer:
                         "document_id": {
                             "type": "string",
                             "description": "ID do documento"
-                        }
+                        },
+                        **PROJECTION_PROPERTIES
                     },
                     "required": ["document_id"]
                 }
             ),
+            Tool(
+                name="get_documents_by_ids",
+                description="Busca vários documentos por ID em uma única requisição",
+                parameters={
+                    "type": "object",
+                    "properties": {
+                        "document_ids": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "minItems": 1,
+                            "maxItems": MAX_DOCUMENT_IDS,
+                            "description": "Lista de IDs dos documentos"
+                        },
+                        **PROJECTION_PROPERTIES
+                    },
+                    "required": ["document_ids"]
+                }
+            ),
             Tool(
                 name="aggregate_by_category",
                 description="Obtém contagem de documentos por categoria",
@@ -80,6 +224,64 @@ class MCPServer:
                     "required": []
                 }
             ),
+            Tool(
+                name="aggregate",
+                description="Executa várias agregações em uma única consulta: terms em campos keyword, "
+                            "date_histogram em datas, stats e composite (todos os buckets, paginados por cursor)",
+                parameters={
+                    "type": "object",
+                    "properties": {
+                        "aggregations": {
+                            "type": "array",
+                            "description": "Agregações a executar",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "type": {
+                                        "type": "string",
+                                        "enum": list(AGGREGATION_TYPES)
+                                    },
+                                    "name": {
+                                        "type": "string",
+                                        "description": "Nome do resultado; padrão: '<type>_<field>'"
+                                    },
+                                    "field": {
+                                        "type": "string",
+                                        "description": f"terms: {', '.join(KEYWORD_FIELDS)}; "
+                                                       f"date_histogram e stats: {', '.join(DATE_FIELDS)}"
+                                    },
+                                    "size": {
+                                        "type": "integer",
+                                        "description": "Buckets do terms (padrão 10) ou por página do composite (padrão 100)"
+                                    },
+                                    "interval": {
+                                        "type": "string",
+                                        "enum": list(CALENDAR_INTERVALS),
+                                        "description": "Intervalo de calendário do date_histogram",
+                                        "default": "day"
+                                    },
+                                    "sources": {
+                                        "type": "array",
+                                        "items": {"type": "object"},
+                                        "description": "composite: lista de {field, interval?}"
+                                    }
+                                },
+                                "required": ["type"]
+                            }
+                        },
+                        "filter": {
+                            "type": "object",
+                            "description": "Filtra os documentos agregados: {\"query\": texto, \"category\": valor "
+                                           "ou lista, \"created_at\": {\"gte\": ..., \"lt\": ...}}"
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": "Cursor opaco retornado em next_cursor para os próximos buckets dos composite"
+                        }
+                    },
+                    "required": []
+                }
+            ),
             Tool(
                 name="list_recent_documents",
                 description="Lista os documentos mais recentes",
@@ -89,8 +291,14 @@ class MCPServer:
                         "limit": {
                             "type": "integer",
                             "description": "Número de documentos a retornar",
+                            "minimum": 1,
                             "default": 5
-                        }
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": "Cursor opaco retornado em next_cursor para buscar a próxima página"
+                        },
+                        **PROJECTION_PROPERTIES
                     },
                     "required": []
                 }
@@ -101,16 +309,34 @@ class MCPServer:
         """Define os recursos disponíveis"""
         return [
             Resource(
-                uri="elasticsearch://sample_data/stats",
+                uri=f"{RESOURCE_PREFIX}/stats",
                 name="Estatísticas do Índice",
                 description="Estatísticas gerais sobre os dados indexados",
                 mime_type="application/json"
             ),
             Resource(
-                uri="elasticsearch://sample_data/schema",
+                uri=f"{RESOURCE_PREFIX}/schema",
                 name="Schema do Índice",
                 description="Estrutura e mapeamento do índice Elasticsearch",
                 mime_type="application/json"
+            ),
+            Resource(
+                uri=f"{RESOURCE_PREFIX}/cache",
+                name="Estatísticas do Cache",
+                description="Acertos, falhas, remoções e requisições agrupadas do cache de resultados",
+                mime_type="application/json"
+            ),
+            Resource(
+                uri=f"{RESOURCE_PREFIX}/metrics",
+                name="Métricas do Servidor",
+                description="Latência por método e ferramenta, tempos do Elasticsearch, serialização e erros",
+                mime_type="application/json"
+            ),
+            Resource(
+                uri=f"{RESOURCE_PREFIX}/admission",
+                name="Controle de Admissão",
+                description="Limites, fila, rejeições e tempos de espera e de execução por ferramenta",
+                mime_type="application/json"
             )
         ]
     
@@ -120,7 +346,7 @@ class MCPServer:
             "protocolVersion": "0.1.0",
             "capabilities": {
                 "tools": True,
-                "resources": True,
+                "resources": {"subscribe": True, "listChanged": False},
                 "prompts": False
             },
             "serverInfo": {
@@ -141,74 +367,121 @@ class MCPServer:
         
         return {"tools": tools_list}
     
-    async def handle_call_tool(self, name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
-        """Executa uma ferramenta específica"""
+    async def handle_call_tool(self, name: str, arguments: Dict[str, Any],
+                               context: Optional[RequestContext] = None) -> Union[PreEncoded, Dict[str, Any]]:
+        """Executa uma ferramenta específica dentro do prazo; levanta OverloadedError se não houver vaga"""
+        if name not in self._tool_names:
+            return await self._execute_tool(name, arguments)
+
+        context = context or RequestContext(self.deadlines.timeout_for(name))
+        token = current_request.set(context)
+        try:
+            with self.profiler.request("tools/call", name, arguments, context):
+                # O prazo conta desde a chegada, inclusive a espera na fila de admissão
+                async with asyncio.timeout(context.remaining()):
+                    async with self.admission.admit(name):
+                        result = await self._execute_tool(name, arguments)
+        except TimeoutError:
+            self._cancel_es_tasks(context)
+            return self._deadline_exceeded(name)
+        finally:
+            current_request.reset(token)
+        self.admission.succeeded(name)
+        return result
+
+    def _deadline_exceeded(self, name: str) -> Dict[str, Any]:
+        return {
+            "error": {
+                "code": "DEADLINE_EXCEEDED",
+                "message": f"Prazo da ferramenta '{name}' esgotado"
+            }
+        }
+
+    async def _execute_tool(self, name: str, arguments: Dict[str, Any]) -> Union[PreEncoded, Dict[str, Any]]:
+        context = current_request.get()
         try:
             if name == "search_documents":
                 query = arguments.get("query", "")
                 size = arguments.get("size", 10)
-                results = self.es_client.search(query, size)
-                return {
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": json.dumps({
-                                "results": results,
-                                "total": len(results),
-                                "query": query
-                            }, indent=2)
-                        }
-                    ]
-                }
+                results, next_cursor = await self.async_es.search_page(
+                    query, size, arguments.get("cursor"),
+                    fields=arguments.get("fields"),
+                    exclude=arguments.get("exclude"),
+                    highlight=arguments.get("highlight", False)
+                )
+                return self.encoder.tool_result({
+                    "results": results,
+                    "total": len(results),
+                    "query": query,
+                    "next_cursor": next_cursor,
+                    "partial": context.partial
+                })
+            
+            elif name == "semantic_search":
+                query = arguments.get("query", "")
+                mode = arguments.get("mode", "knn")
+                results = await self.async_es.semantic_search(
+                    query,
+                    k=arguments.get("k", 10),
+                    num_candidates=arguments.get("num_candidates"),
+                    mode=mode,
+                    source=build_source_filter(arguments.get("fields"), arguments.get("exclude"))
+                )
+                return self.encoder.tool_result({
+                    "results": results,
+                    "total": len(results),
+                    "query": query,
+                    "mode": mode,
+                    "partial": context.partial
+                })
             
             elif name == "get_document_by_id":
                 doc_id = arguments.get("document_id")
-                result = self.es_client.get_by_id(doc_id)
-                return {
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": json.dumps(result, indent=2)
-                        }
-                    ]
-                }
+                source = build_source_filter(arguments.get("fields"), arguments.get("exclude"))
+                result = await self.doc_loader.load(doc_id, source) or {}
+                return self.encoder.tool_result(result)
+            
+            elif name == "get_documents_by_ids":
+                doc_ids = document_ids(arguments.get("document_ids"))
+                source = build_source_filter(arguments.get("fields"), arguments.get("exclude"))
+                docs = await self.doc_loader.load_many(doc_ids, source)
+                found = [doc for doc in docs if doc is not None]
+                return self.encoder.tool_result({
+                    "documents": found,
+                    "not_found": [i for i, doc in zip(doc_ids, docs) if doc is None],
+                    "count": len(found)
+                })
             
             elif name == "aggregate_by_category":
-                aggregations = self.es_client.aggregate_by_category()
-                return {
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": json.dumps({
-                                "categories": aggregations,
-                                "total_categories": len(aggregations)
-                            }, indent=2)
-                        }
-                    ]
-                }
+                aggregations = await self.async_es.aggregate_by_category()
+                return self.encoder.tool_result({
+                    "categories": aggregations,
+                    "total_categories": len(aggregations),
+                    "partial": context.partial
+                })
+            
+            elif name == "aggregate":
+                result = await self.async_es.aggregate(
+                    arguments.get("aggregations"),
+                    filter=arguments.get("filter"),
+                    cursor=arguments.get("cursor")
+                )
+                return self.encoder.tool_result({**result, "partial": context.partial})
             
             elif name == "list_recent_documents":
                 limit = arguments.get("limit", 5)
-                # Busca documentos ordenados por data
-                body = {
-                    "query": {"match_all": {}},
-                    "sort": [{"created_at": {"order": "desc"}}],
-                    "size": limit
-                }
-                response = self.es_client.es.search(index=self.es_client.index_name, body=body)
-                docs = [hit['_source'] for hit in response['hits']['hits']]
+                docs, next_cursor = await self.async_es.list_recent_page(
+                    limit, arguments.get("cursor"),
+                    fields=arguments.get("fields"),
+                    exclude=arguments.get("exclude")
+                )
                 
-                return {
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": json.dumps({
-                                "recent_documents": docs,
-                                "count": len(docs)
-                            }, indent=2)
-                        }
-                    ]
-                }
+                return self.encoder.tool_result({
+                    "recent_documents": docs,
+                    "count": len(docs),
+                    "next_cursor": next_cursor,
+                    "partial": context.partial
+                })
             
             else:
                 return {
@@ -218,7 +491,32 @@ class MCPServer:
                     }
                 }
                 
+        except InvalidCursorError as e:
+            return {
+                "error": {
+                    "code": "INVALID_CURSOR",
+                    "message": str(e)
+                }
+            }
+        except AggregationError as e:
+            return {
+                "error": {
+                    "code": "INVALID_AGGREGATION",
+                    "message": str(e)
+                }
+            }
+        except InvalidArgumentError as e:
+            return {
+                "error": {
+                    "code": "INVALID_ARGUMENT",
+                    "message": str(e)
+                }
+            }
+        except ConnectionTimeout:
+            return self._deadline_exceeded(name)
         except Exception as e:
+            if is_rejected(e):
+                raise self.admission.throttle(name)
             return {
                 "error": {
                     "code": "TOOL_ERROR",
@@ -239,34 +537,69 @@ class MCPServer:
         
         return {"resources": resources_list}
     
-    async def handle_read_resource(self, uri: str) -> Dict[str, Any]:
+    def handle_subscription(self, method: str, uri: str, session: Any) -> Dict[str, Any]:
+        """resources/subscribe e resources/unsubscribe: a sessão passa (ou deixa) de receber
+        notifications/resources/updated da URI (só stats e schema mudam por notificação)"""
+        if uri not in {resource.uri for resource in self.resources}:
+            return {
+                "error": {
+                    "code": "RESOURCE_NOT_FOUND",
+                    "message": f"Recurso '{uri}' não encontrado"
+                }
+            }
+        if method == "resources/subscribe":
+            self.snapshots.subscribe(uri, session)
+        else:
+            self.snapshots.unsubscribe(uri, session)
+        return {}
+
+    async def handle_read_resource(self, uri: str) -> Union[PreEncoded, Dict[str, Any]]:
         """Lê um recurso específico"""
+        context = RequestContext()
+        token = current_request.set(context)
         try:
-            if uri == "elasticsearch://sample_data/stats":
-                stats = self.es_client.es.indices.stats(index=self.es_client.index_name)
+            with self.profiler.request("resources/read", uri, None, context):
+                return await self._read_resource(uri)
+        finally:
+            current_request.reset(token)
+
+    async def _read_resource(self, uri: str) -> Union[PreEncoded, Dict[str, Any]]:
+        try:
+            if uri == f"{RESOURCE_PREFIX}/stats":
+                return await self.snapshots.read("stats")
+
+            elif uri == f"{RESOURCE_PREFIX}/schema":
+                return await self.snapshots.read("schema")
+
+            elif uri == f"{RESOURCE_PREFIX}/metrics":
                 return {
                     "contents": [
                         {
                             "uri": uri,
                             "mimeType": "application/json",
-                            "text": json.dumps({
-                                "index": self.es_client.index_name,
-                                "document_count": stats['_all']['primaries']['docs']['count'],
-                                "size_in_bytes": stats['_all']['primaries']['store']['size_in_bytes'],
-                                "categories": self.es_client.aggregate_by_category()
-                            }, indent=2)
+                            "text": self.encoder.text(self.metrics.snapshot(self.async_es.cache.stats()))
                         }
                     ]
                 }
-            
-            elif uri == "elasticsearch://sample_data/schema":
-                mapping = self.es_client.es.indices.get_mapping(index=self.es_client.index_name)
+
+            elif uri == f"{RESOURCE_PREFIX}/admission":
+                return {
+                    "contents": [
+                        {
+                            "uri": uri,
+                            "mimeType": "application/json",
+                            "text": self.encoder.text(self.admission.stats())
+                        }
+                    ]
+                }
+
+            elif uri == f"{RESOURCE_PREFIX}/cache":
                 return {
                     "contents": [
                         {
                             "uri": uri,
                             "mimeType": "application/json",
-                            "text": json.dumps(mapping[self.es_client.index_name], indent=2)
+                            "text": self.encoder.text(self.async_es.cache.stats())
                         }
                     ]
                 }
@@ -287,21 +620,100 @@ class MCPServer:
                 }
             }
     
-    async def process_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
-        """Processa mensagens JSON-RPC"""
+    async def _static(self, method: str, handler, *args) -> PreEncoded:
+        """Retorna a resposta estática já codificada, gerando-a na primeira chamada"""
+        payload = self._static_payloads.get(method)
+        if payload is None:
+            payload = self.encoder.pre_encode(await handler(*args))
+            self._static_payloads[method] = payload
+        return payload
+
+    def _cancel_es_tasks(self, context: RequestContext):
+        """Cancela em segundo plano as buscas da requisição que ainda rodam no cluster"""
+        task = asyncio.create_task(self.async_es.cancel_tasks(context.opaque_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def cancel_request(self, request_id: Any, session: Any = None) -> bool:
+        """Interrompe uma chamada em andamento da sessão (notifications/cancelled)
+
+        Só alcança chamadas deste processo: com vários workers HTTP, o cancelamento
+        que cai em outro worker não encontra a chamada e é ignorado.
+        """
+        entry = self._inflight.get((session, request_id))
+        if entry is None:
+            return False
+        task, context = entry
+        task.cancel()
+        # Abortar a conexão HTTP já encerra a maioria das buscas; o cancelamento explícito cobre o resto
+        self._cancel_es_tasks(context)
+        return True
+
+    async def _call_tool_cancellable(self, session: Any, request_id: Any,
+                                     params: Dict[str, Any]) -> Optional[Union[PreEncoded, Dict[str, Any]]]:
+        """Roda a ferramenta em uma task própria; retorna None se o cliente cancelar a chamada"""
+        key = (session, request_id)
+        if request_id is not None and key in self._inflight:
+            raise DuplicateRequestError(request_id)
+
+        name = params.get("name")
+        context = RequestContext(self.deadlines.timeout_for(name, params.get("_meta")))
+        task = asyncio.ensure_future(self.handle_call_tool(name, params.get("arguments", {}), context))
+        if request_id is None:
+            return await task
+
+        entry = (task, context)
+        self._inflight[key] = entry
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if task.cancelled() and not asyncio.current_task().cancelling():
+                return None
+            raise
+        finally:
+            if self._inflight.get(key) is entry:
+                del self._inflight[key]
+
+    async def process_message(self, message: Dict[str, Any], session: Any = None) -> Optional[Dict[str, Any]]:
+        """Processa mensagens JSON-RPC; chamadas canceladas pelo cliente não têm resposta
+
+        `session` identifica a conexão (stdio) ou a sessão HTTP: ids de requisição
+        e cancelamentos só valem dentro dela.
+        """
+        start = time.perf_counter()
+        response = await self._process_message(message, session)
+        # Nomes fora da lista não viram séries próprias (um cliente não pode inflar as métricas)
+        method = message.get("method")
+        method = method if method in METHODS else "unknown"
+        tool = (message.get("params") or {}).get("name") if method == "tools/call" else None
+        tool = tool if tool in self._tool_names else None
+        self.metrics.observe_request(method, tool, time.perf_counter() - start, response)
+        return response
+
+    async def _process_message(self, message: Dict[str, Any], session: Any = None) -> Optional[Dict[str, Any]]:
         method = message.get("method")
-        params = message.get("params", {})
+        params = message.get("params") or {}
         
         if method == "initialize":
-            result = await self.handle_initialize(params)
+            result = await self._static(method, self.handle_initialize, params)
         elif method == "tools/list":
-            result = await self.handle_list_tools()
+            result = await self._static(method, self.handle_list_tools)
         elif method == "tools/call":
-            result = await self.handle_call_tool(params.get("name"), params.get("arguments", {}))
+            try:
+                result = await self._call_tool_cancellable(session, message.get("id"), params)
+            except (OverloadedError, DuplicateRequestError) as e:
+                return {"jsonrpc": "2.0", "id": message.get("id"), "error": e.to_error()}
+            if result is None:
+                return None
+        elif method == "notifications/cancelled":
+            self.cancel_request(params.get("requestId"), session)
+            return None
         elif method == "resources/list":
-            result = await self.handle_list_resources()
+            result = await self._static(method, self.handle_list_resources)
         elif method == "resources/read":
             result = await self.handle_read_resource(params.get("uri"))
+        elif method in ("resources/subscribe", "resources/unsubscribe"):
+            result = self.handle_subscription(method, params.get("uri"), session)
         else:
             result = {
                 "error": {
@@ -316,23 +728,69 @@ class MCPServer:
             "result": result
         }
     
-    async def run(self):
-        """Loop principal do servidor MCP"""
-        print("Servidor MCP iniciado!")
+    def setup(self) -> bool:
+        """Conecta ao Elasticsearch, garante o índice e sincroniza os dados de exemplo"""
         print("Conectando ao Elasticsearch...")
-        
         if not self.es_client.check_connection():
             print("Falha ao conectar ao Elasticsearch")
-            return
-        
+            return False
+
         self.es_client.create_index()
         self.es_client.load_sample_data()
-        
-        print("Servidor MCP pronto para receber requisições")
-        print("Use o agente LangChain para interagir com o servidor")
-        while True:
-            await asyncio.sleep(1)
+        return True
+
+    def toggle_profiling(self):
+        """Liga (todas as requisições) ou desliga o perfil por amostragem"""
+        status = self.profiler.configure(sample_every=0 if self.profiler.sample_every else 1)
+        print(f"Profiling {'ligado' if status['sample_every'] else 'desligado'} (log: {status['log_path']})",
+              file=sys.stderr)
+
+    def _install_profiling_toggle(self):
+        """`kill -USR1 <pid>` alterna o profiling sem reiniciar o servidor"""
+        if not hasattr(signal, "SIGUSR1"):
+            return
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, self.toggle_profiling)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    async def run(self):
+        """Loop principal do servidor MCP"""
+        # stdout é o canal do protocolo; mensagens de log vão para stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            print("Servidor MCP iniciado!")
+            if not self.setup():
+                return
+
+            print("Servidor MCP pronto para receber requisições (JSON-RPC via stdio)")
+            self._install_profiling_toggle()
+            transport = StdioTransport(self)
+            self.snapshots.notifiers.append(transport.notify)
+            self.snapshots.start()
+            try:
+                await transport.serve()
+            finally:
+                self.snapshots.forget(transport.session)
+                await self.snapshots.stop()
+                await self.async_es.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor MCP para Elasticsearch")
+    parser.add_argument("--transport", choices=["stdio", "http"], default=os.getenv("MCP_TRANSPORT", "stdio"))
+    parser.add_argument("--host", default=os.getenv("MCP_SERVER_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_SERVER_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("MCP_WORKERS", "1")))
+    parser.add_argument("--skip-setup", action="store_true", help="não cria o índice nem carrega dados")
+    args = parser.parse_args()
+
+    if args.transport == "http":
+        from mcp_server.http_transport import serve_http
+        serve_http(args.host, args.port, args.workers, setup=not args.skip_setup)
+    else:
+        server = MCPServer()
+        asyncio.run(server.run())
+
 
 if __name__ == "__main__":
-    server = MCPServer()
-    asyncio.run(server.run())
\ No newline at end of file
+    main()
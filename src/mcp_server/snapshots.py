@@ -0,0 +1,169 @@
+import os
+import sys
+import time
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Set
+from mcp_server.serialization import MessageEncoder, PreEncoded
+
+# (mensagem, sessões destinatárias): cada transporte entrega só às suas sessões
+Notify = Callable[[Dict[str, Any], FrozenSet[Any]], Any]
+
+
+class ResourceSnapshots:
+    """Snapshots dos recursos de stats e schema, mantidos por uma task em segundo plano.
+
+    As leituras devolvem o resultado já codificado (PreEncoded), sem tocar no
+    Elasticsearch; o campo `generated_at` informa a idade dos dados. A task
+    refaz os snapshots a cada `interval` segundos ou assim que uma escrita é
+    percebida (a geração do cache do índice mudou, conferida a cada
+    `check_interval`), e avisa com notifications/resources/updated, quando o
+    conteúdo muda, só as sessões que assinaram a URI (resources/subscribe).
+
+    Sem a task (cliente em processo, benchmarks), a leitura refaz o snapshot
+    vencido ou desatualizado na hora.
+    """
+
+    def __init__(self, async_es, encoder: MessageEncoder, uris: Dict[str, str],
+                 interval: Optional[float] = None, check_interval: Optional[float] = None):
+        self.async_es = async_es
+        self.encoder = encoder
+        # nome do snapshot ("stats", "schema") -> URI do recurso
+        self.uris = uris
+        self.interval = interval if interval is not None else float(os.getenv("MCP_SNAPSHOT_INTERVAL", "30"))
+        self.check_interval = check_interval if check_interval is not None \
+            else float(os.getenv("MCP_SNAPSHOT_CHECK_INTERVAL", "2"))
+        self.notifiers: List[Notify] = []
+        # URI -> sessões que a assinaram
+        self.subscriptions: Dict[str, Set[Any]] = {}
+        self._builders: Dict[str, Callable[[], Awaitable[Any]]] = {"stats": self._stats, "schema": self._schema}
+        self._payloads: Dict[str, PreEncoded] = {}
+        self._data: Dict[str, Any] = {}
+        self._built_at = 0.0
+        self._generation: Optional[int] = None
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.notifications = 0
+
+    async def _stats(self) -> Dict[str, Any]:
+        stats, categories = await asyncio.gather(
+            self.async_es.index_stats(),
+            self.async_es.aggregate_by_category()
+        )
+        return {
+            "index": self.async_es.index_name,
+            "document_count": stats['_all']['primaries']['docs']['count'],
+            "size_in_bytes": stats['_all']['primaries']['store']['size_in_bytes'],
+            "partitions": {
+                index: {
+                    "document_count": info['primaries']['docs']['count'],
+                    "size_in_bytes": info['primaries']['store']['size_in_bytes']
+                } for index, info in stats.get('indices', {}).items()
+            },
+            "categories": categories
+        }
+
+    async def _schema(self) -> Dict[str, Any]:
+        return await self.async_es.get_mapping()
+
+    def _encode(self, name: str, data: Dict[str, Any], generated_at: str) -> PreEncoded:
+        return self.encoder.pre_encode({
+            "contents": [
+                {
+                    "uri": self.uris[name],
+                    "mimeType": "application/json",
+                    "text": self.encoder.text({**data, "generated_at": generated_at})
+                }
+            ]
+        })
+
+    async def refresh(self, built_at: Optional[float] = None) -> List[str]:
+        """Refaz todos os snapshots; devolve os nomes dos que mudaram (e notifica os clientes).
+
+        Com `built_at`, não refaz se outra chamada já o fez enquanto esta esperava o lock.
+        """
+        async with self._lock:
+            if built_at is not None and self._built_at != built_at:
+                return []
+            generation = await self.async_es.index_generation()
+            names = list(self._builders)
+            results = await asyncio.gather(*(self._builders[name]() for name in names))
+            generated_at = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+            changed = []
+            for name, data in zip(names, results):
+                # generated_at não conta: só o conteúdo muda o snapshot para os clientes
+                if name in self._data and self._data[name] != data:
+                    changed.append(name)
+                self._data[name] = data
+                self._payloads[name] = self._encode(name, data, generated_at)
+            self._built_at = time.monotonic()
+            self._generation = generation
+            self.refreshes += 1
+        for name in changed:
+            self._notify(self.uris[name])
+        return changed
+
+    def subscribe(self, uri: str, session: Any):
+        self.subscriptions.setdefault(uri, set()).add(session)
+
+    def unsubscribe(self, uri: str, session: Any):
+        sessions = self.subscriptions.get(uri)
+        if sessions is not None:
+            sessions.discard(session)
+            if not sessions:
+                del self.subscriptions[uri]
+
+    def forget(self, session: Any):
+        """Remove todas as assinaturas de uma sessão encerrada"""
+        for uri in list(self.subscriptions):
+            self.unsubscribe(uri, session)
+
+    def _notify(self, uri: str):
+        sessions = frozenset(self.subscriptions.get(uri, ()))
+        if not sessions:
+            return
+        message = {"jsonrpc": "2.0", "method": "notifications/resources/updated", "params": {"uri": uri}}
+        self.notifications += 1
+        for notify in self.notifiers:
+            try:
+                notify(message, sessions)
+            except Exception as e:
+                print(f"Erro ao enviar notificação de '{uri}': {e}", file=sys.stderr)
+
+    async def _stale(self) -> bool:
+        if time.monotonic() - self._built_at >= self.interval:
+            return True
+        return await self.async_es.index_generation() != self._generation
+
+    async def read(self, name: str) -> PreEncoded:
+        """Resultado de resources/read já codificado"""
+        if name not in self._payloads or (self._task is None and await self._stale()):
+            await self.refresh(built_at=self._built_at)
+        return self._payloads[name]
+
+    async def _run(self):
+        while True:
+            try:
+                if await self._stale():
+                    await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Mantém o snapshot anterior; generated_at mostra que ele está ficando velho
+                print(f"Erro ao atualizar os snapshots dos recursos: {e}", file=sys.stderr)
+            await asyncio.sleep(self.check_interval)
+
+    def start(self):
+        """Inicia a task de atualização no loop atual"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,172 @@
+import sys
+import asyncio
+import threading
+from typing import Any, BinaryIO, Dict, FrozenSet, List, Optional, Set
+from mcp_server.serialization import MessageEncoder, get_serializer
+
+# Códigos de erro padrão do JSON-RPC 2.0
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+INTERNAL_ERROR = -32603
+
+# Sessão HTTP do cliente: criada no initialize e reenviada por ele em cada requisição
+SESSION_HEADER = "Mcp-Session-Id"
+
+
+def _error_response(code: int, message: str, msg_id: Any = None) -> Dict[str, Any]:
+    """Monta uma resposta de erro JSON-RPC"""
+    return {
+        "jsonrpc": "2.0",
+        "id": msg_id,
+        "error": {"code": code, "message": message}
+    }
+
+
+def _is_notification(message: Dict[str, Any]) -> bool:
+    """Notificações JSON-RPC não possuem o campo 'id' e não recebem resposta"""
+    return "id" not in message
+
+
+async def dispatch_message(server, message: Any, session: Any = None) -> Optional[Dict[str, Any]]:
+    """Processa uma única mensagem da sessão; retorna None para notificações"""
+    if not isinstance(message, dict) or not isinstance(message.get("method"), str):
+        msg_id = message.get("id") if isinstance(message, dict) else None
+        return _error_response(INVALID_REQUEST, "Requisição JSON-RPC inválida", msg_id)
+
+    try:
+        response = await server.process_message(message, session)
+    except Exception as e:
+        response = _error_response(INTERNAL_ERROR, str(e), message.get("id"))
+
+    if _is_notification(message):
+        return None
+    return response
+
+
+class StdioTransport:
+    """Transporte JSON-RPC delimitado por linhas (NDJSON) sobre stdin/stdout.
+
+    Cada requisição é despachada como uma task própria e a resposta é escrita
+    assim que termina, de modo que uma chamada lenta não bloqueia as demais.
+    """
+
+    def __init__(self, server, reader: Optional[asyncio.StreamReader] = None,
+                 output: Optional[BinaryIO] = None, max_frame_bytes: int = 16 * 1024 * 1024):
+        self.server = server
+        self.reader = reader
+        self.output = output
+        self.max_frame_bytes = max_frame_bytes
+        self.encoder = getattr(server, "encoder", None) or MessageEncoder(get_serializer())
+        self._write_lock = asyncio.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        # Cada conexão stdio é uma sessão: ids e cancelamentos não se misturam com outras
+        self.session = object()
+
+    async def _open_stdin(self) -> asyncio.StreamReader:
+        """Conecta o stdin do processo a um StreamReader assíncrono"""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=self.max_frame_bytes)
+        try:
+            protocol = asyncio.StreamReaderProtocol(reader)
+            await loop.connect_read_pipe(lambda: protocol, sys.stdin)
+        except (ValueError, OSError):
+            # Arquivos regulares (ex: `< frames.jsonl`) não suportam pipe transport
+            def pump():
+                for line in sys.stdin.buffer:
+                    loop.call_soon_threadsafe(reader.feed_data, line)
+                loop.call_soon_threadsafe(reader.feed_eof)
+
+            threading.Thread(target=pump, daemon=True).start()
+        return reader
+
+    async def _write(self, payload: Any):
+        """Escreve um frame de resposta no canal de saída"""
+        data = self.encoder.encode(payload) + b"\n"
+        async with self._write_lock:
+            self.output.write(data)
+            self.output.flush()
+
+    def notify(self, message: Dict[str, Any], sessions: FrozenSet[Any]):
+        """Envia uma notificação do servidor (ex: notifications/resources/updated) pelo stdout,
+        se esta conexão está entre as `sessions` destinatárias"""
+        if self.session not in sessions:
+            return
+        task = asyncio.create_task(self._write(message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch_one(self, message: Any) -> Optional[Dict[str, Any]]:
+        return await dispatch_message(self.server, message, self.session)
+
+    async def _dispatch_batch(self, batch: List[Any]):
+        """Processa um lote concorrentemente e responde com um único array"""
+        if not batch:
+            await self._write(_error_response(INVALID_REQUEST, "Lote JSON-RPC vazio"))
+            return
+
+        responses = await asyncio.gather(*(self._dispatch_one(m) for m in batch))
+        responses = [r for r in responses if r is not None]
+        if responses:
+            await self._write(responses)
+
+    async def _handle_frame(self, line: bytes):
+        """Decodifica um frame e envia a resposta correspondente"""
+        try:
+            message = self.encoder.serializer.loads(line)
+        except ValueError as e:
+            await self._write(_error_response(PARSE_ERROR, f"JSON inválido: {e}"))
+            return
+
+        if isinstance(message, list):
+            await self._dispatch_batch(message)
+            return
+
+        response = await self._dispatch_one(message)
+        if response is not None:
+            await self._write(response)
+
+    def _spawn(self, line: bytes):
+        """Cria uma task para o frame e mantém referência até terminar"""
+        task = asyncio.create_task(self._handle_frame(line))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _skip_line(self, consumed: int):
+        """Descarta o resto de um frame grande demais, até o próximo '\\n' (inclusive) ou EOF"""
+        while True:
+            try:
+                await self.reader.readexactly(consumed)
+                await self.reader.readuntil(b"\n")
+                return
+            except asyncio.LimitOverrunError as e:
+                consumed = e.consumed
+            except asyncio.IncompleteReadError:
+                return
+
+    async def serve(self):
+        """Lê frames até EOF e aguarda as requisições pendentes"""
+        if self.output is None:
+            self.output = sys.__stdout__.buffer
+        if self.reader is None:
+            self.reader = await self._open_stdin()
+
+        while True:
+            try:
+                line = await self.reader.readuntil(b"\n")
+            except asyncio.IncompleteReadError as e:
+                # EOF: último frame sem '\n' (vazio se não sobrou nada)
+                line = e.partial
+            except asyncio.LimitOverrunError as e:
+                # Frame maior que o limite: responde com erro e descarta até o fim da linha,
+                # para que o resto dele não seja lido como o frame seguinte
+                await self._write(_error_response(INVALID_REQUEST, "Frame excede o tamanho máximo"))
+                await self._skip_line(e.consumed)
+                continue
+
+            if not line:
+                break
+            if line.strip():
+                self._spawn(line)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)